@@ -0,0 +1,428 @@
+import argparse
+import json
+import math
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from dataclasses import dataclass
+
+import numpy as np
+
+from results import PASS, WARN, FAIL
+
+# Play-and-record test for speakers and microphone (or a loopback cable from
+# line out to line in). A test signal is played with aplay while arecord
+# captures, and the capture is analysed as it streams in:
+#   - a leading chirp is found by cross-correlation, which gives the
+#     round-trip latency and lines the capture up with the signal
+#   - stepped tones give the frequency response relative to 1 kHz
+#   - the harmonics of the 1 kHz tone give THD
+#   - tones played on one channel only show whether left and right are swapped
+#     and, even through a mono microphone, whether each speaker works
+# Each tone is analysed with Hann-windowed FFTs over whole frames of the
+# chunks that fall inside it, and only the summed spectra are kept, so memory
+# does not grow with the length of the capture.
+#
+# analyze_wav() runs the same analysis on a recorded or synthesized WAV file,
+# and --synthesize writes one with a chosen delay, swap and distortion.
+
+RATE = 48000
+CHANNELS = 2
+FFT_SIZE = 4096          # 11.7 Hz bins at 48 kHz
+CHUNK_FRAMES = 8192
+LEAD_S = 0.2             # silence before the chirp
+CHIRP_S = 0.25
+CHIRP_BAND = (300.0, 8000.0)
+GAP_S = 0.1
+TONE_S = 0.5
+GUARD_S = 0.05           # trimmed from both ends of a tone for onsets and latency jitter
+LATENCY_SEARCH_S = 1.0   # how far into the capture the chirp may start
+TAIL_S = 0.5             # recorded after the signal ends
+AMPLITUDE = 0.5          # of full scale
+HARMONICS = 5
+DETECTION_RATIO = 8.0    # chirp correlation peak over its median, below which nothing was heard
+RESPONSE_FREQUENCIES = (100, 200, 400, 1000, 2000, 4000, 8000, 12000)
+GRADED_BAND = (300, 8000)  # laptop speakers into laptop microphones roll off outside this
+MAX_DEVIATION_DB = 12.0
+MAX_THD_PERCENT = 5.0
+MIN_SEPARATION_DB = 10.0   # between the played and the silent channel
+# One speaker alone against both at 1 kHz, on the loudest capture channel. A
+# working one is 0-6 dB down (a mono microphone hears both speakers); a dead
+# one leaves only noise.
+MAX_CHANNEL_DROP_DB = 15.0
+
+
+@dataclass(frozen=True, slots=True)
+class Tone:
+    name: str
+    frequency: float
+    channels: tuple  # which of (left, right) play it
+
+
+def default_plan():
+    tones = [Tone(f"{frequency} Hz", frequency, (True, True)) for frequency in RESPONSE_FREQUENCIES]
+    return tones + [Tone("left", 1000, (True, False)), Tone("right", 1000, (False, True))]
+
+
+def _chirp(rate):
+    # Logarithmic sweep with faded ends
+    t = np.arange(int(CHIRP_S * rate)) / rate
+    low, high = CHIRP_BAND
+    k = math.log(high / low)
+    signal = np.sin(2 * np.pi * low * CHIRP_S / k * (np.exp(t / CHIRP_S * k) - 1))
+    fade = np.minimum(1.0, np.minimum(t, CHIRP_S - t) / 0.01)
+    return signal * fade
+
+
+def tone_start(plan, index, rate):
+    # Offset of a tone from the start of the played signal, in frames
+    return int((LEAD_S + CHIRP_S + GAP_S + index * TONE_S) * rate)
+
+
+def render(plan, rate=RATE):
+    # The played signal as float64 frames (n, 2) in -1..1
+    length = tone_start(plan, len(plan), rate)
+    signal = np.zeros((length, CHANNELS))
+    chirp = _chirp(rate)
+    lead = int(LEAD_S * rate)
+    signal[lead:lead + len(chirp)] = chirp[:, None] * AMPLITUDE
+    n = int(TONE_S * rate)
+    t = np.arange(n) / rate
+    fade = np.minimum(1.0, np.minimum(t, TONE_S - t) / 0.005)
+    for index, tone in enumerate(plan):
+        start = tone_start(plan, index, rate)
+        samples = np.sin(2 * np.pi * tone.frequency * t) * fade * AMPLITUDE
+        for channel, plays in enumerate(tone.channels):
+            if plays:
+                signal[start:start + n, channel] = samples
+    return signal
+
+
+def write_wav(path, frames, rate=RATE):
+    with wave.open(path, "wb") as f:
+        f.setnchannels(frames.shape[1])
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes((np.clip(frames, -1, 1) * 32767).astype("<i2").tobytes())
+
+
+def synthesize_capture(plan, rate=RATE, delay_s=0.02, swap=False, distortion=0.0, noise_db=-60.0,
+                       gains_db=None, mono=False, muted=None, seed=0):
+    # What a capture of `plan` might look like, for testing the analysis offline.
+    # distortion adds a cubic term; gains_db maps a frequency to a level change;
+    # muted ("left" or "right") silences that speaker.
+    played = render(plan, rate)
+    if muted:
+        played[:, ("left", "right").index(muted)] = 0.0
+    if gains_db:
+        # Stepped tones make a per-tone gain easy to apply
+        for index, tone in enumerate(plan):
+            gain = 10 ** (gains_db.get(tone.frequency, 0.0) / 20)
+            start = tone_start(plan, index, rate)
+            played[start:start + int(TONE_S * rate)] *= gain
+    if swap:
+        played = played[:, ::-1]
+    captured = played + distortion * played ** 3 / AMPLITUDE ** 2
+    delay = int(delay_s * rate)
+    captured = np.concatenate([np.zeros((delay, CHANNELS)), captured, np.zeros((int(TAIL_S * rate), CHANNELS))])
+    rng = np.random.default_rng(seed)
+    captured += rng.normal(0, 10 ** (noise_db / 20), captured.shape)
+    if mono:
+        captured = captured.mean(axis=1, keepdims=True)
+    return captured
+
+
+class LoopbackAnalyzer:
+    # feed() chunks of captured frames (n, channels) in order, then finish().
+    # `offset_s` is how much later playback started than the capture, if known.
+    def __init__(self, plan, rate=RATE, offset_s=0.0):
+        self.plan = plan
+        self.rate = rate
+        self.offset_s = offset_s
+        self.window = np.hanning(FFT_SIZE)
+        self.chirp = _chirp(rate)
+        self.position = 0          # frames fed so far
+        self.onset = None          # capture frame where the played signal starts
+        self.detection = None
+        self._pending = []         # chunks held until the chirp is found
+        self._pending_frames = 0
+        self._spans = None         # [(start, end)] in capture frames, per tone
+        self._carry = {}           # tone index -> frames left over from the last chunk
+        self._spectra = {}         # tone index -> summed power spectrum (bins, channels)
+        self._frames = {}          # tone index -> FFT frames summed
+        self.channels = None
+
+    def feed(self, chunk):
+        chunk = np.asarray(chunk, dtype=np.float64)
+        if chunk.ndim == 1:
+            chunk = chunk[:, None]
+        self.channels = chunk.shape[1]
+        if self.onset is None:
+            self._pending.append((self.position, chunk))
+            self._pending_frames += len(chunk)
+            self.position += len(chunk)
+            search = int((LATENCY_SEARCH_S + LEAD_S + CHIRP_S) * self.rate)
+            if self._pending_frames >= search:
+                self._locate()
+            return
+        self._accumulate(self.position, chunk)
+        self.position += len(chunk)
+
+    def _locate(self):
+        # Cross-correlate the start of the capture with the chirp through the FFT
+        pending, self._pending = self._pending, []
+        start = pending[0][0]
+        capture = np.concatenate([chunk for _, chunk in pending]).mean(axis=1)
+        if len(capture) < len(self.chirp):
+            self.detection = 0.0
+            return
+        size = 1 << (len(capture) + len(self.chirp)).bit_length()
+        correlation = np.fft.irfft(np.fft.rfft(capture, size) * np.conj(np.fft.rfft(self.chirp, size)), size)
+        correlation = np.abs(correlation[:len(capture) - len(self.chirp) + 1])
+        peak = int(np.argmax(correlation))
+        self.detection = float(correlation[peak] / (np.median(correlation) + 1e-12))
+        self.onset = start + peak - int(LEAD_S * self.rate)
+        tone_frames = int(TONE_S * self.rate)
+        guard = int(GUARD_S * self.rate)
+        self._spans = [(self.onset + tone_start(self.plan, index, self.rate) + guard,
+                        self.onset + tone_start(self.plan, index, self.rate) + tone_frames - guard)
+                       for index in range(len(self.plan))]
+        for position, chunk in pending:
+            self._accumulate(position, chunk)
+
+    def _accumulate(self, position, chunk):
+        end = position + len(chunk)
+        for index, (span_start, span_end) in enumerate(self._spans):
+            if span_end <= position or span_start >= end:
+                continue
+            part = chunk[max(span_start - position, 0):min(span_end, end) - position]
+            carry = self._carry.get(index)
+            if carry is not None:
+                part = np.concatenate([carry, part])
+            frames = len(part) // FFT_SIZE
+            self._carry[index] = part[frames * FFT_SIZE:]
+            if not frames:
+                continue
+            # (frames, FFT_SIZE, channels) -> one batched FFT
+            blocks = part[:frames * FFT_SIZE].reshape(frames, FFT_SIZE, -1) * self.window[None, :, None]
+            power = (np.abs(np.fft.rfft(blocks, axis=1)) ** 2).sum(axis=0)
+            self._spectra[index] = self._spectra.get(index, 0) + power
+            self._frames[index] = self._frames.get(index, 0) + frames
+
+    def _level(self, spectrum, frequency, frames):
+        # dBFS of the strongest bin within +-2 bins of `frequency`, per channel
+        bin_ = frequency * FFT_SIZE / self.rate
+        low, high = max(int(bin_) - 2, 0), min(int(bin_) + 3, spectrum.shape[0])
+        if low >= high:
+            return np.full(spectrum.shape[1], -np.inf)
+        peak = spectrum[low:high].max(axis=0) / frames
+        # A full-scale sine gives (FFT_SIZE * mean(window) / 2) ** 2 in its bin
+        reference = (FFT_SIZE * self.window.mean() / 2) ** 2
+        return 10 * np.log10(peak / reference + 1e-20)
+
+    def finish(self):
+        if self.onset is None and self._pending:
+            self._locate()
+        report = {
+            "rate": self.rate,
+            "channels": self.channels,
+            "detection": self.detection,
+            "heard": self.detection is not None and self.detection >= DETECTION_RATIO,
+            "latency_ms": (self.onset / self.rate - self.offset_s) * 1000 if self.onset is not None else None,
+            "tones": [],
+        }
+        for index, tone in enumerate(self.plan):
+            frames = self._frames.get(index)
+            if not frames:
+                report["tones"].append({"name": tone.name, "frequency": tone.frequency, "level_db": None})
+                continue
+            spectrum = self._spectra[index]
+            entry = {"name": tone.name, "frequency": tone.frequency,
+                     "level_db": [round(float(level), 2) for level in self._level(spectrum, tone.frequency, frames)]}
+            if tone.frequency == 1000 and all(tone.channels):
+                fundamental = 10 ** (self._level(spectrum, tone.frequency, frames) / 20)
+                harmonics = np.array([10 ** (self._level(spectrum, tone.frequency * k, frames) / 20)
+                                      for k in range(2, HARMONICS + 1) if tone.frequency * k < self.rate / 2])
+                thd = np.sqrt((harmonics ** 2).sum(axis=0)) / fundamental * 100
+                entry["thd_percent"] = [round(float(value), 3) for value in thd]
+            report["tones"].append(entry)
+        report.update(_summarize(report))
+        return report
+
+
+def _summarize(report):
+    tones = {tone["name"]: tone for tone in report["tones"]}
+    summary = {"response_db": {}, "thd_percent": None, "swapped": None, "separation_db": None,
+               "channel_drop_db": None}
+    reference = tones.get("1000 Hz", {}).get("level_db")
+    if reference:
+        reference_level = max(reference)
+        for tone in report["tones"]:
+            if all(tone.get("level_db") or [None]) and tone["name"].endswith(" Hz"):
+                summary["response_db"][str(tone["frequency"])] = round(max(tone["level_db"]) - reference_level, 2)
+        if "thd_percent" in tones["1000 Hz"]:
+            # A capture channel that barely hears the tone only has noise to measure
+            summary["thd_percent"] = max(thd for thd, level in zip(tones["1000 Hz"]["thd_percent"], reference)
+                                         if level >= reference_level - MAX_CHANNEL_DROP_DB)
+    left, right = tones.get("left", {}).get("level_db"), tones.get("right", {}).get("level_db")
+    if left and right and len(left) == 2:
+        # Played left: left channel louder unless swapped; and the other way round
+        straight = (left[0] - left[1]) + (right[1] - right[0])
+        summary["swapped"] = straight < 0
+        summary["separation_db"] = round(abs(straight) / 2, 2)
+    if left and right and reference:
+        # Loudest channel, so a swap or a mono microphone doesn't hide a dead speaker
+        summary["channel_drop_db"] = {"left": round(max(reference) - max(left), 2),
+                                      "right": round(max(reference) - max(right), 2)}
+    return summary
+
+
+def grade(report):
+    # Returns (status, [problems])
+    if not report["heard"]:
+        return FAIL, ["the test signal was not heard in the capture"]
+    problems, status = [], PASS
+    dead = [channel for channel, drop in (report.get("channel_drop_db") or {}).items() if drop > MAX_CHANNEL_DROP_DB]
+    for channel in dead:
+        drop = report["channel_drop_db"][channel]
+        problems.append(f"the {channel} speaker alone is {drop:.1f} dB below both; is it dead or unplugged?")
+        status = FAIL
+    # With a speaker silent, left against right compares a tone with noise
+    if not dead and report["swapped"]:
+        problems.append("left and right channels are swapped")
+        status = FAIL
+    elif not dead and report["separation_db"] is not None and report["separation_db"] < MIN_SEPARATION_DB:
+        problems.append(f"only {report['separation_db']:.1f} dB between channels")
+        status = WARN
+    low, high = GRADED_BAND
+    for frequency, deviation in report["response_db"].items():
+        if low <= float(frequency) <= high and abs(deviation) > MAX_DEVIATION_DB:
+            problems.append(f"{frequency} Hz is {deviation:+.1f} dB from 1 kHz")
+            status = WARN if status == PASS else status
+    if report["thd_percent"] is not None and report["thd_percent"] > MAX_THD_PERCENT:
+        problems.append(f"THD {report['thd_percent']:.1f}% at 1 kHz")
+        status = WARN if status == PASS else status
+    return status, problems
+
+
+def iter_wav(path, chunk_frames=CHUNK_FRAMES):
+    # Float frames (n, channels) from a 16-bit WAV file, a chunk at a time
+    with wave.open(path, "rb") as f:
+        if f.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit WAV files are supported")
+        channels = f.getnchannels()
+        while data := f.readframes(chunk_frames):
+            yield np.frombuffer(data, dtype="<i2").reshape(-1, channels) / 32768.0
+
+
+def analyze_wav(path, plan=None, offset_s=0.0):
+    with wave.open(path, "rb") as f:
+        rate = f.getframerate()
+    analyzer = LoopbackAnalyzer(plan or default_plan(), rate, offset_s)
+    for chunk in iter_wav(path):
+        analyzer.feed(chunk)
+    return analyzer.finish()
+
+
+def run_loopback(playback_device=None, capture_device=None, plan=None, rate=RATE):
+    # Records with arecord to a pipe and analyses as the capture arrives
+    if shutil.which("aplay") is None or shutil.which("arecord") is None:
+        raise FileNotFoundError("aplay and arecord are needed (alsa-utils)")
+    plan = plan or default_plan()
+    signal = render(plan, rate)
+    seconds = math.ceil(len(signal) / rate + TAIL_S + LATENCY_SEARCH_S)
+    fd, path = tempfile.mkstemp(suffix=".wav", prefix="hwcheck-loopback-")
+    os.close(fd)
+    record = ["arecord", "-q", "-t", "raw", "-f", "S16_LE", "-r", str(rate), "-c", str(CHANNELS), "-d", str(seconds)]
+    play = ["aplay", "-q"]
+    if capture_device:
+        record += ["-D", capture_device]
+    if playback_device:
+        play += ["-D", playback_device]
+    try:
+        write_wav(path, signal, rate)
+        recorder = subprocess.Popen(record, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        record_started = time.monotonic()
+        player = subprocess.Popen(play + [path], stderr=subprocess.PIPE)
+        # The latency includes however long aplay took to start after arecord,
+        # which this can only estimate from the spawn times
+        analyzer = LoopbackAnalyzer(plan, rate, time.monotonic() - record_started)
+        frame_bytes = 2 * CHANNELS
+        leftover = b""
+        while data := recorder.stdout.read(CHUNK_FRAMES * frame_bytes):
+            data = leftover + data
+            usable = len(data) - len(data) % frame_bytes
+            leftover = data[usable:]
+            analyzer.feed(np.frombuffer(data[:usable], dtype="<i2").reshape(-1, CHANNELS) / 32768.0)
+        player.wait()
+        if recorder.wait() != 0:
+            raise OSError(f"arecord failed: {recorder.stderr.read().decode(errors='replace').strip()}")
+        if player.returncode != 0:
+            raise OSError(f"aplay failed: {player.stderr.read().decode(errors='replace').strip()}")
+    finally:
+        os.remove(path)
+    return analyzer.finish()
+
+
+def format_report(report):
+    if not report["heard"]:
+        return "Audio loopback: the test signal was not heard. Check the volume, mute switches and the cable.\n"
+    lines = [f"Audio loopback: latency {report['latency_ms']:.1f} ms, {report['channels']} capture channel(s)"]
+    response = ", ".join(f"{frequency} Hz {deviation:+.1f} dB" for frequency, deviation in report["response_db"].items())
+    lines.append(f"  Response (relative to 1 kHz): {response}")
+    if report["thd_percent"] is not None:
+        lines.append(f"  THD at 1 kHz: {report['thd_percent']:.2f}%")
+    if report["swapped"] is not None:
+        lines.append(f"  Channels: {'SWAPPED' if report['swapped'] else 'correct'}, "
+                     f"separation {report['separation_db']:.1f} dB")
+    else:
+        lines.append("  Channels: order not checked (mono capture)")
+    if report.get("channel_drop_db"):
+        drop = report["channel_drop_db"]
+        lines.append(f"  Speakers alone against both: left {-drop['left']:+.1f} dB, right {-drop['right']:+.1f} dB")
+    _, problems = grade(report)
+    lines.extend(f"  PROBLEM: {problem}" for problem in problems)
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play a test signal, record it back and analyse the capture.")
+    parser.add_argument("--playback-device", help="ALSA device for aplay, e.g. hw:0,0")
+    parser.add_argument("--capture-device", help="ALSA device for arecord")
+    parser.add_argument("--analyze", metavar="WAV", help="analyse a recorded capture instead of playing")
+    parser.add_argument("--offset-ms", type=float, default=0.0, help="with --analyze: when playback started")
+    parser.add_argument("--write-signal", metavar="WAV", help="write the test signal and exit")
+    parser.add_argument("--synthesize", metavar="WAV", help="write a simulated capture and exit")
+    parser.add_argument("--delay-ms", type=float, default=20.0, help="with --synthesize")
+    parser.add_argument("--swap", action="store_true", help="with --synthesize")
+    parser.add_argument("--distortion", type=float, default=0.0, help="with --synthesize: cubic term")
+    parser.add_argument("--mono", action="store_true", help="with --synthesize")
+    parser.add_argument("--mute", choices=["left", "right"], help="with --synthesize: a dead speaker")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    plan = default_plan()
+    if args.write_signal:
+        write_wav(args.write_signal, render(plan))
+        return
+    if args.synthesize:
+        write_wav(args.synthesize, synthesize_capture(plan, delay_s=args.delay_ms / 1000, swap=args.swap,
+                                                      distortion=args.distortion, mono=args.mono,
+                                                      muted=args.mute))
+        return
+    if args.analyze:
+        report = analyze_wav(args.analyze, plan, args.offset_ms / 1000)
+    else:
+        report = run_loopback(args.playback_device, args.capture_device, plan)
+    if args.json:
+        print(json.dumps(report))
+    else:
+        sys.stdout.write(format_report(report))
+    sys.exit(0 if grade(report)[0] == PASS else 1)
+
+if __name__ == "__main__":
+    main()
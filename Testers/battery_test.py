@@ -0,0 +1,194 @@
+import argparse
+import json
+import sys
+import time
+
+from collectors import read_batteries, SYSFS_ROOT
+from cpu_stress import CpuLoad
+from stats import LinearFit
+
+# Timed battery discharge test. With the charger unplugged, every core is
+# kept busy by a fixed hashing load while energy, percentage, energy-rate and
+# voltage are sampled. Straight lines are fitted to energy and percentage as
+# the samples arrive: the energy slope is the real discharge rate, and energy
+# per percent gives the effective capacity independent of what the fuel
+# gauge claims as energy-full. The test stops as soon as both estimates are
+# within the requested 95% confidence bound.
+
+INTERVAL = 10.0           # seconds between samples
+MIN_DURATION = 120.0      # don't trust a fit over less than this
+MAX_DURATION = 600.0
+TARGET_ERROR = 0.05       # stop when the 95% interval is within +/-5%
+
+
+def _total(batteries, attr):
+    values = [getattr(battery, attr) for battery in batteries if getattr(battery, attr) is not None]
+    return sum(values) if values else None
+
+
+class DischargeEstimator:
+    def __init__(self):
+        self.energy = LinearFit()      # Wh over hours
+        self.percentage = LinearFit()  # % over hours
+        self.samples = []
+        self.energy_full = None
+        self.energy_full_design = None
+
+    def add(self, hours, batteries):
+        energy = _total(batteries, "energy")
+        # With several batteries, weight each percentage by its full energy
+        full = _total(batteries, "energy_full")
+        if full:
+            percentage = sum((battery.percentage or 0) * (battery.energy_full or 0) for battery in batteries) / full
+        else:
+            percentage = _total(batteries, "percentage")
+        self.energy_full = full
+        self.energy_full_design = _total(batteries, "energy_full_design")
+        sample = {
+            "t": hours * 3600,
+            "energy": energy,
+            "percentage": percentage,
+            "energy_rate": _total(batteries, "energy_rate"),
+            "voltage": batteries[0].voltage if batteries else None,
+        }
+        self.samples.append(sample)
+        if energy is not None:
+            self.energy.add(hours, energy)
+        if percentage is not None:
+            self.percentage.add(hours, percentage)
+
+    def estimate(self):
+        estimate = {"samples": len(self.samples)}
+        slope, interval = self.energy.slope, self.energy.slope_interval()
+        if slope is None or slope >= 0:
+            return estimate
+        rate = -slope
+        estimate["discharge_w"] = rate
+        estimate["discharge_error"] = interval / rate if interval is not None else None
+        reported = [s["energy_rate"] for s in self.samples if s["energy_rate"] is not None]
+        estimate["reported_w"] = sum(reported) / len(reported) if reported else None
+
+        # Until the percentage has moved, only the gauge's energy-full is known; it
+        # has no error bound, so the test can't stop on it
+        capacity, capacity_error, source = self.energy_full, None, "gauge"
+        percent_slope, percent_interval = self.percentage.slope, self.percentage.slope_interval()
+        if percent_slope is not None and percent_slope < 0 and percent_interval is not None \
+                and estimate["discharge_error"] is not None:
+            # Wh used per percent of charge, scaled to 100%
+            capacity = rate / -percent_slope * 100
+            capacity_error = (estimate["discharge_error"] ** 2 + (percent_interval / -percent_slope) ** 2) ** 0.5
+            source = "measured"
+        estimate["capacity_wh"] = capacity
+        estimate["capacity_error"] = capacity_error
+        estimate["capacity_source"] = source
+        if capacity is not None:
+            estimate["runtime_h"] = capacity / rate
+            if self.energy_full_design:
+                estimate["health"] = capacity / self.energy_full_design * 100
+        energy_now = self.samples[-1]["energy"]
+        if energy_now is not None:
+            estimate["remaining_h"] = energy_now / rate
+        return estimate
+
+    def converged(self, target=TARGET_ERROR):
+        estimate = self.estimate()
+        errors = (estimate.get("discharge_error"), estimate.get("capacity_error"))
+        return all(error is not None and error <= target for error in errors)
+
+
+def run_discharge_test(interval=INTERVAL, min_duration=MIN_DURATION, max_duration=MAX_DURATION,
+                       target=TARGET_ERROR, workers=None, sysfs_root=SYSFS_ROOT, progress=None):
+    batteries = read_batteries(sysfs_root)
+    if not batteries:
+        raise RuntimeError("no battery found")
+    if not any((battery.status or "").lower() == "discharging" for battery in batteries):
+        raise RuntimeError("battery is not discharging; unplug the charger first")
+
+    estimator = DischargeEstimator()
+    stopped = "max_duration"
+    with CpuLoad(workers):
+        start = time.monotonic()
+        while True:
+            elapsed = time.monotonic() - start
+            batteries = read_batteries(sysfs_root)
+            if not any((battery.status or "").lower() == "discharging" for battery in batteries):
+                stopped = "charger_connected"
+                break
+            estimator.add(elapsed / 3600, batteries)
+            if progress is not None:
+                progress(elapsed, estimator.estimate())
+            if elapsed >= min_duration and estimator.converged(target):
+                stopped = "converged"
+                break
+            if elapsed + interval > max_duration:
+                break
+            time.sleep(max(start + len(estimator.samples) * interval - time.monotonic(), 0))
+    report = estimator.estimate()
+    report.update({
+        "duration": time.monotonic() - start,
+        "stopped": stopped,
+        "energy_full": estimator.energy_full,
+        "energy_full_design": estimator.energy_full_design,
+        "samples_detail": estimator.samples,
+    })
+    return report
+
+
+def _percent(error):
+    return f"+/-{error * 100:.1f}%" if error is not None else "n/a"
+
+
+def format_report(report):
+    lines = [f"Battery discharge test: {report['samples']} samples over {report['duration'] / 60:.1f} min "
+             f"(stopped: {report['stopped']})"]
+    if "discharge_w" not in report:
+        lines.append("Not enough discharge to estimate; run longer.")
+        return "\n".join(lines) + "\n"
+    reported = f", fuel gauge reports {report['reported_w']:.2f} W" if report.get("reported_w") else ""
+    lines.append(f"Discharge rate under load: {report['discharge_w']:.2f} W ({_percent(report['discharge_error'])}){reported}")
+    if report.get("capacity_wh") is not None:
+        if report.get("capacity_source") == "measured":
+            lines.append(f"Effective capacity: {report['capacity_wh']:.1f} Wh ({_percent(report['capacity_error'])}), "
+                         f"gauge energy-full {report['energy_full'] or 0:.1f} Wh, "
+                         f"design {report['energy_full_design'] or 0:.1f} Wh")
+        else:
+            lines.append(f"Capacity from the fuel gauge (percentage didn't drop enough to measure): "
+                         f"{report['capacity_wh']:.1f} Wh, design {report['energy_full_design'] or 0:.1f} Wh")
+        lines.append(f"Estimated runtime from full under this load: {report['runtime_h'] * 60:.0f} min")
+    if report.get("health") is not None:
+        gauge = " (fuel gauge)" if report.get("capacity_source") != "measured" else ""
+        lines.append(f"Health vs design{gauge}: {report['health']:.1f}%")
+    if report.get("remaining_h") is not None:
+        lines.append(f"Remaining at this load: {report['remaining_h'] * 60:.0f} min")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estimate battery capacity and runtime from a timed discharge under load.")
+    parser.add_argument("--interval", type=float, default=INTERVAL, help="seconds between samples")
+    parser.add_argument("--min-duration", type=float, default=MIN_DURATION, help="seconds")
+    parser.add_argument("--max-duration", type=float, default=MAX_DURATION, help="seconds")
+    parser.add_argument("--target", type=float, default=TARGET_ERROR,
+                        help="stop once the 95%% interval is within this relative error")
+    parser.add_argument("--workers", type=int, help="load processes (default: one per core)")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    def progress(elapsed, estimate):
+        if "discharge_w" in estimate and not args.json:
+            print(f"{elapsed:6.0f} s  {estimate['discharge_w']:.2f} W {_percent(estimate['discharge_error'])}",
+                  file=sys.stderr)
+
+    try:
+        report = run_discharge_test(args.interval, args.min_duration, args.max_duration, args.target,
+                                    args.workers, progress=progress)
+    except RuntimeError as e:
+        print(f"Battery discharge test failed: {e}", file=sys.stderr)
+        sys.exit(2)
+    if args.json:
+        print(json.dumps(report))
+    else:
+        sys.stdout.write(format_report(report))
+
+if __name__ == "__main__":
+    main()
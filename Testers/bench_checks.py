@@ -0,0 +1,253 @@
+import argparse
+import contextlib
+import functools
+import json
+import os
+import shutil
+import socket
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import namedtuple
+from unittest import mock
+
+import checks
+import inventory
+from collectors import read_batteries, read_meminfo, Filesystem
+from registry import PROFILES, REGISTRY
+from results import render_report
+
+# Benchmarks for the checks themselves. Every check runs against a recorded
+# fixture instead of the machine: psutil answers from the fixture, the sysfs,
+# procfs and /dev readers are pointed at a copy of the recorded files, and
+# xev/xinput are replaced by scripts that print recorded output. Timings then
+# measure our code, not the hardware (check_cpu's one-second sample returns at
+# once). Latency is the median of several runs; a separate traced run counts
+# allocations. Results are compared with a stored baseline and the run fails
+# when a check got slower or hungrier by more than the threshold.
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_fixtures")
+BASELINE_FILE = os.environ.get("HARDWARE_CHECK_BENCH_BASELINE", "bench_baseline.json")
+
+# Checks worth benchmarking: the Tk trackpad test needs a display and the
+# burn-in checks are slow by design
+CHECKS = ("ram", "storage", "battery", "cpu", "network", "audio", "ports", "keyboard", "pointer")
+REPORTS = ("standard", "report")  # whole profiles, scheduled and rendered like generate_report()
+RUNS = 20
+THRESHOLD = 0.25     # fraction over the baseline that counts as a regression
+MIN_DELTA_MS = 0.5   # ...as long as it is also more than this, so sub-millisecond noise doesn't fail a run
+
+# psutil hands back namedtuples; the checks only use attributes and repr()
+Snic = namedtuple("snic", ["family", "address"])
+
+
+def load_fixture(name):
+    path = name if os.path.exists(name) else os.path.join(FIXTURE_DIR, f"{name}.json")
+    with open(path) as f:
+        return json.load(f)
+
+
+def available_fixtures():
+    return sorted(name[:-len(".json")] for name in os.listdir(FIXTURE_DIR) if name.endswith(".json"))
+
+
+def _build_tree(fixture, root):
+    for relative, content in fixture.get("files", {}).items():
+        path = os.path.join(root, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+    for relative, target in fixture.get("symlinks", {}).items():
+        path = os.path.join(root, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.symlink(target, path)
+    # Every /dev node the fixture lists is an empty file; the checks only list names
+    os.makedirs(os.path.join(root, "dev"), exist_ok=True)
+    for name in fixture.get("dev", ()):
+        open(os.path.join(root, "dev", name), "w").close()
+    bin_dir = os.path.join(root, "bin")
+    os.makedirs(bin_dir)
+    for command, output in fixture.get("commands", {}).items():
+        with open(os.path.join(bin_dir, f"{command}.out"), "w") as f:
+            f.write(output)
+        script = os.path.join(bin_dir, command)
+        with open(script, "w") as f:
+            f.write(f"#!/bin/sh\nexec cat '{script}.out'\n")
+        os.chmod(script, 0o755)
+    return bin_dir
+
+
+def _namedtuple(name, values):
+    return namedtuple(name, values)(**values)
+
+
+@contextlib.contextmanager
+def replaying(fixture):
+    # Patches everything the checks read so they see the fixture, then restores it
+    import psutil
+    recorded = fixture["psutil"]
+    with tempfile.TemporaryDirectory(prefix="bench-") as root, contextlib.ExitStack() as stack:
+        bin_dir = _build_tree(fixture, root)
+        sysfs, procfs, dev = (os.path.join(root, part) for part in ("sys", "proc", "dev"))
+        addrs = {interface: [Snic(socket.AddressFamily[family], address) for family, address in entries]
+                 for interface, entries in recorded["net_if_addrs"].items()}
+        stack.enter_context(mock.patch.object(
+            psutil, "cpu_times_percent", lambda interval=None, percpu=False: _namedtuple("scputimes", recorded["cpu_times_percent"])))
+        stack.enter_context(mock.patch.object(psutil, "net_if_addrs", lambda: addrs))
+        disk = fixture["disk_usage"]
+        stack.enter_context(mock.patch.object(
+            shutil, "disk_usage", lambda path: _namedtuple("usage", disk)))
+        stack.enter_context(mock.patch.object(checks, "read_batteries", functools.partial(read_batteries, sysfs)))
+        stack.enter_context(mock.patch.object(checks, "read_meminfo", functools.partial(read_meminfo, procfs)))
+        filesystems = [Filesystem(**entry) for entry in fixture.get("filesystems", ())]
+        stack.enter_context(mock.patch.object(checks, "read_filesystems", lambda: filesystems))
+        # A snapshot taken on the first run, so later runs measure the usual "no changes" path
+        stack.enter_context(mock.patch.object(inventory, "_cache", None))
+        stack.enter_context(mock.patch.object(inventory, "SNAPSHOT_FILE", os.path.join(root, "inventory.json")))
+        stack.enter_context(mock.patch.object(
+            inventory, "InventoryCache", functools.partial(inventory.InventoryCache, sysfs_root=sysfs,
+                                                            procfs_root=procfs, dev_root=dev)))
+        stack.enter_context(mock.patch.dict(os.environ, {"PATH": bin_dir + os.pathsep + os.environ.get("PATH", "")}))
+        yield
+
+
+def _fresh_inventory():
+    # Each run starts from the stored snapshot, like a new process on the station
+    inventory._cache = None
+    inventory._cache = inventory.InventoryCache(inventory.SNAPSHOT_FILE)
+
+
+def _run_check(name):
+    _fresh_inventory()
+    return REGISTRY[name].load()()
+
+
+def _run_report(profile):
+    from check_runner import run_scheduled
+    _fresh_inventory()
+    specs = [REGISTRY[name] for name in PROFILES[profile]]
+    results, _ = run_scheduled(specs)
+    return render_report(results)
+
+
+def measure(function, argument, runs):
+    function(argument)  # warm-up: imports, the first inventory snapshot
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function(argument)
+        latencies.append((time.perf_counter() - start) * 1000)
+    # Allocations from one traced run: blocks allocated and still alive when
+    # it returned, and the peak traced size
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    function(argument)
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+    return {
+        "median_ms": statistics.median(latencies),
+        "min_ms": min(latencies),
+        "max_ms": max(latencies),
+        "blocks": blocks,
+        "peak_kb": peak / 1024,
+    }
+
+
+def run_benchmarks(fixture, names=CHECKS, reports=REPORTS, runs=RUNS):
+    benchmarks = {}
+    with replaying(fixture):
+        for name in names:
+            if name in ("keyboard", "pointer") and not fixture.get("commands"):
+                continue
+            benchmarks[name] = measure(_run_check, name, runs)
+        for profile in reports:
+            benchmarks[f"report:{profile}"] = measure(_run_report, profile, runs)
+    return benchmarks
+
+
+def compare(benchmarks, baseline, threshold=THRESHOLD, min_delta_ms=MIN_DELTA_MS):
+    # Returns {name: [reason, ...]} for every benchmark that regressed
+    regressions = {}
+    for name, current in benchmarks.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        reasons = []
+        delta = current["median_ms"] - previous["median_ms"]
+        if delta > previous["median_ms"] * threshold and delta > min_delta_ms:
+            reasons.append(f"median {previous['median_ms']:.2f} -> {current['median_ms']:.2f} ms")
+        if current["peak_kb"] > previous["peak_kb"] * (1 + threshold) + 64:
+            reasons.append(f"peak {previous['peak_kb']:.0f} -> {current['peak_kb']:.0f} KiB")
+        if reasons:
+            regressions[name] = reasons
+    return regressions
+
+
+def load_baseline(path, fixture_name):
+    try:
+        with open(path) as f:
+            return json.load(f).get(fixture_name, {})
+    except (OSError, ValueError):
+        return {}
+
+
+def save_baseline(path, fixture_name, benchmarks):
+    # One file holds the baselines of every fixture
+    try:
+        with open(path) as f:
+            stored = json.load(f)
+    except (OSError, ValueError):
+        stored = {}
+    stored[fixture_name] = benchmarks
+    with open(path, "w") as f:
+        json.dump(stored, f, indent=1, sort_keys=True)
+
+
+def format_report(fixture_name, benchmarks, baseline, regressions):
+    lines = [f"Fixture {fixture_name}:",
+             f"  {'benchmark':<18} {'median':>9} {'min':>9} {'max':>9} {'blocks':>7} {'peak':>9} {'baseline':>9}"]
+    for name, entry in benchmarks.items():
+        previous = baseline.get(name)
+        base = f"{previous['median_ms']:>6.2f} ms" if previous else "        -"
+        lines.append(f"  {name:<18} {entry['median_ms']:>6.2f} ms {entry['min_ms']:>6.2f} ms "
+                     f"{entry['max_ms']:>6.2f} ms {entry['blocks']:>7} {entry['peak_kb']:>5.0f} KiB {base}"
+                     + ("  REGRESSED" if name in regressions else ""))
+    for name, reasons in regressions.items():
+        lines.append(f"REGRESSION {name}: {'; '.join(reasons)}")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the checks against recorded fixtures.")
+    parser.add_argument("fixtures", nargs="*", help=f"fixture names or paths (default: all in {FIXTURE_DIR})")
+    parser.add_argument("--checks", help="comma-separated checks (default: all that can replay)")
+    parser.add_argument("--runs", type=int, default=RUNS)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="allowed slowdown, e.g. 0.25 for 25%%")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    names = args.checks.split(",") if args.checks else CHECKS
+    report, failed = {}, False
+    for fixture_name in args.fixtures or available_fixtures():
+        benchmarks = run_benchmarks(load_fixture(fixture_name), names, () if args.checks else REPORTS, args.runs)
+        baseline = load_baseline(args.baseline, fixture_name)
+        regressions = {} if args.save_baseline else compare(benchmarks, baseline, args.threshold)
+        failed = failed or bool(regressions)
+        if args.save_baseline:
+            save_baseline(args.baseline, fixture_name, benchmarks)
+        report[fixture_name] = {"benchmarks": benchmarks, "regressions": regressions}
+        if not args.json:
+            sys.stdout.write(format_report(fixture_name, benchmarks, baseline, regressions))
+    if args.json:
+        print(json.dumps(report))
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+from checks import check, battery_grade
+from results import WARN, FAIL, ERROR
+from cpu_stress import run_stress, format_report as format_stress_report
+from ram_test import run_memory_test, format_report as format_memory_report
+from storage_bench import benchmark_partitions, format_results as format_storage_results
+from battery_test import run_discharge_test, format_report as format_discharge_report
+from surface_scan import list_block_devices, scan_targets, format_report as format_scan_report
+
+# The long-running tests wrapped as checks for the full burn-in profile. The
+# per-sample series stay out of the results; each tool's own --json output
+# has them.
+
+STRESS_DURATION = 60.0
+MEMORY_FRACTION = 0.5
+MEMORY_BUDGET = 80.0    # registry.py costs memory_test at 90 s; the rest allocates and frees the buffers
+BENCH_SIZE = 256 * 1024 * 1024
+
+
+@check("cpu_stress", "run the CPU stress test")
+def check_cpu_stress(result):
+    report = run_stress(STRESS_DURATION)
+    report.pop("samples")
+    result.metrics = report
+    if report["throttling"]:
+        result.status = FAIL
+    result.message = format_stress_report(report).rstrip("\n")
+
+
+@check("memory_test", "run the memory test")
+def check_memory_test(result):
+    report = run_memory_test(MEMORY_FRACTION, budget=MEMORY_BUDGET)
+    report.pop("workers_detail")
+    result.metrics = report
+    if report["total_errors"]:
+        result.status = FAIL
+    result.message = format_memory_report({**report, "workers_detail": []}).rstrip("\n")
+
+
+@check("storage_bench", "run the storage benchmark")
+def check_storage_bench(result):
+    partitions = benchmark_partitions(BENCH_SIZE)
+    result.metrics = {"partitions": partitions}
+    if any("error" in entry for entry in partitions):
+        result.status = ERROR
+    elif all("skipped" in entry for entry in partitions):
+        result.status = WARN
+    result.message = format_storage_results(partitions).rstrip("\n")
+
+
+@check("surface_scan", "scan the drive surfaces")
+def check_surface_scan(result):
+    devices = list_block_devices()
+    scans = scan_targets(devices)
+    result.metrics = {"targets": scans}
+    if not devices:
+        result.status = WARN
+        result.message = "No block devices found."
+        return
+    if any("error" in entry for entry in scans):
+        result.status = ERROR
+    elif any(entry["unreadable"] for entry in scans):
+        result.status = FAIL
+    elif any(entry["slow"] for entry in scans):
+        result.status = WARN
+    result.message = format_scan_report(scans).rstrip("\n")
+
+
+@check("battery_discharge", "run the battery discharge test")
+def check_battery_discharge(result):
+    report = run_discharge_test()
+    report.pop("samples_detail")
+    result.metrics = report
+    if report.get("health") is None or report["stopped"] != "converged":
+        result.status = WARN
+    else:
+        report["grade"] = battery_grade(report["health"])
+        if report["grade"] == "Bad":
+            result.status = FAIL
+        elif report["grade"] == "Okay":
+            result.status = WARN
+    result.message = format_discharge_report(report).rstrip("\n")
@@ -1,25 +1,34 @@
-import psutil
+from collectors import read_batteries
 
 def get_battery_info():
-    battery = psutil.sensors_battery()
-    if battery is None:
+    batteries = read_batteries()
+    if not batteries:
         return "Battery information not available"
-    
-    percent = battery.percent
-    max_capacity = battery.max
-    
-    health = (percent / max_capacity) * 100
-    
-    if health >= 80:
-        health_status = "Healthy"
-    elif health >= 60:
-        health_status = "Fair"
-    elif health >= 40:
-        health_status = "Poor"
-    else:
-        health_status = "Very Poor"
-    
-    return f"Battery Percentage: {percent}%\nMax Capacity: {max_capacity} mAh\nHealth: {health:.2f}% ({health_status})"
+
+    lines = []
+    for battery in batteries:
+        # Health is the full-charge energy against the design energy; the
+        # charge percentage says nothing about wear
+        health = battery.health
+        if health is None:
+            health_status = "Unknown"
+        elif health >= 80:
+            health_status = "Healthy"
+        elif health >= 60:
+            health_status = "Fair"
+        elif health >= 40:
+            health_status = "Poor"
+        else:
+            health_status = "Very Poor"
+
+        lines.append(f"{battery.name}:")
+        if battery.percentage is not None:
+            lines.append(f"Battery Percentage: {battery.percentage}%")
+        if battery.energy_full is not None:
+            lines.append(f"Full Capacity: {battery.energy_full:.1f} Wh (design {battery.energy_full_design or 0:.1f} Wh)")
+        lines.append(f"Health: {health:.2f}% ({health_status})" if health is not None else f"Health: {health_status}")
+    lines.append("Run battery_test.py on battery power for a measured capacity and runtime.")
+    return "\n".join(lines)
 
 if __name__ == "__main__":
     battery_info = get_battery_info()
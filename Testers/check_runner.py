@@ -0,0 +1,296 @@
+import logging
+import queue
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import tracing
+from registry import missing_requirements
+from results import CheckResult, PASS, WARN, ERROR, SKIP
+
+# Checks spend most of their time waiting: cpu_times_percent() sleeps for its
+# sampling interval and the others wait on child processes or the kernel.
+# A thread pool overlaps those waits without the cost of spawning processes.
+
+RunTiming = namedtuple("RunTiming", ["wall", "sequential", "saved"])
+
+# How often a waiting runner wakes up to notice a cancel request
+CANCEL_POLL_INTERVAL = 0.1
+
+
+def _timed(check, options=()):
+    start = time.perf_counter()
+    try:
+        output = check(**dict(options))
+    except Exception as e:
+        output = CheckResult(check.__name__, ERROR, message=f"Failed to run {check.__name__}: {e}")
+        logging.error(output.message)
+    return output, time.perf_counter() - start
+
+
+class Scheduler:
+    # Decides when each CheckSpec may start. Checks are tried longest critical
+    # path first (own cost plus the longest chain of checks waiting on it), so
+    # long checks start early and short ones fill the gaps. A check starts once
+    # its dependencies have finished, a worker is free and none of its
+    # exclusive resources is held by a running check.
+    def __init__(self, specs, max_workers=None):
+        self.max_workers = max_workers or len(specs) or 1
+        self.names = {spec.name for spec in specs}
+        dependents = {spec.name: [] for spec in specs}
+        for spec in specs:
+            for dependency in spec.depends:
+                if dependency in self.names:
+                    dependents[dependency].append(spec)
+        path = {}
+
+        def critical_path(spec):
+            if spec.name not in path:
+                path[spec.name] = spec.cost + max((critical_path(d) for d in dependents[spec.name]), default=0.0)
+            return path[spec.name]
+
+        self.order = sorted(specs, key=critical_path, reverse=True)
+        self.pending = list(self.order)
+        self.running = {}
+        self.finished = {}
+
+    @property
+    def done(self):
+        return not self.pending and not self.running
+
+    def start_ready(self):
+        # Returns [(spec, reason)] for checks to start now; reason is set when
+        # the check must be skipped because a dependency didn't pass
+        started = []
+        for spec in list(self.pending):
+            if len(self.running) >= self.max_workers:
+                break
+            if any(dependency not in self.finished for dependency in spec.depends if dependency in self.names):
+                continue
+            failed = [d for d in spec.depends if self.finished.get(d, PASS) not in (PASS, WARN)]
+            if not failed:
+                held = {resource for other in self.running.values() for resource in other.exclusive}
+                if held.intersection(spec.exclusive):
+                    continue
+            self.pending.remove(spec)
+            self.running[spec.name] = spec
+            started.append((spec, f"{', '.join(failed)} did not pass" if failed else None))
+        return started
+
+    def finish(self, spec, status):
+        del self.running[spec.name]
+        self.finished[spec.name] = status
+
+
+def estimate_wall(specs, max_workers=None):
+    # Simulated wall time if every check took its expected cost
+    scheduler = Scheduler(specs, max_workers)
+    now, ends = 0.0, {}
+    while not scheduler.done:
+        for spec, _ in scheduler.start_ready():
+            ends[spec.name] = now + spec.cost
+        name = min(scheduler.running, key=ends.get)
+        now = ends.pop(name)
+        scheduler.finish(scheduler.running[name], PASS)
+    return now
+
+
+def format_plan(specs, max_workers=None):
+    order = " ".join(spec.name for spec in Scheduler(specs, max_workers).order)
+    probes, skipped, runnable = {}, [], []
+    for spec in specs:
+        missing = missing_requirements(spec, probes)
+        if missing:
+            skipped.append(f"{spec.name} will be skipped: no {', '.join(missing)}")
+        else:
+            runnable.append(spec)
+    # Skipped checks take no time, so they are left out of both estimates
+    lines = [f"Start order: {order}",
+             f"Estimated wall time: {estimate_wall(runnable, max_workers):.1f} s "
+             f"(sequential: {sum(spec.cost for spec in runnable):.1f} s)"]
+    return "\n".join(lines + skipped) + "\n"
+
+
+def _timed_spec(spec):
+    try:
+        check = spec.load()
+    except Exception as e:
+        output = CheckResult(spec.name, ERROR, message=f"Failed to load {spec.name}: {e}")
+        logging.error(output.message)
+        return output, 0.0
+    return _timed(check, spec.options)
+
+
+def _skipped(name, reason):
+    tracing.record_skip(name)
+    return CheckResult(name, SKIP, message=f"Skipped {name}: {reason}.")
+
+
+def iter_scheduled(specs, max_workers=None, cancelled=None):
+    # Yields (index, output, duration) for each CheckSpec as soon as it
+    # finishes, starting them in Scheduler order. Checks whose required
+    # resources are missing are skipped; main-thread checks run on the calling
+    # thread once everything else ready to start has gone to the pool, so the
+    # pool keeps working meanwhile. Setting the `cancelled` event stops
+    # pending checks from starting; running ones finish in the background.
+    if not specs:
+        return
+    index_of = {spec.name: index for index, spec in enumerate(specs)}
+    scheduler = Scheduler(specs, max_workers)
+    probes = {}
+    pool = ThreadPoolExecutor(max_workers=scheduler.max_workers)
+    running = {}
+    try:
+        while not scheduler.done:
+            if cancelled is not None and cancelled.is_set():
+                return
+            main_thread = []
+            for spec, reason in scheduler.start_ready():
+                if reason is None:
+                    missing = missing_requirements(spec, probes)
+                    reason = f"no {', '.join(missing)}" if missing else None
+                if reason is not None:
+                    output = _skipped(spec.name, reason)
+                    scheduler.finish(spec, SKIP)
+                    yield index_of[spec.name], output, 0.0
+                elif spec.main_thread:
+                    main_thread.append(spec)
+                else:
+                    running[pool.submit(_timed_spec, spec)] = spec
+            for spec in main_thread:
+                output, duration = _timed_spec(spec)
+                scheduler.finish(spec, output.status)
+                yield index_of[spec.name], output, duration
+            if not running:
+                continue
+            done, _ = wait(running, timeout=CANCEL_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            for future in done:
+                spec = running.pop(future)
+                output, duration = future.result()
+                scheduler.finish(spec, output.status)
+                yield index_of[spec.name], output, duration
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def run_scheduled(specs, max_workers=None, on_result=None, cancelled=None):
+    # Results are returned in the order of `specs`, whatever order they ran in.
+    # on_result(index, output) is called as each check finishes; after a
+    # cancel, checks that never started are left as None.
+    outputs = [None] * len(specs)
+    sequential = 0.0
+    start = time.perf_counter()
+    for index, output, duration in iter_scheduled(specs, max_workers, cancelled):
+        outputs[index] = output
+        sequential += duration
+        if on_result is not None:
+            on_result(index, output)
+    wall = time.perf_counter() - start
+    return outputs, RunTiming(wall, sequential, max(sequential - wall, 0.0))
+
+
+def format_timing(timing):
+    return (f"Checks completed in {timing.wall:.2f} s "
+            f"(sequential: {timing.sequential:.2f} s, saved: {timing.saved:.2f} s)\n")
+
+
+class CheckWorker(threading.Thread):
+    # Runs a list of CheckSpecs off the Tk main thread. The GUI polls
+    # `messages` with after():
+    #   ("result", (index, output))  a check finished
+    #   ("done", timing)             every check finished
+    #   ("cancelled", None)          the run was cancelled
+    # Checks that need the main thread can't be run from here; they come back
+    # as SKIP results so the report says so.
+    def __init__(self, specs, max_workers=None):
+        super().__init__(daemon=True)
+        self.specs = list(specs)
+        self.max_workers = max_workers
+        self.messages = queue.Queue()
+        self.cancelled = threading.Event()
+
+    @property
+    def total(self):
+        return len(self.specs)
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def run(self):
+        background = []  # indexes into self.specs
+        for index, spec in enumerate(self.specs):
+            if spec.main_thread:
+                output = _skipped(spec.name, "it opens its own window, so it can't run in the background")
+                self.messages.put(("result", (index, output)))
+            else:
+                background.append(index)
+        _, timing = run_scheduled([self.specs[index] for index in background], self.max_workers,
+                                  lambda index, output: self.messages.put(("result", (background[index], output))),
+                                  self.cancelled)
+        if self.cancelled.is_set():
+            self.messages.put(("cancelled", None))
+            return
+        self.messages.put(("done", timing))
+
+    def drain(self):
+        while True:
+            try:
+                yield self.messages.get_nowait()
+            except queue.Empty:
+                return
+
+
+class CheckRunnerMixin:
+    # The run/poll/cancel cycle shared by the Tk apps. The app provides
+    # self.report (a report_view.ReportView), self.progress, self.run_button,
+    # self.cancel_button and self.worker = None, and calls start_checks().
+    # Nothing here imports tkinter until a run finishes, so headless users of
+    # this module don't pay for it.
+    POLL_INTERVAL_MS = 100
+    DONE_TITLE = "Checks Completed"
+    DONE_MESSAGE = "Hardware checks completed successfully."
+
+    def start_checks(self, specs):
+        if self.worker is not None:
+            return
+        self.worker = CheckWorker(specs)
+        # Rows keep the report in a fixed order while results stream in
+        self.report.reset(spec.name for spec in self.worker.specs)
+        self.progress.config(maximum=self.worker.total, value=0)
+        self.run_button.config(state="disabled")
+        self.cancel_button.config(state="normal")
+        self.worker.start()
+        self.after(self.POLL_INTERVAL_MS, self.poll_checks)
+
+    def poll_checks(self):
+        for kind, payload in self.worker.drain():
+            if kind == "result":
+                index, output = payload
+                self.report.set_result(index, output)
+                self.progress.config(value=self.progress["value"] + 1)
+            elif kind == "done":
+                from tkinter import messagebox
+                spans = tracing.drain()
+                self.report.add_note("timing", format_timing(payload) + tracing.format_breakdown(spans))
+                tracing.export(spans)
+                self.finish_checks()
+                messagebox.showinfo(self.DONE_TITLE, self.DONE_MESSAGE)
+                return
+            elif kind == "cancelled":
+                # The spans of a cancelled run would otherwise end up in the next run's exports
+                tracing.drain()
+                self.report.add_note("cancelled", "Checks cancelled.")
+                self.finish_checks()
+                return
+        self.after(self.POLL_INTERVAL_MS, self.poll_checks)
+
+    def cancel_checks(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            self.cancel_button.config(state="disabled")
+
+    def finish_checks(self):
+        self.worker = None
+        self.run_button.config(state="normal")
+        self.cancel_button.config(state="disabled")
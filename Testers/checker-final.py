@@ -1,136 +1,37 @@
-import subprocess
+import argparse
+import socket
+import sys
+import time
 import logging
-import psutil
-import shutil
 import tkinter as tk
-from tkinter import scrolledtext, messagebox
+from tkinter import ttk
+from log_setup import configure_logging
+from report_view import ReportView
+from check_runner import run_scheduled, format_timing, CheckRunnerMixin
+from registry import resolve, PROFILES
+from results import render_report, to_json, to_ndjson
+from collectors import read_machine_serial
+from fleet_upload import FleetUploader, build_records
 
 # Configure logging
-logging.basicConfig(filename='hardware_check.log', level=logging.INFO, 
-                    format='%(asctime)s %(levelname)s:%(message)s')
-
-# Functions to perform hardware checks
-def check_ram():
-    try:
-        ram_info = psutil.virtual_memory()
-        info = (f"RAM Information:\n"
-                f"Total: {ram_info.total / (1024**3):.2f} GB, "
-                f"Available: {ram_info.available / (1024**3):.2f} GB, "
-                f"Used: {ram_info.used / (1024**3):.2f} GB, "
-                f"Percentage: {ram_info.percent}%\n")
-        logging.info(f"RAM Information: {ram_info}")
-        return info
-    except Exception as e:
-        error_msg = f"Failed to check RAM: {e}\n"
-        logging.error(error_msg)
-        return error_msg
-
-def check_storage():
-    try:
-        total, used, free = shutil.disk_usage("/")
-        info = (f"Storage Information:\n"
-                f"Total: {total / (1024**3):.2f} GB, "
-                f"Used: {used / (1024**3):.2f} GB, "
-                f"Free: {free / (1024**3):.2f} GB\n")
-        logging.info(f"Storage Information: Total: {total}, Used: {used}, Free: {free}")
-        return info
-    except Exception as e:
-        error_msg = f"Failed to check storage: {e}\n"
-        logging.error(error_msg)
-        return error_msg
-
-def check_battery():
-    try:
-        battery_info = subprocess.check_output("upower -i /org/freedesktop/UPower/devices/battery_BAT0", shell=True).decode()
-        lines = battery_info.split('\n')
-        current_capacity = None
-        original_capacity = None
-        for line in lines:
-            if "energy-full:" in line:
-                current_capacity = float(line.split(':')[1].strip().split()[0])
-            elif "energy-full-design:" in line:
-                original_capacity = float(line.split(':')[1].strip().split()[0])
-        
-        if current_capacity is not None and original_capacity is not None:
-            health_percentage = (current_capacity / original_capacity) * 100
-            if health_percentage > 90:
-                health = "Ideal"
-            elif health_percentage > 80:
-                health = "Decent"
-            elif health_percentage > 70:
-                health = "Okay"
-            else:
-                health = "Bad"
-            health_info = f"Battery Health: {health} ({health_percentage:.2f}%)\n"
-        else:
-            health_info = "Battery health information not found.\n"
-
-        logging.info(f"Battery Information:\n{battery_info}")
-        return f"{health_info}"
-    except subprocess.CalledProcessError as e:
-        error_msg = f"Failed to check battery: {e}\n"
-        logging.error(error_msg)
-        return error_msg
-
-def check_cpu():
-    try:
-        cpu_info = psutil.cpu_times_percent(interval=1, percpu=False)
-        info = (f"CPU Information:\n"
-                f"User: {cpu_info.user}%, System: {cpu_info.system}%, Idle: {cpu_info.idle}%\n")
-        logging.info(f"CPU Information: {cpu_info}")
-        return info
-    except Exception as e:
-        error_msg = f"Failed to check CPU: {e}\n"
-        logging.error(error_msg)
-        return error_msg
-
-def check_network():
-    try:
-        network_info = psutil.net_if_addrs()
-        info = "Network Interfaces:\n"
-        for interface, addrs in network_info.items():
-            for addr in addrs:
-                info += f"{interface} - {addr.family.name} Address: {addr.address}\n"
-        logging.info(f"Network Information: {network_info}")
-        return info
-    except Exception as e:
-        error_msg = f"Failed to check network: {e}\n"
-        logging.error(error_msg)
-        return error_msg
-
-def check_audio():
-    try:
-        audio_info = subprocess.check_output("aplay -l", shell=True).decode()
-        logging.info(f"Audio Devices:\n{audio_info}")
-        return f"Audio Devices:\n{audio_info}\n"
-    except subprocess.CalledProcessError as e:
-        error_msg = f"Failed to check audio devices: {e}\n"
-        logging.error(error_msg)
-        return error_msg
-
-def get_ports():
-    try:
-        ports_info = subprocess.check_output("ls /dev", shell=True).decode()
-        logging.info(f"Available Ports:\n{ports_info}")
-        return f"Available Ports:\n{ports_info}\n"
-    except subprocess.CalledProcessError as e:
-        error_msg = f"Failed to get available ports: {e}\n"
-        logging.error(error_msg)
-        return error_msg
-
-def generate_report():
-    report = ""
-    report += check_battery()
-    report += check_storage()
-    report += check_ram()
-    report += check_cpu()
-    report += check_network()
-    report += check_audio()
-    report += get_ports()
-    return report
+configure_logging()
+
+REPORT_CHECKS = resolve("report")
+
+def collect_report(checks=REPORT_CHECKS):
+    results, timing = run_scheduled(checks)
+    logging.info(f"Report timing: {timing}")
+    return results, timing
+
+def generate_report(checks=REPORT_CHECKS):
+    results, timing = collect_report(checks)
+    return render_report(results, details=False) + format_timing(timing)
 
 # GUI Code
-class HardwareCheckApp(tk.Tk):
+class HardwareCheckApp(CheckRunnerMixin, tk.Tk):
+    DONE_TITLE = "Report Generated"
+    DONE_MESSAGE = "Hardware report generated successfully."
+
     def __init__(self):
         super().__init__()
         self.title("Hardware Check Tool")
@@ -143,16 +44,52 @@ class HardwareCheckApp(tk.Tk):
         self.run_button = tk.Button(self, text="Generate Report", command=self.generate_report)
         self.run_button.pack(pady=10)
 
-        self.output_text = scrolledtext.ScrolledText(self, wrap=tk.WORD)
-        self.output_text.pack(pady=10, fill=tk.BOTH, expand=True)
+        self.cancel_button = tk.Button(self, text="Cancel", command=self.cancel_checks, state=tk.DISABLED)
+        self.cancel_button.pack(pady=5)
+
+        self.progress = ttk.Progressbar(self, mode="determinate", length=300)
+        self.progress.pack(pady=5)
+        self.worker = None
+
+        self.report = ReportView(self, details=False)
+        self.report.pack(pady=10, fill=tk.BOTH, expand=True)
 
     def generate_report(self):
-        self.output_text.delete(1.0, tk.END)
-        self.output_text.insert(tk.INSERT, "Generating hardware report...\n")
-        report = generate_report()
-        self.output_text.insert(tk.INSERT, report)
-        messagebox.showinfo("Report Generated", "Hardware report generated successfully.")
+        self.start_checks(REPORT_CHECKS)
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a hardware check report.")
+    parser.add_argument("--format", choices=["gui", "text", "json", "ndjson"], default="gui",
+                        help="open the GUI (default) or print the report to stdout")
+    parser.add_argument("--upload", metavar="URL",
+                        help="send the results to a fleet collector, e.g. http://collector:8750/ingest")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="report",
+                        help="checks to run when printing or uploading")
+    args = parser.parse_args()
+
+    if args.format == "gui" and not args.upload:
+        app = HardwareCheckApp()
+        app.mainloop()
+        return
+
+    run_started = time.time()
+    results, timing = collect_report(resolve(args.profile))
+    if args.upload:
+        uploader = FleetUploader(args.upload)
+        try:
+            records = build_records(results, read_machine_serial() or socket.gethostname(),
+                                    socket.gethostname(), run_started)
+            print(f"Upload: {uploader.upload(records)}", file=sys.stderr)
+        finally:
+            uploader.close()
+        if args.format == "gui":
+            return
+    if args.format == "json":
+        print(to_json(results, timing))
+    elif args.format == "ndjson":
+        sys.stdout.write(to_ndjson(results))
+    else:
+        sys.stdout.write(render_report(results, details=False) + format_timing(timing))
 
 if __name__ == "__main__":
-    app = HardwareCheckApp()
-    app.mainloop()
+    main()
@@ -0,0 +1,212 @@
+import functools
+import logging
+import shutil
+import time
+from dataclasses import asdict
+
+import tracing
+from collectors import read_batteries, read_meminfo, read_filesystems, format_battery
+from inventory import inventory
+from results import CheckResult, WARN, FAIL, ERROR
+from log_setup import compact_mode, log_result
+
+# Hardware checks shared by the GUI and report scripts. Each check fills in a
+# CheckResult; turning it into text is left to results.render_text().
+#
+# psutil, the xev/xinput watcher and the Tk trackpad test are imported inside
+# the checks that use them, so a headless run only pays for what it runs and
+# works on images without tkinter.
+
+
+def check(name, action):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(**options):
+            result = CheckResult(name, started=time.time())
+            with tracing.span(name) as span:
+                try:
+                    func(result, **options)
+                except Exception as e:
+                    result.status = ERROR
+                    result.message = f"Failed to {action}: {e}"
+                    if not compact_mode():
+                        logging.error(result.message)
+                span.outcome = result.status
+            # The span times the check; one clock for the result and the trace
+            result.duration = span.duration
+            if compact_mode():
+                log_result(result)
+            return result
+        return wrapper
+    return decorator
+
+
+def _log_raw(message):
+    # The full dumps are left out of the log in compact mode
+    if not compact_mode():
+        logging.info(message)
+
+
+@check("ram", "check RAM")
+def check_ram(result):
+    memory = read_meminfo()
+    result.metrics = {
+        **asdict(memory),
+        "used": memory.used,
+        "percent": round(memory.used / memory.total * 100, 1),
+    }
+    _log_raw(f"RAM Information: {memory}")
+
+
+@check("storage", "check storage")
+def check_storage(result):
+    total, used, free = shutil.disk_usage("/")
+    # The root filesystem is graded; every other mount is reported like `df`
+    result.metrics = {"path": "/", "total": total, "used": used, "free": free,
+                      "filesystems": [asdict(filesystem) for filesystem in read_filesystems()]}
+    if free < total * 0.1:
+        result.status = WARN
+        result.message = "Less than 10% of the root filesystem is free."
+    _log_raw(f"Storage Information: Total: {total}, Used: {used}, Free: {free}")
+
+
+def battery_grade(health_percentage):
+    if health_percentage > 90:
+        return "Ideal"
+    elif health_percentage > 80:
+        return "Decent"
+    elif health_percentage > 70:
+        return "Okay"
+    return "Bad"
+
+
+@check("battery", "check battery")
+def check_battery(result):
+    batteries = read_batteries()
+    entries = []
+    for battery in batteries:
+        entry = asdict(battery)
+        entry["health"] = battery.health
+        entry["grade"] = battery_grade(battery.health) if battery.health is not None else None
+        entries.append(entry)
+    result.metrics = {"batteries": entries, "changes": inventory().get("batteries")[1]}
+    grades = {entry["grade"] for entry in entries}
+    if not entries or None in grades or "Okay" in grades:
+        result.status = WARN
+    if "Bad" in grades:
+        result.status = FAIL
+    battery_info = "".join(format_battery(battery) for battery in batteries)
+    _log_raw(f"Battery Information:\n{battery_info}")
+
+
+@check("cpu", "check CPU")
+def check_cpu(result):
+    import psutil
+    cpu_info = psutil.cpu_times_percent(interval=1, percpu=False)
+    result.metrics = {"user": cpu_info.user, "system": cpu_info.system, "idle": cpu_info.idle}
+    _log_raw(f"CPU Information: {cpu_info}")
+
+
+@check("network", "check network")
+def check_network(result):
+    import psutil
+    network_info = psutil.net_if_addrs()
+    # Addresses change all the time; the adapters themselves come from the inventory cache
+    result.metrics = {"interfaces": {
+        interface: [{"family": addr.family.name, "address": addr.address} for addr in addrs]
+        for interface, addrs in network_info.items()
+    }, "changes": inventory().get("nics")[1]}
+    if not any(interface != "lo" for interface in network_info):
+        result.status = WARN
+        result.message = "No network interfaces besides loopback."
+    _log_raw(f"Network Information: {network_info}")
+
+
+@check("network_link", "test the network link")
+def check_network_link(result):
+    import asyncio
+    from net_test import PEER, parse_peer, run_link_test, grade, format_report as format_link_report
+    host, port = parse_peer(PEER)
+    report = asyncio.run(run_link_test(host, port))
+    result.metrics = report
+    result.status, _ = grade(report)
+    result.message = format_link_report(report).rstrip("\n")
+
+
+@check("audio", "check audio devices")
+def check_audio(result):
+    cards, changes = inventory().get("sound")
+    result.metrics = {"cards": list(cards.values()), "changes": changes}
+    if not cards:
+        result.status = WARN
+    _log_raw(f"Audio Devices: {result.metrics['cards']}")
+
+
+@check("audio_loopback", "run the audio loopback test")
+def check_audio_loopback(result):
+    from audio_loopback import run_loopback, grade, format_report as format_loopback_report
+    report = run_loopback()
+    result.metrics = report
+    result.status, _ = grade(report)
+    result.message = format_loopback_report(report).rstrip("\n")
+
+
+@check("ports", "get available ports")
+def get_ports(result):
+    entries, changes = inventory().get("nodes")
+    nodes = sorted(entries)
+    result.metrics = {"nodes": nodes, "changes": changes}
+    _log_raw(f"Available Ports: {' '.join(nodes)}")
+
+
+@check("keyboard", "check keyboard")
+def check_keyboard(result, idle_timeout=None, total_timeout=None, prompt=None):
+    logging.info("Checking keyboard...")
+    from input_watch import IDLE_TIMEOUT, TOTAL_TIMEOUT, watch_keyboard, describe
+    text = "Checking keyboard. Please press some keys..."
+    if prompt is not None:
+        prompt(text)
+    watch = watch_keyboard(idle_timeout=idle_timeout or IDLE_TIMEOUT, total_timeout=total_timeout or TOTAL_TIMEOUT)
+    result.metrics = {"outcome": watch.outcome, "events": watch.events, "elapsed": watch.elapsed, "keys": watch.seen}
+    if not watch.passed:
+        # Some keys but not enough is a warning; nothing at all fails
+        result.status = WARN if watch.events else FAIL
+    # Without a prompt callback the operator only sees the request in the report
+    result.message = describe("Keyboard", watch) if prompt is not None else f"{text}\n" + describe("Keyboard", watch)
+    if watch.passed:
+        logging.info(describe("Keyboard", watch))
+    else:
+        logging.warning(describe("Keyboard", watch))
+
+
+@check("pointer", "check pointer")
+def check_pointer(result, idle_timeout=None, total_timeout=None, prompt=None):
+    logging.info("Checking pointer...")
+    from input_watch import IDLE_TIMEOUT, TOTAL_TIMEOUT, watch_pointer, describe
+    text = "Checking trackpad. Please move the trackpad..."
+    if prompt is not None:
+        prompt(text)
+    watch = watch_pointer(idle_timeout=idle_timeout or IDLE_TIMEOUT, total_timeout=total_timeout or TOTAL_TIMEOUT)
+    result.metrics = {"outcome": watch.outcome, "events": watch.events, "elapsed": watch.elapsed}
+    if not watch.passed:
+        result.status = WARN if watch.events else FAIL
+    result.message = describe("Trackpad", watch) if prompt is not None else f"{text}\n" + describe("Trackpad", watch)
+    if watch.passed:
+        logging.info(describe("Trackpad", watch))
+    else:
+        logging.warning(describe("Trackpad", watch))
+
+
+@check("trackpad", "check trackpad")
+def check_trackpad(result):
+    logging.info("Checking trackpad...")
+    from trackpad_test import run_trackpad_test
+    grade_trackpad(result, run_trackpad_test())
+
+
+def grade_trackpad(result, report):
+    # Shared with GUIs that open TrackpadTestApp in their own window
+    from trackpad_test import format_report as format_trackpad_report
+    result.status = report["status"]
+    result.metrics = report
+    result.message = format_trackpad_report(report)
@@ -0,0 +1,313 @@
+import os
+import re
+from dataclasses import dataclass, field
+
+from tracing import count
+
+# Read hardware information straight from sysfs/procfs instead of forking
+# upower, aplay, ls, free and df. Every reader takes the root it reads from so
+# it can be pointed at a copy of the tree.
+
+SYSFS_ROOT = "/sys"
+PROCFS_ROOT = "/proc"
+DEV_ROOT = "/dev"
+
+
+def _read(path, default=None):
+    try:
+        with open(path) as f:
+            content = f.read()
+        count("bytes_parsed", len(content))
+        return content.strip()
+    except OSError:
+        return default
+
+
+def _read_int(path):
+    value = _read(path)
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _scaled(value, scale):
+    return value / scale if value is not None else None
+
+
+@dataclass
+class Battery:
+    name: str
+    status: str = None
+    present: bool = True
+    technology: str = None
+    manufacturer: str = None
+    model_name: str = None
+    serial_number: str = None
+    cycle_count: int = None
+    percentage: float = None
+    energy: float = None              # Wh
+    energy_full: float = None         # Wh
+    energy_full_design: float = None  # Wh
+    energy_rate: float = None         # W
+    voltage: float = None             # V
+
+    @property
+    def health(self):
+        # A dead pack can report 0 Wh, which is a reading; a design of 0 is not
+        if self.energy_full is None or not self.energy_full_design:
+            return None
+        return self.energy_full / self.energy_full_design * 100
+
+
+def _read_battery(path, name):
+    battery = Battery(name=name)
+    battery.status = _read(os.path.join(path, "status"))
+    battery.present = _read(os.path.join(path, "present"), "1") == "1"
+    battery.technology = _read(os.path.join(path, "technology"))
+    battery.manufacturer = _read(os.path.join(path, "manufacturer"))
+    battery.model_name = _read(os.path.join(path, "model_name"))
+    battery.serial_number = _read(os.path.join(path, "serial_number"))
+    battery.cycle_count = _read_int(os.path.join(path, "cycle_count"))
+    battery.percentage = _read_int(os.path.join(path, "capacity"))
+    # Values are exported in micro-units (uWh, uW, uV, uAh, uA)
+    battery.voltage = _scaled(_read_int(os.path.join(path, "voltage_now")), 1e6)
+    battery.energy = _scaled(_read_int(os.path.join(path, "energy_now")), 1e6)
+    battery.energy_full = _scaled(_read_int(os.path.join(path, "energy_full")), 1e6)
+    battery.energy_full_design = _scaled(_read_int(os.path.join(path, "energy_full_design")), 1e6)
+    battery.energy_rate = _scaled(_read_int(os.path.join(path, "power_now")), 1e6)
+    if battery.energy_full is None:
+        # Some fuel gauges only report charge; convert it with the design voltage
+        design_voltage = _scaled(_read_int(os.path.join(path, "voltage_min_design")), 1e6) or battery.voltage
+        if design_voltage:
+            for attr, charge_attr in (("energy", "charge_now"),
+                                      ("energy_full", "charge_full"),
+                                      ("energy_full_design", "charge_full_design")):
+                charge = _scaled(_read_int(os.path.join(path, charge_attr)), 1e6)
+                setattr(battery, attr, charge * design_voltage if charge is not None else None)
+    if battery.energy_rate is None and battery.voltage:
+        current = _scaled(_read_int(os.path.join(path, "current_now")), 1e6)
+        if current is not None:
+            battery.energy_rate = current * battery.voltage
+    return battery
+
+
+def read_batteries(sysfs_root=SYSFS_ROOT):
+    base = os.path.join(sysfs_root, "class", "power_supply")
+    batteries = []
+    try:
+        entries = sorted(os.scandir(base), key=lambda entry: entry.name)
+    except FileNotFoundError:
+        return batteries
+    for entry in entries:
+        if _read(os.path.join(entry.path, "type")) == "Battery":
+            batteries.append(_read_battery(entry.path, entry.name))
+    return batteries
+
+
+@dataclass
+class SoundCard:
+    index: int
+    id: str
+    driver: str
+    name: str
+    long_name: str = None
+    devices: list = field(default_factory=list)
+
+
+@dataclass
+class PcmDevice:
+    card: int
+    device: int
+    id: str
+    name: str
+    playback: bool = False
+    capture: bool = False
+
+
+def read_sound_cards(procfs_root=PROCFS_ROOT):
+    # /proc/asound/cards has two lines per card:
+    #  0 [PCH            ]: HDA-Intel - HDA Intel PCH
+    #                       HDA Intel PCH at 0xf7f10000 irq 31
+    cards = {}
+    content = _read(os.path.join(procfs_root, "asound", "cards"))
+    if content is None:
+        raise FileNotFoundError("ALSA is not available (no /proc/asound/cards)")
+    card = None
+    for line in content.splitlines():
+        head, sep, rest = line.partition("]:")
+        if sep and "[" in head:
+            index, _, card_id = head.partition("[")
+            driver, _, name = rest.partition(" - ")
+            card = SoundCard(int(index), card_id.strip(), driver.strip(), name.strip())
+            cards[card.index] = card
+        elif card is not None and line.strip():
+            card.long_name = line.strip()
+    # /proc/asound/pcm: "00-00: ALC3246 Analog : ALC3246 Analog : playback 1 : capture 1"
+    pcm = _read(os.path.join(procfs_root, "asound", "pcm"), "")
+    for line in pcm.splitlines():
+        address, _, rest = line.partition(": ")
+        fields = [part.strip() for part in rest.split(" : ")]
+        try:
+            card_index, device_index = (int(part) for part in address.split("-"))
+        except ValueError:
+            continue
+        if card_index in cards and len(fields) >= 2:
+            cards[card_index].devices.append(PcmDevice(
+                card_index, device_index, fields[0], fields[1] or fields[0],
+                playback=any(part.startswith("playback") for part in fields[2:]),
+                capture=any(part.startswith("capture") for part in fields[2:]),
+            ))
+    return [cards[index] for index in sorted(cards)]
+
+
+def read_machine_serial(sysfs_root=SYSFS_ROOT, etc_root="/etc"):
+    # product_serial is only readable by root; fall back to the machine id
+    for path in (os.path.join(sysfs_root, "class", "dmi", "id", "product_serial"),
+                 os.path.join(sysfs_root, "class", "dmi", "id", "board_serial"),
+                 os.path.join(etc_root, "machine-id")):
+        value = _read(path)
+        if value and value.lower() not in ("none", "to be filled by o.e.m.", "default string"):
+            return value
+    return None
+
+
+def list_dev_nodes(dev_root=DEV_ROOT):
+    with os.scandir(dev_root) as entries:
+        return sorted(entry.name for entry in entries)
+
+
+@dataclass
+class MemoryInfo:
+    total: int
+    free: int
+    available: int
+    buffers: int = 0
+    cached: int = 0
+    shared: int = 0
+    swap_total: int = 0
+    swap_free: int = 0
+
+    @property
+    def used(self):
+        return self.total - self.available
+
+
+def read_meminfo(procfs_root=PROCFS_ROOT):
+    values = {}
+    with open(os.path.join(procfs_root, "meminfo")) as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            parts = rest.split()
+            if parts:
+                # Sizes are in kB; counters such as HugePages_Total have no unit
+                values[key] = int(parts[0]) * (1024 if len(parts) > 1 else 1)
+    return MemoryInfo(
+        total=values["MemTotal"],
+        free=values["MemFree"],
+        available=values.get("MemAvailable", values["MemFree"]),
+        buffers=values.get("Buffers", 0),
+        cached=values.get("Cached", 0) + values.get("SReclaimable", 0),
+        shared=values.get("Shmem", 0),
+        swap_total=values.get("SwapTotal", 0),
+        swap_free=values.get("SwapFree", 0),
+    )
+
+
+@dataclass
+class Filesystem:
+    device: str
+    mountpoint: str
+    fstype: str
+    total: int
+    used: int
+    available: int
+
+    @property
+    def percent(self):
+        usable = self.used + self.available
+        return self.used / usable * 100 if usable else 0.0
+
+
+def _unescape_mount(path):
+    # /proc/mounts escapes whitespace and backslashes as octal (\040 for space)
+    return re.sub(r"\\([0-7]{3})", lambda match: chr(int(match.group(1), 8)), path)
+
+
+def read_filesystems(procfs_root=PROCFS_ROOT):
+    filesystems = []
+    seen = set()
+    with open(os.path.join(procfs_root, "self", "mounts")) as f:
+        for line in f:
+            device, mountpoint, fstype = line.split()[:3]
+            mountpoint = _unescape_mount(mountpoint)
+            if mountpoint in seen:
+                continue
+            try:
+                stat = os.statvfs(mountpoint)
+            except OSError:
+                continue
+            # Pseudo filesystems (proc, sysfs, cgroup...) report no blocks, like `df` without -a
+            if stat.f_blocks == 0:
+                continue
+            seen.add(mountpoint)
+            total = stat.f_blocks * stat.f_frsize
+            filesystems.append(Filesystem(
+                device, mountpoint, fstype,
+                total=total,
+                used=total - stat.f_bfree * stat.f_frsize,
+                available=stat.f_bavail * stat.f_frsize,
+            ))
+    return filesystems
+
+
+def format_size(size):
+    # Human-readable size in the style of `free -h`/`df -h`
+    for unit in ("B", "K", "M", "G", "T"):
+        if abs(size) < 1024 or unit == "T":
+            return f"{size:.0f}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+        size /= 1024
+
+
+def format_battery(battery):
+    # Same field names as `upower -i` so existing readers of the output still match
+    lines = [f"  {'native-path:':<21} {battery.name}"]
+    for label, value in (("vendor", battery.manufacturer),
+                         ("model", battery.model_name),
+                         ("serial", battery.serial_number)):
+        if value:
+            lines.append(f"  {label + ':':<21} {value}")
+    lines.append(f"  {'present:':<21} {'yes' if battery.present else 'no'}")
+    for label, value, unit in (("state", battery.status and battery.status.lower(), ""),
+                               ("energy", battery.energy, " Wh"),
+                               ("energy-full", battery.energy_full, " Wh"),
+                               ("energy-full-design", battery.energy_full_design, " Wh"),
+                               ("energy-rate", battery.energy_rate, " W"),
+                               ("voltage", battery.voltage, " V"),
+                               ("charge-cycles", battery.cycle_count, ""),
+                               ("percentage", battery.percentage, "%"),
+                               ("capacity", battery.health, "%"),
+                               ("technology", battery.technology and battery.technology.lower(), "")):
+        if value is not None:
+            if isinstance(value, float):
+                value = f"{value:g}"
+            lines.append(f"  {label + ':':<21} {value}{unit}")
+    return "\n".join(lines) + "\n"
+
+
+def format_meminfo(memory):
+    swap_used = memory.swap_total - memory.swap_free
+    return (f"{'':<8}{'total':>10}{'used':>10}{'free':>10}{'shared':>10}{'buff/cache':>12}{'available':>11}\n"
+            f"{'Mem:':<8}{format_size(memory.total):>10}{format_size(memory.used):>10}"
+            f"{format_size(memory.free):>10}{format_size(memory.shared):>10}"
+            f"{format_size(memory.buffers + memory.cached):>12}{format_size(memory.available):>11}\n"
+            f"{'Swap:':<8}{format_size(memory.swap_total):>10}{format_size(swap_used):>10}"
+            f"{format_size(memory.swap_free):>10}\n")
+
+
+def format_filesystems(filesystems):
+    lines = [f"{'Filesystem':<24}{'Size':>8}{'Used':>8}{'Avail':>8}{'Use%':>6}  Mounted on"]
+    for fs in filesystems:
+        lines.append(f"{fs.device:<24}{format_size(fs.total):>8}{format_size(fs.used):>8}"
+                     f"{format_size(fs.available):>8}{fs.percent:>5.0f}%  {fs.mountpoint}")
+    return "\n".join(lines) + "\n"
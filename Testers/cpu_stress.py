@@ -0,0 +1,187 @@
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import psutil
+
+from stats import summarize
+
+# CPU stress test with throttling detection. One worker process per core
+# hashes a fixed block in a loop and counts completed blocks in shared
+# memory; the parent samples those counters together with per-core clock
+# frequencies and temperatures. A unit whose clocks fall while it heats up is
+# flagged as throttling. The score is the sustained hash rate across all
+# cores, which is comparable between units running the same image.
+
+BLOCK = bytes(range(256)) * 64  # 16 KiB per operation
+WARMUP_SAMPLES = 5
+FREQ_DROP = 0.10     # clocks 10% below the warm-up level...
+TEMP_RISE = 5.0      # ...while at least 5 C hotter than during warm-up...
+SUSTAINED = 3        # ...for this many consecutive samples counts as throttling
+
+
+def _worker(index, core, counters, stop):
+    if core is not None and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {core})
+    sha256 = hashlib.sha256
+    done = 0
+    while not stop.is_set():
+        for _ in range(64):
+            sha256(BLOCK).digest()
+        done += 64
+        counters[index] = done
+
+
+def _hottest_temperature():
+    if not hasattr(psutil, "sensors_temperatures"):
+        return None
+    readings = [sensor.current for sensors in psutil.sensors_temperatures().values() for sensor in sensors
+                if sensor.current is not None]
+    return max(readings) if readings else None
+
+
+def _frequencies():
+    try:
+        return [freq.current for freq in psutil.cpu_freq(percpu=True) or []]
+    except (OSError, NotImplementedError):
+        return []
+
+
+def _mean(values):
+    values = [value for value in values if value is not None]
+    return sum(values) / len(values) if values else None
+
+
+def detect_throttling(samples, warmup=WARMUP_SAMPLES):
+    # samples: dicts with "mean_mhz" and "temperature"; returns the index where throttling started
+    baseline = samples[:warmup]
+    base_freq = _mean(sample["mean_mhz"] for sample in baseline)
+    base_temp = _mean(sample["temperature"] for sample in baseline)
+    if not base_freq:
+        return None
+    run = 0
+    for index, sample in enumerate(samples[warmup:], start=warmup):
+        slower = sample["mean_mhz"] is not None and sample["mean_mhz"] < base_freq * (1 - FREQ_DROP)
+        # Without temperature sensors a sustained clock drop is still reported
+        hotter = base_temp is None or (sample["temperature"] is not None
+                                       and sample["temperature"] >= base_temp + TEMP_RISE)
+        run = run + 1 if slower and hotter else 0
+        if run >= SUSTAINED:
+            return index - SUSTAINED + 1
+    return None
+
+
+class CpuLoad:
+    # Keeps every core busy with hashing workers until stopped; also used as
+    # the fixed load for the battery discharge test
+    def __init__(self, workers=None):
+        self.cores = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count()))
+        self.workers = workers or len(self.cores)
+        context = multiprocessing.get_context()
+        self.counters = context.Array("Q", self.workers, lock=False)
+        self._stop_event = context.Event()
+        self._processes = [context.Process(target=_worker, daemon=True,
+                                           args=(index, self.cores[index % len(self.cores)], self.counters, self._stop_event))
+                           for index in range(self.workers)]
+
+    def start(self):
+        for process in self._processes:
+            process.start()
+
+    def stop(self):
+        self._stop_event.set()
+        for process in self._processes:
+            process.join(5)
+            if process.is_alive():
+                process.terminate()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def run_stress(duration=60.0, interval=1.0, workers=None):
+    idle_temperature = _hottest_temperature()
+    samples = []
+    with CpuLoad(workers) as load:
+        workers = load.workers
+        previous = [0] * workers
+        start = last = time.monotonic()
+        while last - start < duration:
+            time.sleep(max(start + (len(samples) + 1) * interval - time.monotonic(), 0))
+            now = time.monotonic()
+            current = list(load.counters)
+            elapsed = now - last
+            frequencies = _frequencies()
+            samples.append({
+                "t": now - start,
+                "ops_s": [(done - before) / elapsed for done, before in zip(current, previous)],
+                "mhz": frequencies,
+                "mean_mhz": _mean(frequencies),
+                "temperature": _hottest_temperature(),
+            })
+            previous, last = current, now
+
+    steady = samples[WARMUP_SAMPLES:] or samples
+    per_core = [summarize([sample["ops_s"][core] for sample in steady]) for core in range(workers)]
+    first = sum(samples[0]["ops_s"]) if samples else 0
+    final = sum(samples[-1]["ops_s"]) if samples else 0
+    throttle_index = detect_throttling(samples)
+    return {
+        "workers": workers,
+        "duration": last - start,
+        "idle_temperature": idle_temperature,
+        "max_temperature": max((s["temperature"] for s in samples if s["temperature"] is not None), default=None),
+        # Sustained 16 KiB SHA-256 blocks per second across all cores
+        "score": sum(core["mean"] for core in per_core if core["count"]),
+        "per_core_ops_s": [core.get("mean") for core in per_core],
+        "sustained_ratio": final / first if first else None,
+        "throttling": throttle_index is not None,
+        "throttling_started": samples[throttle_index]["t"] if throttle_index is not None else None,
+        "samples": samples,
+    }
+
+
+def format_report(report):
+    lines = [f"CPU stress: {report['workers']} workers for {report['duration']:.0f} s",
+             f"Score: {report['score']:.0f} ops/s"]
+    for core, rate in enumerate(report["per_core_ops_s"]):
+        lines.append(f"  core {core}: {rate:.0f} ops/s")
+    if report["sustained_ratio"] is not None:
+        lines.append(f"Throughput at end vs start: {report['sustained_ratio'] * 100:.0f}%")
+    if report["max_temperature"] is not None:
+        idle = report["idle_temperature"]
+        idle = f"{idle:.0f} C idle, " if idle is not None else ""
+        lines.append(f"Temperature: {idle}{report['max_temperature']:.0f} C max")
+    if report["throttling"]:
+        lines.append(f"THROTTLING detected after {report['throttling_started']:.0f} s: "
+                     f"clocks dropped while the temperature rose.")
+    else:
+        lines.append("No thermal throttling detected.")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load every core and watch for thermal throttling.")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds of load")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between samples")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per core)")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    report = run_stress(args.duration, args.interval, args.workers)
+    if args.json:
+        print(json.dumps(report))
+    else:
+        sys.stdout.write(format_report(report))
+    sys.exit(1 if report["throttling"] else 0)
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,24 @@
-import subprocess
+import argparse
+from dataclasses import replace
 
-def check_keyboard():
-    print("Checking keyboard. Please press some keys...")
-    try:
-        subprocess.run(["xev"], timeout=10)
-        print("Keyboard is working properly.")
-    except subprocess.TimeoutExpired:
-        print("Keyboard check timed out. It may not be working properly.")
-    except subprocess.CalledProcessError as e:
-        print("Failed to check keyboard:", e)
+from check_runner import run_scheduled
+from input_watch import IDLE_TIMEOUT, TOTAL_TIMEOUT
+from registry import resolve
+from results import render_report
 
-def check_trackpad():
-    print("Checking trackpad. Please move the trackpad...")
-    try:
-        subprocess.run(["xinput", "test", "Virtual core pointer"], timeout=10)
-        print("Trackpad is working properly.")
-    except subprocess.TimeoutExpired:
-        print("Trackpad check timed out. It may not be working properly.")
-    except subprocess.CalledProcessError as e:
-        print("Failed to check trackpad:", e)
-
-def main_dynamic():
+def main_dynamic(idle_timeout=IDLE_TIMEOUT, total_timeout=TOTAL_TIMEOUT):
     print("Starting dynamic hardware checks...")
-    check_keyboard()
-    check_trackpad()
+    # Both checks need the operator, so the scheduler runs them one after the
+    # other; each prints its request as it starts and is costed at its timeout
+    options = (("idle_timeout", idle_timeout), ("total_timeout", total_timeout), ("prompt", print))
+    specs = [replace(spec, cost=total_timeout, options=options) for spec in resolve("dynamic")]
+    results, _ = run_scheduled(specs)
+    print(render_report(results), end="")
     print("Dynamic hardware checks completed.")
 
 if __name__ == "__main__":
-    main_dynamic()
+    parser = argparse.ArgumentParser(description="Interactive keyboard and trackpad checks.")
+    parser.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT, help="seconds without input")
+    parser.add_argument("--total-timeout", type=float, default=TOTAL_TIMEOUT, help="seconds per check")
+    args = parser.parse_args()
+    main_dynamic(args.idle_timeout, args.total_timeout)
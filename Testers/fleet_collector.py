@@ -0,0 +1,226 @@
+import argparse
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Collector for results sent by fleet_upload.py. Request handlers only parse
+# the batch; a single writer thread owns the database and commits whatever
+# batches have queued up in one transaction, so many concurrent uploads
+# share one connection and one commit. If that transaction fails, each batch
+# is stored again on its own so a bad one only fails its own upload.
+
+DB_PATH = "fleet.sqlite3"
+MAX_BODY = 64 * 1024 * 1024
+# A gzip body is inflated at most this far, so a small request can't expand into gigabytes
+MAX_DECOMPRESSED = 256 * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    serial TEXT NOT NULL,
+    run_started REAL NOT NULL,
+    name TEXT NOT NULL,
+    host TEXT,
+    status TEXT,
+    started REAL,
+    duration REAL,
+    metrics TEXT,
+    message TEXT,
+    PRIMARY KEY (serial, run_started, name)
+);
+CREATE INDEX IF NOT EXISTS results_by_time ON results (run_started);
+CREATE INDEX IF NOT EXISTS results_by_check ON results (name, status);
+"""
+
+# Retried uploads carry the same (serial, run_started, name) and simply replace the row
+INSERT = """
+INSERT OR REPLACE INTO results
+    (serial, run_started, name, host, status, started, duration, metrics, message)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _gunzip(body, limit):
+    # gzip.decompress() that stops at `limit` bytes of output and returns None
+    # there. Spooled batches arrive as several gzip members back to back.
+    chunks, size = [], 0
+    while body:
+        inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        data = body
+        while not inflater.eof:
+            chunk = inflater.decompress(data, limit - size + 1)
+            if not chunk and not data:
+                raise ValueError("truncated gzip data")
+            size += len(chunk)
+            if size > limit:
+                return None
+            chunks.append(chunk)
+            data = inflater.unconsumed_tail
+        body = inflater.unused_data
+    return b"".join(chunks)
+
+
+def _row(record):
+    return (
+        str(record["serial"]),
+        float(record["run_started"]),
+        str(record["name"]),
+        record.get("host"),
+        record.get("status"),
+        record.get("started"),
+        record.get("duration"),
+        json.dumps(record.get("metrics", {}), separators=(",", ":")),
+        record.get("message"),
+    )
+
+
+class ResultWriter(threading.Thread):
+    def __init__(self, db_path=DB_PATH, max_batch_rows=50000):
+        super().__init__(daemon=True)
+        self.db_path = db_path
+        self.max_batch_rows = max_batch_rows
+        self.pending = queue.Queue()
+        self.ready = threading.Event()
+
+    def submit(self, rows):
+        # Blocks until the rows are committed; returns the exception on failure
+        done = threading.Event()
+        item = {"rows": rows, "done": done, "error": None}
+        self.pending.put(item)
+        done.wait()
+        return item["error"]
+
+    def stop(self):
+        self.pending.put(None)
+        self.join()
+
+    def _store(self, db, items):
+        try:
+            with db:
+                for item in items:
+                    db.executemany(INSERT, item["rows"])
+            return True
+        except sqlite3.Error as e:
+            rows = sum(len(item["rows"]) for item in items)
+            logging.error(f"Failed to store {rows} results: {e}")
+            if len(items) == 1:
+                items[0]["error"] = e
+            return False
+
+    def run(self):
+        db = sqlite3.connect(self.db_path)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.executescript(SCHEMA)
+        self.ready.set()
+        stopping = False
+        while not stopping:
+            items = [self.pending.get()]
+            rows = len(items[0]["rows"]) if items[0] else 0
+            # Group every batch that arrived meanwhile into the same transaction
+            while rows < self.max_batch_rows:
+                try:
+                    item = self.pending.get_nowait()
+                except queue.Empty:
+                    break
+                items.append(item)
+                rows += len(item["rows"]) if item else 0
+            if None in items:
+                stopping = True
+                items = [item for item in items if item is not None]
+            if not self._store(db, items) and len(items) > 1:
+                # One bad batch mustn't fail the uploads it was grouped with
+                for item in items:
+                    self._store(db, [item])
+            for item in items:
+                item["done"].set()
+        db.close()
+
+
+class IngestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive for uploaders that reuse connections
+
+    def _reply(self, status, message):
+        body = (json.dumps(message) + "\n").encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._reply(200, {"status": "ok"})
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/ingest":
+            self._reply(404, {"error": "not found"})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        if length > MAX_BODY:
+            self._reply(413, {"error": "batch too large"})
+            self.close_connection = True
+            return
+        body = self.rfile.read(length)
+        try:
+            if self.headers.get("Content-Encoding") == "gzip":
+                body = _gunzip(body, MAX_DECOMPRESSED)
+                if body is None:
+                    self._reply(413, {"error": "batch too large when decompressed"})
+                    return
+            rows = [_row(json.loads(line)) for line in body.splitlines() if line.strip()]
+        except (OSError, ValueError, KeyError, TypeError, zlib.error) as e:
+            self._reply(400, {"error": f"bad batch: {e}"})
+            return
+        error = self.server.writer.submit(rows)
+        if isinstance(error, sqlite3.OperationalError):
+            # The database itself (locked, disk full); the uploader spools and retries
+            self._reply(503, {"error": str(error)})
+        elif error is not None:
+            # This batch failed in a transaction of its own, so sending it again won't help
+            self._reply(400, {"error": f"bad batch: {error}"})
+        else:
+            self._reply(200, {"stored": len(rows)})
+
+    def log_message(self, format, *args):
+        logging.info("%s %s", self.address_string(), format % args)
+
+
+class CollectorServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, db_path=DB_PATH):
+        super().__init__(address, IngestHandler)
+        self.writer = ResultWriter(db_path)
+        self.writer.start()
+        self.writer.ready.wait()
+
+    def server_close(self):
+        super().server_close()
+        self.writer.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Collect hardware check results from the fleet.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8750)
+    parser.add_argument("--db", default=DB_PATH)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s:%(message)s')
+    server = CollectorServer((args.host, args.port), args.db)
+    logging.info(f"Fleet collector listening on {args.host}:{args.port}, storing to {args.db}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
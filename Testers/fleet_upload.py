@@ -0,0 +1,167 @@
+import argparse
+import gzip
+import http.client
+import json
+import logging
+import os
+import queue
+import time
+from urllib.parse import urlsplit
+
+# Send check results to a fleet collector (see fleet_collector.py). Each run's
+# records go out as one gzip-compressed NDJSON batch over a kept-alive
+# connection; batches that can't be delivered are spooled to disk and sent
+# ahead of the next run's batch.
+
+SPOOL_DIR = "fleet_spool"
+# Spooled batches are concatenated (gzip allows multiple members) up to this size per request
+MAX_REQUEST_BYTES = 8 * 1024 * 1024
+
+
+class ConnectionPool:
+    def __init__(self, url, size=2, timeout=10):
+        parts = urlsplit(url)
+        self.scheme = parts.scheme or "http"
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = parts.path or "/ingest"
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def _connect(self):
+        connection_class = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        return connection_class(self.host, self.port, timeout=self.timeout)
+
+    def request(self, body, headers):
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            connection = self._connect()
+        try:
+            connection.request("POST", self.path, body=body, headers=headers)
+            response = connection.getresponse()
+            payload = response.read()
+        except Exception:
+            connection.close()
+            raise
+        if response.will_close:
+            connection.close()
+        else:
+            try:
+                self._idle.put_nowait(connection)
+            except queue.Full:
+                connection.close()
+        return response.status, payload
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def encode_batch(records):
+    body = "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records)
+    return gzip.compress(body.encode(), compresslevel=6)
+
+
+class FleetUploader:
+    def __init__(self, url, spool_dir=SPOOL_DIR, retries=3, backoff=0.5, pool_size=2, timeout=10):
+        self.pool = ConnectionPool(url, size=pool_size, timeout=timeout)
+        self.spool_dir = spool_dir
+        self.retries = retries
+        self.backoff = backoff
+
+    def _send(self, payload):
+        headers = {"Content-Type": "application/x-ndjson", "Content-Encoding": "gzip"}
+        for attempt in range(self.retries + 1):
+            try:
+                status, body = self.pool.request(payload, headers)
+                if status == 200:
+                    return True
+                logging.warning(f"Fleet collector rejected batch: HTTP {status} {body[:200]!r}")
+                if status < 500:
+                    # The batch itself is bad; retrying or spooling it won't help
+                    return False
+            except (OSError, http.client.HTTPException) as e:
+                logging.warning(f"Fleet upload attempt {attempt + 1} failed: {e}")
+            if attempt < self.retries:
+                time.sleep(self.backoff * 2 ** attempt)
+        return None
+
+    def _spool(self, payload):
+        os.makedirs(self.spool_dir, exist_ok=True)
+        name = f"{time.time_ns()}.ndjson.gz"
+        tmp_path = os.path.join(self.spool_dir, name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, os.path.join(self.spool_dir, name))
+        return name
+
+    def spooled(self):
+        try:
+            names = sorted(name for name in os.listdir(self.spool_dir) if name.endswith(".ndjson.gz"))
+        except FileNotFoundError:
+            return []
+        return [os.path.join(self.spool_dir, name) for name in names]
+
+    def flush_spool(self):
+        # Oldest batches first; stop at the first failure so order is kept
+        sent = 0
+        paths = self.spooled()
+        while paths:
+            group, payload = [], b""
+            while paths and (not group or len(payload) + os.path.getsize(paths[0]) <= MAX_REQUEST_BYTES):
+                path = paths.pop(0)
+                with open(path, "rb") as f:
+                    payload += f.read()
+                group.append(path)
+            delivered = self._send(payload)
+            if delivered is None:
+                break
+            # Rejected batches are dropped too, they would be rejected again
+            for path in group:
+                os.remove(path)
+            if delivered:
+                sent += len(group)
+        return sent
+
+    def upload(self, records):
+        # Returns "sent", "spooled" or "rejected"
+        self.flush_spool()
+        payload = encode_batch(records)
+        # Anything still spooled means the collector just failed every retry;
+        # queue behind it rather than going through the retries again
+        delivered = None if self.spooled() else self._send(payload)
+        if delivered is None:
+            name = self._spool(payload)
+            logging.warning(f"Fleet collector unreachable; spooled batch as {name}")
+            return "spooled"
+        return "sent" if delivered else "rejected"
+
+    def close(self):
+        self.pool.close()
+
+
+def build_records(results, serial, host, run_started):
+    return [{"serial": serial, "host": host, "run_started": run_started, **result.to_dict()}
+            for result in results]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send spooled check results to a fleet collector.")
+    parser.add_argument("url", help="collector URL, e.g. http://collector:8750/ingest")
+    parser.add_argument("--spool-dir", default=SPOOL_DIR)
+    args = parser.parse_args()
+
+    uploader = FleetUploader(args.url, spool_dir=args.spool_dir)
+    try:
+        sent = uploader.flush_spool()
+    finally:
+        uploader.close()
+    remaining = len(uploader.spooled())
+    print(f"Sent {sent} spooled batches, {remaining} remaining.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import argparse
+import os
+import sys
+import time
+
+from registry import PROFILES, resolve
+
+# Headless entry point for scripted and PXE-booted runs. Startup imports only
+# the registry; each check's module is imported by the runner when the check
+# starts, and logging, uploading and the Tk trackpad window are set up only if
+# they are used. import_times.py measures what a run imports.
+
+DEFAULT_PROFILE = "quick-intake"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run hardware checks without a GUI.")
+    selection = parser.add_mutually_exclusive_group()
+    selection.add_argument("--profile", choices=sorted(PROFILES), default=DEFAULT_PROFILE)
+    selection.add_argument("--checks", help="comma-separated check names instead of a profile")
+    parser.add_argument("--format", choices=["text", "json", "ndjson"], default="text")
+    parser.add_argument("--workers", type=int, help="concurrent checks (default: all at once)")
+    parser.add_argument("--plan", action="store_true", help="show the start order and estimated time, then exit")
+    parser.add_argument("--list", action="store_true", help="list checks and profiles, then exit")
+    parser.add_argument("--no-log", action="store_true", help="don't write hardware_check.log")
+    parser.add_argument("--trace", metavar="FILE", default=os.environ.get("HARDWARE_CHECK_TRACE"),
+                        help="write per-check spans as a Chrome trace")
+    parser.add_argument("--metrics", metavar="FILE", default=os.environ.get("HARDWARE_CHECK_METRICS"),
+                        help="write per-check metrics as a Prometheus textfile (*.prom)")
+    parser.add_argument("--breakdown", action="store_true", help="add a per-check timing breakdown to the text report")
+    parser.add_argument("--upload", metavar="URL",
+                        help="send the results to a fleet collector, e.g. http://collector:8750/ingest")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        from registry import format_registry
+        sys.stdout.write(format_registry())
+        return 0
+    try:
+        specs = resolve(args.checks.split(",") if args.checks else args.profile)
+    except KeyError as e:
+        parser.error(e.args[0])
+
+    from check_runner import run_scheduled, format_plan, format_timing
+    if args.plan:
+        sys.stdout.write(format_plan(specs, args.workers))
+        return 0
+    if not args.no_log:
+        from log_setup import configure_logging
+        configure_logging()
+
+    run_started = time.time()
+    on_result = None
+    if args.format == "ndjson":
+        import socket
+        from results import ndjson_line
+        hostname = socket.gethostname()
+
+        # NDJSON lines go out as each check finishes, for an orchestrator reading the output over SSH
+        def on_result(_index, output):
+            sys.stdout.write(ndjson_line(output, hostname))
+            sys.stdout.flush()
+    results, timing = run_scheduled(specs, args.workers, on_result)
+    import tracing
+    # Drained rather than copied, so calling main() again starts from an empty list
+    spans = tracing.drain()
+    tracing.export(spans, args.trace, args.metrics)
+
+    if args.upload:
+        import socket
+        from collectors import read_machine_serial
+        from fleet_upload import FleetUploader, build_records
+        uploader = FleetUploader(args.upload)
+        try:
+            records = build_records(results, read_machine_serial() or socket.gethostname(),
+                                    socket.gethostname(), run_started)
+            print(f"Upload: {uploader.upload(records)}", file=sys.stderr)
+        finally:
+            uploader.close()
+
+    from results import render_report, to_json, FAIL, ERROR
+    if args.format == "json":
+        print(to_json(results, timing))
+    elif args.format == "text":
+        sys.stdout.write(render_report(results, details=False) + format_timing(timing))
+        if args.breakdown:
+            sys.stdout.write(tracing.format_breakdown(spans))
+    return 1 if any(result.status in (FAIL, ERROR) for result in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
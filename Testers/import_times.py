@@ -0,0 +1,95 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+# Startup regression check for hwcheck.py. A profile is run in a fresh
+# interpreter under `python -X importtime`, and the per-module import times it
+# prints are added up, minus what a bare interpreter imports anyway. The check
+# fails if the imports exceed a budget, or if the run pulled in modules a
+# headless run must not need (tkinter fails outright on images without X).
+# The fastest of several runs is kept so a cold page cache doesn't count as a
+# regression.
+
+HWCHECK = os.path.join(os.path.dirname(os.path.abspath(__file__)), "hwcheck.py")
+BUDGET_MS = 100.0  # about 80 ms for quick-intake on a current station
+FORBIDDEN = ("tkinter", "_tkinter")
+
+
+def parse_importtime(stderr):
+    # Lines look like "import time:       278 |       6343 |   log_setup"; returns
+    # {module: (self_us, cumulative_us, depth)}
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        modules[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return modules
+
+
+def _best_run(args, runs):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        process = subprocess.run([sys.executable, "-X", "importtime"] + args,
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        wall = time.perf_counter() - start
+        modules = parse_importtime(process.stderr)
+        # Top-level entries include everything they imported
+        total = sum(cumulative for _, cumulative, depth in modules.values() if depth == 0)
+        if best is None or total < best["import_us"]:
+            best = {"import_us": total, "wall_s": wall, "modules": modules}
+    return best
+
+
+def measure(profile, runs=5):
+    baseline = _best_run(["-c", "pass"], runs)
+    best = _best_run([HWCHECK, "--profile", profile, "--no-log", "--format", "json"], runs)
+    added = {name: entry for name, entry in best["modules"].items() if name not in baseline["modules"]}
+    slowest = sorted(added.items(), key=lambda item: item[1][0], reverse=True)
+    return {
+        "profile": profile,
+        "runs": runs,
+        "import_ms": max(best["import_us"] - baseline["import_us"], 0) / 1000,
+        "process_wall_s": best["wall_s"],
+        "module_count": len(added),
+        "slowest": [{"module": name, "self_ms": self_us / 1000} for name, (self_us, _, _) in slowest[:10]],
+        "forbidden": [name for name in FORBIDDEN if name in best["modules"]],
+    }
+
+
+def format_report(report, budget_ms):
+    lines = [f"Imports for profile {report['profile']}: {report['import_ms']:.1f} ms "
+             f"({report['module_count']} modules, budget {budget_ms:.0f} ms), "
+             f"whole run {report['process_wall_s']:.2f} s, best of {report['runs']}"]
+    for entry in report["slowest"]:
+        lines.append(f"  {entry['module']:<32} {entry['self_ms']:>7.2f} ms")
+    if report["forbidden"]:
+        lines.append(f"FORBIDDEN imports in a headless run: {', '.join(report['forbidden'])}")
+    if report["import_ms"] > budget_ms:
+        lines.append("Import time is OVER BUDGET.")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure hwcheck.py import time and fail on regressions.")
+    parser.add_argument("--profile", default="quick-intake")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    report = measure(args.profile, args.runs)
+    report["budget_ms"] = args.budget_ms
+    if args.json:
+        print(json.dumps(report))
+    else:
+        sys.stdout.write(format_report(report, args.budget_ms))
+    sys.exit(1 if report["forbidden"] or report["import_ms"] > args.budget_ms else 0)
+
+if __name__ == "__main__":
+    main()
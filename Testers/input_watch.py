@@ -0,0 +1,156 @@
+import os
+import re
+import selectors
+import shutil
+import subprocess
+import time
+from dataclasses import dataclass, field
+
+from tracing import count
+
+# Watches the output of xev / xinput test while it runs instead of waiting for
+# a fixed timeout. Lines are parsed as they arrive, and the child is stopped as
+# soon as enough input has been seen. Two limits apply: the idle timeout ends
+# the check when no input arrives for a while, and the total timeout caps the
+# whole check.
+
+IDLE_TIMEOUT = 5.0    # seconds without input
+TOTAL_TIMEOUT = 10.0  # seconds overall; registry.py costs keyboard and pointer at this
+REQUIRED_KEYS = 3     # distinct keys pressed
+REQUIRED_MOTION = 20  # pointer motion events
+
+# Outcomes
+PASSED = "passed"
+IDLE_TIMEOUT_EXPIRED = "idle_timeout"
+TIMEOUT_EXPIRED = "timeout"
+EXITED = "exited"  # the tool quit before enough input arrived
+
+XEV_COMMAND = ["xev"]
+XINPUT_COMMAND = ["xinput", "test", "Virtual core pointer"]
+
+
+@dataclass(slots=True)
+class WatchResult:
+    outcome: str
+    events: int = 0
+    elapsed: float = 0.0
+    seen: list = field(default_factory=list)  # distinct keys, or nothing for pointer checks
+
+    @property
+    def passed(self):
+        return self.outcome == PASSED
+
+
+class XevKeyParser:
+    # xev prints "KeyPress event, ..." and the keysym two lines later:
+    #     state 0x10, keycode 38 (keysym 0x61, a), same_screen YES,
+    KEYSYM = re.compile(r"\(keysym 0x[0-9a-f]+, ([^)]+)\)")
+
+    def __init__(self):
+        self._pending = False
+
+    def feed(self, line):
+        if line.startswith("KeyPress event"):
+            self._pending = True
+        elif self._pending:
+            match = self.KEYSYM.search(line)
+            if match:
+                self._pending = False
+                return match.group(1)
+        return None
+
+
+class XinputMotionParser:
+    # xinput test prints "motion a[0]=512 a[1]=384" and "button press 1"
+    def feed(self, line):
+        if line.startswith("motion") or line.startswith("button press"):
+            return line.split()[0]
+        return None
+
+
+def _line_buffered(command):
+    # Both tools use stdio, which buffers whole blocks when writing to a pipe
+    if shutil.which(command[0]) is None:
+        raise FileNotFoundError(f"{command[0]} not found")
+    stdbuf = shutil.which("stdbuf")
+    return [stdbuf, "-oL"] + command if stdbuf else command
+
+
+def _stop(process):
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(1)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def watch_events(command, parser, required, distinct=False, idle_timeout=IDLE_TIMEOUT, total_timeout=TOTAL_TIMEOUT):
+    # Runs command until parser has produced `required` events (distinct ones if
+    # `distinct`), or until a timeout; raises FileNotFoundError if the tool is missing
+    process = subprocess.Popen(_line_buffered(command), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    count("subprocesses")
+    os.set_blocking(process.stdout.fileno(), False)
+    selector = selectors.DefaultSelector()
+    selector.register(process.stdout, selectors.EVENT_READ)
+    start = last_event = time.monotonic()
+    result = WatchResult(TIMEOUT_EXPIRED)
+    seen = set()
+    buffer = b""
+    try:
+        while True:
+            now = time.monotonic()
+            if now - start >= total_timeout:
+                result.outcome = TIMEOUT_EXPIRED
+                break
+            if now - last_event >= idle_timeout:
+                result.outcome = IDLE_TIMEOUT_EXPIRED
+                break
+            wait = min(start + total_timeout, last_event + idle_timeout) - now
+            if not selector.select(wait):
+                continue
+            chunk = os.read(process.stdout.fileno(), 65536)
+            if not chunk:
+                result.outcome = EXITED
+                break
+            count("bytes_parsed", len(chunk))
+            *lines, buffer = (buffer + chunk).split(b"\n")
+            for line in lines:
+                event = parser.feed(line.decode(errors="replace").strip())
+                if event is None:
+                    continue
+                result.events += 1
+                last_event = time.monotonic()
+                if distinct and event not in seen:
+                    seen.add(event)
+                    result.seen.append(event)
+            if (len(seen) if distinct else result.events) >= required:
+                result.outcome = PASSED
+                break
+    finally:
+        selector.close()
+        _stop(process)
+        process.stdout.close()
+    result.elapsed = time.monotonic() - start
+    return result
+
+
+def watch_keyboard(required=REQUIRED_KEYS, idle_timeout=IDLE_TIMEOUT, total_timeout=TOTAL_TIMEOUT):
+    return watch_events(XEV_COMMAND, XevKeyParser(), required, True, idle_timeout, total_timeout)
+
+
+def watch_pointer(required=REQUIRED_MOTION, idle_timeout=IDLE_TIMEOUT, total_timeout=TOTAL_TIMEOUT):
+    return watch_events(XINPUT_COMMAND, XinputMotionParser(), required, False, idle_timeout, total_timeout)
+
+
+def describe(device, result):
+    if result.passed:
+        keys = f" ({', '.join(result.seen)})" if result.seen else ""
+        return f"{device} is working properly: {result.events} events in {result.elapsed:.1f} s{keys}."
+    if result.outcome == IDLE_TIMEOUT_EXPIRED:
+        reason = f"no input for {result.elapsed:.0f} s" if not result.events else "input stopped"
+        return f"{device} check timed out, {reason} after {result.events} events. It may not be working properly."
+    if result.outcome == EXITED:
+        return f"{device} check ended early after {result.events} events; the test tool exited."
+    return f"{device} check timed out after {result.elapsed:.0f} s with {result.events} events. It may not be working properly."
@@ -0,0 +1,249 @@
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import threading
+from dataclasses import asdict
+
+from collectors import SYSFS_ROOT, PROCFS_ROOT, DEV_ROOT, list_dev_nodes, read_batteries, read_sound_cards
+
+# Snapshot cache for inventory that rarely changes: device nodes, ALSA cards,
+# network adapters and batteries. Each section has a cheap signature (a
+# directory mtime or listing); while it matches the stored one the section is
+# served from the snapshot without enumerating anything. When it changes the
+# section is read again and compared with the snapshot, and the differences
+# become hotplug messages such as "USB serial device ttyUSB0 added on USB port
+# 1-2". The snapshot is kept on disk so the comparison spans runs.
+
+SNAPSHOT_FILE = os.environ.get("HARDWARE_CHECK_INVENTORY", "inventory_snapshot.json")
+
+# sysfs classes whose devices get a friendlier name than "device node"
+NODE_CLASSES = {
+    "tty": "serial device",
+    "block": "disk",
+    "video4linux": "camera",
+    "hidraw": "HID device",
+    "sound": "sound device",
+    "usbmisc": "USB device",
+}
+
+USB_PORT = re.compile(r"/usb\d+/(?:[\d.-]+/)*?(\d+-[\d.]+)(?:/|:|$)")
+
+
+def _usb_port(device_path):
+    # "…/usb1/1-2/1-2.4/1-2.4:1.0/ttyUSB0" -> "1-2.4" (the deepest hub port)
+    ports = USB_PORT.findall(device_path)
+    return ports[-1] if ports else None
+
+
+def _device_path(class_dir):
+    device = os.path.join(class_dir, "device")
+    return os.path.realpath(device) if os.path.exists(device) else None
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _read_line(path):
+    try:
+        with open(path) as f:
+            return f.readline().strip()
+    except OSError:
+        return None
+
+
+def _listing(path):
+    try:
+        return sorted(os.listdir(path))
+    except OSError:
+        return None
+
+
+class Section:
+    # name: snapshot key; signature(roots) must be cheap; read(roots) returns
+    # {item: {field: value}}; label(item, entry) names an item in messages
+    def __init__(self, name, signature, read, label):
+        self.name = name
+        self.signature = signature
+        self.read = read
+        self.label = label
+
+
+def _read_nodes(roots):
+    entries = {name: {"kind": None, "port": None} for name in list_dev_nodes(roots["dev"])}
+    for sysfs_class, kind in NODE_CLASSES.items():
+        class_root = os.path.join(roots["sysfs"], "class", sysfs_class)
+        for name in _listing(class_root) or ():
+            if name not in entries:
+                continue
+            device = _device_path(os.path.join(class_root, name))
+            # Virtual consoles and the like have no device behind them
+            if device is not None:
+                entries[name] = {"kind": kind, "port": _usb_port(device)}
+    return entries
+
+
+def _label_node(name, entry):
+    kind = entry["kind"] or "device node"
+    if entry["port"]:
+        return f"USB {kind} {name}", f" on USB port {entry['port']}"
+    return f"{kind[0].upper()}{kind[1:]} {name}", ""
+
+
+def _read_sound(roots):
+    return {str(card.index): asdict(card) for card in read_sound_cards(roots["procfs"])}
+
+
+def _label_sound(index, entry):
+    return f"Sound card {index} {entry['id']} ({entry['name']})", ""
+
+
+def _read_nics(roots):
+    net = os.path.join(roots["sysfs"], "class", "net")
+    entries = {}
+    for name in _listing(net) or ():
+        device = _device_path(os.path.join(net, name))
+        driver = os.path.join(net, name, "device", "driver")
+        entries[name] = {
+            "mac": _read_line(os.path.join(net, name, "address")),
+            "driver": os.path.basename(os.path.realpath(driver)) if os.path.exists(driver) else None,
+            "port": _usb_port(device) if device else None,
+            "virtual": device is None,
+        }
+    return entries
+
+
+def _label_nic(name, entry):
+    where = f" on USB port {entry['port']}" if entry["port"] else ""
+    return f"Network interface {name} ({entry['mac']})", where
+
+
+def _read_battery_inventory(roots):
+    return {battery.name: {"manufacturer": battery.manufacturer, "model": battery.model_name,
+                           "serial": battery.serial_number, "technology": battery.technology,
+                           "energy_full_design": battery.energy_full_design}
+            for battery in read_batteries(roots["sysfs"])}
+
+
+def _label_battery(name, entry):
+    model = " ".join(part for part in (entry["manufacturer"], entry["model"]) if part)
+    return f"Battery {name} ({model})" if model else f"Battery {name}", ""
+
+
+SECTIONS = {section.name: section for section in (
+    # devtmpfs updates the directory mtime whenever a node is created or removed
+    Section("nodes", lambda roots: _mtime(roots["dev"]), _read_nodes, _label_node),
+    Section("sound", lambda roots: _mtime(os.path.join(roots["dev"], "snd")), _read_sound, _label_sound),
+    # sysfs directory mtimes don't change, but listing a class is cheap
+    Section("nics", lambda roots: _listing(os.path.join(roots["sysfs"], "class", "net")), _read_nics, _label_nic),
+    Section("batteries", lambda roots: _listing(os.path.join(roots["sysfs"], "class", "power_supply")),
+            _read_battery_inventory, _label_battery),
+)}
+
+
+def diff(section, old, new):
+    # Hotplug messages for the items that differ between two reads of a section
+    changes = []
+    for item in sorted(new.keys() - old.keys()):
+        name, where = section.label(item, new[item])
+        changes.append(f"{name} added{where}")
+    for item in sorted(old.keys() - new.keys()):
+        name, where = section.label(item, old[item])
+        changes.append(f"{name} removed{where}")
+    for item in sorted(old.keys() & new.keys()):
+        if old[item] != new[item]:
+            fields = ", ".join(key if isinstance(value, (list, dict)) else f"{key} {old[item].get(key)} -> {value}"
+                               for key, value in new[item].items() if old[item].get(key) != value)
+            name, _ = section.label(item, new[item])
+            changes.append(f"{name} changed: {fields}")
+    return changes
+
+
+class InventoryCache:
+    def __init__(self, path=SNAPSHOT_FILE, sysfs_root=SYSFS_ROOT, procfs_root=PROCFS_ROOT, dev_root=DEV_ROOT):
+        self.path = path
+        self.roots = {"sysfs": sysfs_root, "procfs": procfs_root, "dev": dev_root}
+        self._lock = threading.Lock()
+        try:
+            with open(path) as f:
+                self.snapshot = json.load(f)
+        except (OSError, ValueError):
+            self.snapshot = {}
+
+    def get(self, name):
+        # Returns (entries, changes). changes is None the first time a section is
+        # seen, [] when nothing changed, else the hotplug messages.
+        section = SECTIONS[name]
+        signature = section.signature(self.roots)
+        with self._lock:
+            stored = self.snapshot.get(name)
+            if stored is not None and signature is not None and stored["signature"] == signature:
+                return stored["entries"], []
+        entries = section.read(self.roots)
+        with self._lock:
+            changes = diff(section, stored["entries"], entries) if stored is not None else None
+            self.snapshot[name] = {"signature": signature, "entries": entries}
+            self._save()
+        return entries, changes
+
+    def _save(self):
+        # A read-only working directory costs the cross-run diff, not the check
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(self.snapshot, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.warning(f"Could not save inventory snapshot: {e}")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def inventory():
+    # One cache per process, shared by the checks; later runs in a GUI session
+    # are answered from memory
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = InventoryCache()
+        return _cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show inventory changes since the last snapshot.")
+    parser.add_argument("--snapshot", default=SNAPSHOT_FILE)
+    parser.add_argument("--reset", action="store_true", help="forget the stored snapshot first")
+    parser.add_argument("--json", action="store_true", help="print the whole snapshot")
+    args = parser.parse_args()
+
+    if args.reset and os.path.exists(args.snapshot):
+        os.remove(args.snapshot)
+    cache = InventoryCache(args.snapshot)
+    report = {}
+    for name in SECTIONS:
+        try:
+            report[name] = cache.get(name)
+        except OSError as e:
+            print(f"{name}: {e}", file=sys.stderr)
+    if args.json:
+        print(json.dumps({name: {"entries": entries, "changes": changes}
+                          for name, (entries, changes) in report.items()}))
+        return
+    for name, (entries, changes) in report.items():
+        if changes is None:
+            print(f"{name}: {len(entries)} items recorded")
+        elif not changes:
+            print(f"{name}: no changes")
+        for change in changes or ():
+            print(f"{name}: {change}")
+
+if __name__ == "__main__":
+    main()
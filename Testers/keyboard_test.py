@@ -0,0 +1,382 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+import tkinter as tk
+from dataclasses import dataclass, field
+from tkinter import messagebox
+
+from stats import summarize
+
+# Keyboard test with per-key timing. The keyboard is drawn as canvas items
+# from a layout file (keyboard_layouts/<name>.json), and key colours are
+# repainted in one batch per frame rather than on every event. Every press and
+# release is timestamped with a monotonic nanosecond clock and fed to
+# KeystrokeAnalyzer, which has no Tk dependency, so a recorded event stream
+# can be replayed through it from the command line.
+
+LAYOUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "keyboard_layouts")
+DEFAULT_LAYOUT = os.environ.get("HARDWARE_CHECK_KEYBOARD_LAYOUT", "us_ansi")
+RECORD_DIR = os.environ.get("HARDWARE_CHECK_KEYBOARD_RECORD")  # save event streams here when set
+
+KEY_UNIT = 44      # pixels per 1u key
+KEY_GAP = 4
+REPAINT_MS = 16    # at most one repaint per frame
+
+CHATTER_MS = 30.0      # a second press of the same key within this is a double-fire
+SHORT_HOLD_MS = 5.0    # shorter holds are contact bounce, not a finger
+LONG_HOLD_MS = 1500.0  # longer holds during the test are abnormal
+STUCK_MS = 5000.0      # still down after this long counts as stuck
+
+COLOURS = {
+    "untested": "#c62828",
+    "down": "#f9a825",
+    "tested": "#2e7d32",
+    "faulty": "#6a1b9a",
+}
+
+
+@dataclass(slots=True)
+class KeyCap:
+    key: str
+    label: str
+    x: float
+    y: float
+    width: float
+    height: float
+
+
+class Layout:
+    def __init__(self, name, caps, keysyms):
+        self.name = name
+        self.caps = caps
+        self._keysyms = keysyms  # keysym -> layout key, including shifted and alias keysyms
+
+    @property
+    def keys(self):
+        return [cap.key for cap in self.caps]
+
+    @property
+    def size(self):
+        return (max(cap.x + cap.width for cap in self.caps), max(cap.y + cap.height for cap in self.caps))
+
+    def resolve(self, keysym):
+        if keysym in self._keysyms:
+            return self._keysyms[keysym]
+        # Caps Lock and Shift turn letters upper case
+        return self._keysyms.get(keysym.lower(), keysym)
+
+
+def load_layout(name=DEFAULT_LAYOUT):
+    # name: a layout in LAYOUT_DIR or a path to a layout file. Rows are lists of
+    # keysyms or {"key", "label", "w", "shift", "aliases"} objects, in 1u units;
+    # {"stack": [...]} puts keys above each other in one slot, {"gap": w} skips space.
+    path = name if os.path.sep in name or name.endswith(".json") else os.path.join(LAYOUT_DIR, f"{name}.json")
+    with open(path, encoding="utf-8") as f:
+        spec = json.load(f)
+
+    caps, primary, secondary = [], {}, {}
+
+    def add(entry, x, y, width, height):
+        if isinstance(entry, str):
+            entry = {"key": entry}
+        key = entry["key"]
+        caps.append(KeyCap(key, entry.get("label", key), x, y, width, height))
+        primary[key] = key
+        for keysym in ([entry["shift"]] if "shift" in entry else []) + entry.get("aliases", []):
+            secondary.setdefault(keysym, key)
+
+    for row_number, row in enumerate(spec["rows"]):
+        x = 0.0
+        for entry in row:
+            if isinstance(entry, dict) and "gap" in entry:
+                x += entry["gap"]
+            elif isinstance(entry, dict) and "stack" in entry:
+                height = 1.0 / len(entry["stack"])
+                for number, stacked in enumerate(entry["stack"]):
+                    add(stacked, x, row_number + number * height, 1.0, height)
+                x += 1.0
+            else:
+                width = entry.get("w", 1.0) if isinstance(entry, dict) else 1.0
+                add(entry, x, row_number, width, 1.0)
+                x += width
+    # A keysym that is some key's own name wins over a shifted or alias meaning
+    return Layout(spec.get("name", name), caps, {**secondary, **primary})
+
+
+def available_layouts():
+    return sorted(name[:-5] for name in os.listdir(LAYOUT_DIR) if name.endswith(".json"))
+
+
+@dataclass(slots=True)
+class KeyEvent:
+    kind: str                 # "press" or "release"
+    keysym: str
+    t: int                    # time.perf_counter_ns()
+    server_time: int = None   # the windowing system's millisecond timestamp, if any
+
+
+@dataclass(slots=True)
+class KeyStats:
+    presses: int = 0
+    repeats: int = 0
+    chatter: list = field(default_factory=list)  # press-to-press intervals in ms
+    holds: list = field(default_factory=list)    # press-to-release times in ms
+    down_since: int = None
+    last_press: int = None
+    last_release_server: int = None
+    _released_from: int = None
+
+    @property
+    def is_down(self):
+        return self.down_since is not None
+
+
+class KeystrokeAnalyzer:
+    def __init__(self, chatter_ms=CHATTER_MS, short_hold_ms=SHORT_HOLD_MS, long_hold_ms=LONG_HOLD_MS,
+                 stuck_ms=STUCK_MS):
+        self.chatter_ms = chatter_ms
+        self.short_hold_ms = short_hold_ms
+        self.long_hold_ms = long_hold_ms
+        self.stuck_ms = stuck_ms
+        self.keys = {}
+        self.events = []
+
+    def feed(self, event, key=None):
+        # key: the layout key the event belongs to (defaults to the keysym);
+        # returns that key's KeyStats
+        key = key or event.keysym
+        self.events.append(event)
+        stats = self.keys.get(key)
+        if stats is None:
+            stats = self.keys[key] = KeyStats()
+        if event.kind == "press":
+            if stats.is_down:
+                # Auto-repeat that doesn't send releases in between
+                stats.repeats += 1
+            elif event.server_time is not None and event.server_time == stats.last_release_server:
+                # X11 auto-repeat sends a release and a press with the same timestamp; undo the release
+                stats.repeats += 1
+                stats.holds.pop()
+                stats.down_since = stats._released_from
+                stats.last_release_server = None
+            else:
+                if stats.last_press is not None:
+                    interval = (event.t - stats.last_press) / 1e6
+                    if interval < self.chatter_ms:
+                        stats.chatter.append(interval)
+                stats.presses += 1
+                stats.last_press = stats.down_since = event.t
+        elif stats.is_down:
+            stats.holds.append((event.t - stats.down_since) / 1e6)
+            stats.last_release_server = event.server_time
+            stats._released_from = stats.down_since
+            stats.down_since = None
+        return stats
+
+    def faulty(self, key):
+        stats = self.keys.get(key)
+        return stats is not None and bool(stats.chatter)
+
+    def report(self, expected=(), now=None):
+        # expected: layout keys that should have been pressed; now: perf_counter_ns() at the end of the test
+        if now is None:
+            now = self.events[-1].t if self.events else time.perf_counter_ns()
+        keys = {}
+        for key, stats in sorted(self.keys.items()):
+            held = (now - stats.down_since) / 1e6 if stats.is_down else None
+            keys[key] = {
+                "presses": stats.presses,
+                "repeats": stats.repeats,
+                "chatter": len(stats.chatter),
+                "chatter_intervals_ms": stats.chatter,
+                "short_holds": sum(1 for hold in stats.holds if hold < self.short_hold_ms),
+                "long_holds": sum(1 for hold in stats.holds if hold > self.long_hold_ms),
+                "hold_ms": summarize(stats.holds, (50, 95)),
+                "stuck": held is not None and held >= self.stuck_ms,
+                "down_ms": held,
+            }
+        tested = [key for key in expected if key in keys and keys[key]["presses"]]
+        return {
+            "events": len(self.events),
+            "tested": len(tested),
+            "expected": len(expected),
+            "missing": [key for key in expected if key not in tested],
+            "chatter": [key for key, entry in keys.items() if entry["chatter"]],
+            "stuck": [key for key, entry in keys.items() if entry["stuck"]],
+            "abnormal_holds": [key for key, entry in keys.items() if entry["short_holds"] or entry["long_holds"]],
+            "keys": keys,
+        }
+
+
+def replay(events, layout=None, analyzer=None):
+    # Feeds recorded KeyEvents through an analyzer and returns it
+    analyzer = analyzer or KeystrokeAnalyzer()
+    for event in events:
+        analyzer.feed(event, layout.resolve(event.keysym) if layout is not None else None)
+    return analyzer
+
+
+def save_recording(events, path):
+    with open(path, "w", encoding="utf-8") as f:
+        for event in events:
+            f.write(json.dumps({"kind": event.kind, "keysym": event.keysym, "t": event.t,
+                                "server_time": event.server_time}) + "\n")
+
+
+def load_recording(path):
+    with open(path, encoding="utf-8") as f:
+        return [KeyEvent(**json.loads(line)) for line in f if line.strip()]
+
+
+def format_report(report):
+    lines = [f"Keyboard test: {report['tested']}/{report['expected']} keys pressed, {report['events']} events"]
+    if report["missing"]:
+        lines.append(f"Not pressed: {' '.join(report['missing'])}")
+    for key in report["chatter"]:
+        intervals = ", ".join(f"{interval:.1f}" for interval in report["keys"][key]["chatter_intervals_ms"])
+        lines.append(f"CHATTER on {key}: double press after {intervals} ms")
+    for key in report["stuck"]:
+        lines.append(f"STUCK {key}: down for {report['keys'][key]['down_ms'] / 1000:.1f} s")
+    for key in report["abnormal_holds"]:
+        entry = report["keys"][key]
+        lines.append(f"Abnormal hold on {key}: {entry['short_holds']} too short, {entry['long_holds']} too long "
+                     f"(p50 {entry['hold_ms']['p50']:.0f} ms)")
+    if not (report["missing"] or report["chatter"] or report["stuck"]):
+        lines.append("Keyboard test passed.")
+    return "\n".join(lines) + "\n"
+
+
+class KeyboardTestApp(tk.Toplevel):
+    def __init__(self, master, layout=DEFAULT_LAYOUT, analyzer=None):
+        super().__init__(master)
+        self.layout = load_layout(layout) if isinstance(layout, str) else layout
+        self.analyzer = analyzer or KeystrokeAnalyzer()
+        self.title(f"Keyboard Test - {self.layout.name}")
+        self.bind("<KeyPress>", self.on_key_press)
+        self.bind("<KeyRelease>", self.on_key_release)
+        self.tested_keys = set()
+        self._dirty = set()
+        self._repaint_pending = None
+
+        self.label = tk.Label(self, text="Press each key on the keyboard. The key will turn green when pressed.", font=("Arial", 14))
+        self.label.pack(pady=10)
+
+        width, height = self.layout.size
+        self.canvas = tk.Canvas(self, bg="white", highlightthickness=0,
+                                width=width * KEY_UNIT + KEY_GAP, height=height * KEY_UNIT + KEY_GAP)
+        self.canvas.pack(padx=10, pady=10)
+        self.key_items = {}
+        self.draw_keys()
+
+        self.status = tk.Label(self, text="", font=("Arial", 11), justify=tk.LEFT)
+        self.status.pack(pady=5)
+
+        self.fail_button = tk.Button(self, text="Test Failed", command=self.fail_test)
+        self.fail_button.pack(pady=10)
+        self.focus_force()
+
+    def draw_keys(self):
+        # One rectangle and one text item per key; colours change with itemconfig only
+        for cap in self.layout.caps:
+            x0, y0 = cap.x * KEY_UNIT + KEY_GAP, cap.y * KEY_UNIT + KEY_GAP
+            x1, y1 = (cap.x + cap.width) * KEY_UNIT, (cap.y + cap.height) * KEY_UNIT
+            rect = self.canvas.create_rectangle(x0, y0, x1, y1, fill=COLOURS["untested"], outline="")
+            self.canvas.create_text((x0 + x1) / 2, (y0 + y1) / 2, text=cap.label, fill="white",
+                                    font=("Arial", 9 if cap.height == 1 else 7))
+            self.key_items[cap.key] = rect
+
+    def _record(self, kind, event):
+        record = KeyEvent(kind, event.keysym, time.perf_counter_ns(), event.time or None)
+        key = self.layout.resolve(event.keysym)
+        self.analyzer.feed(record, key)
+        if key in self.key_items:
+            self._dirty.add(key)
+            if self._repaint_pending is None:
+                self._repaint_pending = self.after(REPAINT_MS, self.repaint)
+        return key
+
+    def on_key_press(self, event):
+        key = self._record("press", event)
+        if key in self.key_items:
+            self.tested_keys.add(key)
+
+    def on_key_release(self, event):
+        self._record("release", event)
+        if len(self.tested_keys) == len(self.key_items) and not any(
+                self.analyzer.keys[key].is_down for key in self.tested_keys):
+            self.finish()
+
+    def repaint(self):
+        self._repaint_pending = None
+        for key in self._dirty:
+            stats = self.analyzer.keys.get(key)
+            if self.analyzer.faulty(key):
+                colour = COLOURS["faulty"]
+            elif stats is not None and stats.is_down:
+                colour = COLOURS["down"]
+            elif key in self.tested_keys:
+                colour = COLOURS["tested"]
+            else:
+                colour = COLOURS["untested"]
+            self.canvas.itemconfig(self.key_items[key], fill=colour)
+        self._dirty.clear()
+        chatter = [key for key in self.analyzer.keys if self.analyzer.faulty(key)]
+        self.status.config(text=f"{len(self.tested_keys)}/{len(self.key_items)} keys"
+                                + (f"   chatter: {' '.join(chatter)}" if chatter else ""))
+
+    def _report(self):
+        report = self.analyzer.report(self.layout.keys, time.perf_counter_ns())
+        logging.info(f"Keyboard test: {json.dumps({k: v for k, v in report.items() if k != 'keys'})}")
+        if RECORD_DIR:
+            os.makedirs(RECORD_DIR, exist_ok=True)
+            path = os.path.join(RECORD_DIR, time.strftime("keyboard-%Y%m%d-%H%M%S.ndjson"))
+            save_recording(self.analyzer.events, path)
+            logging.info(f"Keyboard events saved to {path}")
+        return report
+
+    def finish(self):
+        report = self._report()
+        if report["chatter"] or report["stuck"]:
+            messagebox.showerror("Keyboard Test", format_report(report))
+        else:
+            messagebox.showinfo("Keyboard Test", format_report(report))
+        self.destroy()
+
+    def fail_test(self):
+        report = self._report()
+        messagebox.showerror("Keyboard Test", "Keyboard test failed.\n\n" + format_report(report))
+        self.destroy()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keyboard test, or replay of a recorded keyboard event stream.")
+    parser.add_argument("--layout", default=DEFAULT_LAYOUT, help=f"one of {', '.join(available_layouts())} or a file")
+    parser.add_argument("--replay", metavar="FILE", help="analyze a recording instead of opening the test window")
+    parser.add_argument("--chatter-ms", type=float, default=CHATTER_MS)
+    parser.add_argument("--long-hold-ms", type=float, default=LONG_HOLD_MS)
+    parser.add_argument("--stuck-ms", type=float, default=STUCK_MS)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    layout = load_layout(args.layout)
+    analyzer = KeystrokeAnalyzer(args.chatter_ms, long_hold_ms=args.long_hold_ms, stuck_ms=args.stuck_ms)
+    if args.replay is None:
+        root = tk.Tk()
+        root.withdraw()
+        app = KeyboardTestApp(root, layout, analyzer)
+        app.bind("<Destroy>", lambda event: root.quit() if event.widget is app else None)
+        root.mainloop()
+    else:
+        replay(load_recording(args.replay), layout, analyzer)
+    report = analyzer.report(layout.keys)
+    if args.json:
+        print(json.dumps(report))
+    else:
+        sys.stdout.write(format_report(report))
+    sys.exit(1 if report["chatter"] or report["stuck"] else 0)
+
+if __name__ == "__main__":
+    main()
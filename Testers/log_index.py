@@ -0,0 +1,315 @@
+import argparse
+import glob
+import gzip
+import hashlib
+import json
+import mmap
+import os
+import re
+import sqlite3
+from datetime import datetime
+
+# Index and query hardware_check.log. Records start with a timestamp line; the
+# upower and aplay dumps continue over the following lines, so a record runs
+# until the next timestamp. The log is memory-mapped and only the bytes added
+# since the last update are scanned; the index (offset, timestamp, level and
+# check type of every record) lives in a SQLite file next to the log.
+#
+# log_setup.py rotates the log into hardware_check.log.N.gz files, and a
+# rotation renames every one of them. So each file is a segment known by a
+# hash of its first line rather than by its name: the live file keeps its
+# entries when it becomes .1.gz, only what was written after the last update
+# is scanned, and segments whose file has been deleted are dropped.
+
+LOG_FILE = "hardware_check.log"
+
+RECORD_START = re.compile(
+    rb"^(\d{4})-(\d\d)-(\d\d) (\d\d):(\d\d):(\d\d),(\d{3}) ([A-Z]+):", re.MULTILINE)
+
+# Message prefix -> check type
+KINDS = [
+    (b"RAM Information", "ram"),
+    (b"Storage Information", "storage"),
+    (b"Battery Information", "battery"),
+    (b"CPU Information", "cpu"),
+    (b"Network Information", "network"),
+    (b"Audio Devices", "audio"),
+    (b"Available Ports", "ports"),
+    (b"Checking keyboard", "keyboard"),
+    (b"Keyboard", "keyboard"),
+    (b"Checking trackpad", "trackpad"),
+    (b"Trackpad", "trackpad"),
+    (b"Failed to check RAM", "ram"),
+    (b"Failed to check storage", "storage"),
+    (b"Failed to check battery", "battery"),
+    (b"Failed to check CPU", "cpu"),
+    (b"Failed to check network", "network"),
+    (b"Failed to check audio", "audio"),
+    (b"Failed to get available ports", "ports"),
+]
+
+COMPACT_PREFIX = b"Check result: "
+COMPACT_NAME = re.compile(rb'"name":"([a-z_]+)"')
+
+SCHEMA = """
+-- records and meta held the index of the live file alone; segments replace them
+DROP TABLE IF EXISTS records;
+DROP TABLE IF EXISTS meta;
+CREATE TABLE IF NOT EXISTS segments (
+    fingerprint TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    resume_offset INTEGER NOT NULL,
+    complete INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    segment TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    level TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    PRIMARY KEY (segment, offset)
+);
+CREATE INDEX IF NOT EXISTS entries_by_kind ON entries (kind, ts);
+CREATE INDEX IF NOT EXISTS entries_by_time ON entries (ts);
+"""
+
+# At most this much of a segment's first line is hashed to tell segments apart
+FINGERPRINT_BYTES = 256
+
+
+def _fingerprint(data):
+    # The first line, which starts with a millisecond timestamp and doesn't change as the file grows
+    head = data[:FINGERPRINT_BYTES]
+    newline = head.find(b"\n")
+    return hashlib.sha1(head[:newline + 1] if newline >= 0 else head).hexdigest()
+
+
+def _read_gzip(path):
+    with gzip.open(path, "rb") as f:
+        return f.read()
+
+
+def _classify(message):
+    if message.startswith(COMPACT_PREFIX):
+        match = COMPACT_NAME.search(message, 0, 200)
+        return match.group(1).decode() if match else "other"
+    for prefix, kind in KINDS:
+        if message.startswith(prefix):
+            return kind
+    return "other"
+
+
+class LogIndex:
+    def __init__(self, log_path=LOG_FILE, index_path=None):
+        self.log_path = log_path
+        self.index_path = index_path or log_path + ".idx.sqlite3"
+        self.db = sqlite3.connect(self.index_path)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def _open_map(self):
+        with open(self.log_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _rotated(self):
+        return sorted(glob.glob(glob.escape(self.log_path) + ".*.gz"))
+
+    def _segment(self, fingerprint):
+        # (resume_offset, complete) of a known segment, else None
+        return self.db.execute("SELECT resume_offset, complete FROM segments WHERE fingerprint = ?",
+                               (fingerprint,)).fetchone()
+
+    def _index(self, fingerprint, path, data, resume, complete):
+        # Scans data from resume and stores the records; returns how many
+        rows = []
+        starts = RECORD_START.finditer(data, resume)
+        match = next(starts, None)
+        while match is not None:
+            following = next(starts, None)
+            end = following.start() if following is not None else len(data)
+            year, month, day, hour, minute, second, millis = (int(g) for g in match.groups()[:7])
+            ts = datetime(year, month, day, hour, minute, second, millis * 1000).timestamp()
+            kind = _classify(data[match.end():min(match.end() + 200, end)])
+            rows.append((fingerprint, match.start(), end - match.start(), ts, match.group(8).decode(), kind))
+            match = following
+        with self.db:
+            self.db.execute("DELETE FROM entries WHERE segment = ? AND offset >= ?", (fingerprint, resume))
+            self.db.executemany("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?)", rows)
+            # The last record of the live file may still grow (a dump being
+            # written), so the next update starts again from its first byte
+            next_resume = rows[-1][1] if rows else resume
+            self.db.execute("INSERT OR REPLACE INTO segments VALUES (?, ?, ?, ?)",
+                            (fingerprint, path, next_resume, int(complete)))
+        return len(rows)
+
+    def update(self):
+        # Returns the number of records (re)indexed
+        seen, added = set(), 0
+        for path in self._rotated():
+            with gzip.open(path, "rb") as f:
+                fingerprint = _fingerprint(f.read(FINGERPRINT_BYTES))
+            seen.add(fingerprint)
+            known = self._segment(fingerprint)
+            if known is not None and known[1]:
+                # Renamed by a rotation but already fully indexed
+                with self.db:
+                    self.db.execute("UPDATE segments SET path = ? WHERE fingerprint = ?", (path, fingerprint))
+                continue
+            # New, or the former live file with whatever was written after the last update
+            added += self._index(fingerprint, path, _read_gzip(path), known[0] if known else 0, True)
+        mm = self._open_map() if os.path.exists(self.log_path) else None
+        if mm is not None:
+            try:
+                fingerprint = _fingerprint(mm)
+                seen.add(fingerprint)
+                known = self._segment(fingerprint)
+                resume = known[0] if known is not None and known[0] <= len(mm) else 0
+                added += self._index(fingerprint, self.log_path, mm, resume, False)
+            finally:
+                mm.close()
+        with self.db:
+            for (fingerprint,) in self.db.execute("SELECT fingerprint FROM segments").fetchall():
+                if fingerprint not in seen:
+                    self.db.execute("DELETE FROM entries WHERE segment = ?", (fingerprint,))
+                    self.db.execute("DELETE FROM segments WHERE fingerprint = ?", (fingerprint,))
+        return added
+
+    def records(self, kind=None, since=None, until=None):
+        # Yields (ts, level, kind, text) in log order, rotated segments included
+        query = "SELECT segment, offset, length, ts, level, kind FROM entries WHERE 1 = 1"
+        params = []
+        if kind is not None:
+            query += " AND kind = ?"
+            params.append(kind)
+        if since is not None:
+            query += " AND ts >= ?"
+            params.append(since)
+        if until is not None:
+            query += " AND ts < ?"
+            params.append(until)
+        query += " ORDER BY ts, offset"
+        paths = dict(self.db.execute("SELECT fingerprint, path FROM segments"))
+        current, data = None, None
+        try:
+            for segment, offset, length, ts, level, record_kind in self.db.execute(query, params).fetchall():
+                if segment != current:
+                    if isinstance(data, mmap.mmap):
+                        data.close()
+                    path = paths[segment]
+                    data = _read_gzip(path) if path.endswith(".gz") else self._open_map()
+                    current = segment
+                text = data[offset:offset + length].decode(errors="replace")
+                yield ts, level, record_kind, text
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+
+    def counts(self):
+        return self.db.execute(
+            "SELECT kind, COUNT(*), MIN(ts), MAX(ts) FROM entries GROUP BY kind ORDER BY kind").fetchall()
+
+
+def _compact_record(text):
+    _, _, payload = text.partition(COMPACT_PREFIX.decode())
+    try:
+        return json.loads(payload)
+    except ValueError:
+        return None
+
+
+BATTERY_FIELD = re.compile(r"^\s*(native-path|energy-full|energy-full-design):\s+(\S+)", re.MULTILINE)
+
+
+def battery_capacity(index, since=None, until=None):
+    # Yields (ts, battery, energy_full, energy_full_design, health%)
+    for ts, _, _, text in index.records("battery", since, until):
+        record = _compact_record(text) if COMPACT_PREFIX.decode() in text else None
+        if record is not None:
+            for battery in record.get("delta", {}).get("batteries", []):
+                if battery.get("energy_full") and battery.get("energy_full_design"):
+                    yield (ts, battery["name"], battery["energy_full"], battery["energy_full_design"],
+                           battery["energy_full"] / battery["energy_full_design"] * 100)
+            continue
+        name, full, design = "BAT0", None, None
+        for field, value in BATTERY_FIELD.findall(text):
+            if field == "native-path":
+                name, full, design = value, None, None
+            elif field == "energy-full":
+                full = float(value)
+            else:
+                design = float(value)
+            if full is not None and design:
+                yield ts, name, full, design, full / design * 100
+                full, design = None, None
+
+
+CPU_FIELD = re.compile(r"(user|system|idle)=([\d.]+)")
+
+
+def cpu_usage(index, since=None, until=None):
+    # Yields (ts, user%, system%, idle%)
+    last = {"user": None, "system": None, "idle": None}
+    for ts, _, _, text in index.records("cpu", since, until):
+        record = _compact_record(text) if COMPACT_PREFIX.decode() in text else None
+        if record is not None:
+            # Compact records only carry what changed since the previous run
+            last.update({key: record.get("delta", {}).get(key, last[key]) for key in last})
+        else:
+            values = dict(CPU_FIELD.findall(text))
+            if not values:
+                continue
+            last = {key: float(values[key]) if key in values else None for key in last}
+        yield ts, last["user"], last["system"], last["idle"]
+
+
+def _parse_time(value):
+    return datetime.fromisoformat(value).timestamp() if value else None
+
+
+def _format_time(ts):
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index and query hardware_check.log history.")
+    parser.add_argument("--log", default=LOG_FILE)
+    parser.add_argument("--since", help="ISO date/time, e.g. 2024-05-22 or 2024-05-22T23:00")
+    parser.add_argument("--until", help="ISO date/time")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("update", help="index records added since the last update, rotated files included")
+    commands.add_parser("summary", help="record counts per check type")
+    commands.add_parser("battery", help="energy-full vs energy-full-design over time")
+    commands.add_parser("cpu", help="CPU user/system/idle over time")
+    records = commands.add_parser("records", help="print raw records")
+    records.add_argument("--kind")
+    args = parser.parse_args()
+
+    index = LogIndex(args.log)
+    try:
+        added = index.update()
+        since, until = _parse_time(args.since), _parse_time(args.until)
+        if args.command == "update":
+            print(f"Indexed {added} records.")
+        elif args.command == "summary":
+            for kind, count, first, last in index.counts():
+                print(f"{kind:<10} {count:>8}  {_format_time(first)} .. {_format_time(last)}")
+        elif args.command == "battery":
+            for ts, name, full, design, health in battery_capacity(index, since, until):
+                print(f"{_format_time(ts)}  {name}  energy-full: {full:g} Wh  "
+                      f"energy-full-design: {design:g} Wh  health: {health:.2f}%")
+        elif args.command == "cpu":
+            for ts, user, system, idle in cpu_usage(index, since, until):
+                print(f"{_format_time(ts)}  user: {user}%  system: {system}%  idle: {idle}%")
+        else:
+            for ts, level, kind, text in index.records(args.kind, since, until):
+                print(text, end="" if text.endswith("\n") else "\n")
+    finally:
+        index.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+
+# Logging for the check scripts. Records are handed to a QueueListener thread
+# that does the file I/O, so a check never waits on the disk. The file is
+# rotated by size (or by time) and rotated files are gzip-compressed, which
+# keeps kiosk stations from filling their disks.
+#
+# In compact mode checks skip the raw upower/psutil dumps and each result is
+# logged as one JSON line holding only the metrics that changed since the
+# previous run of that check.
+#
+# logging.handlers and gzip are imported when logging is configured, since
+# the checks import this module for compact_mode() even when nothing is logged.
+
+LOG_FILE = "hardware_check.log"
+LOG_FORMAT = '%(asctime)s %(levelname)s:%(message)s'
+MAX_BYTES = 5 * 1024 * 1024
+BACKUP_COUNT = 5
+
+_compact = False
+_listener = None
+_queue_handler = None
+_state_path = None
+_last_metrics = {}
+_state_lock = threading.Lock()
+
+
+def _gzip_namer(name):
+    return name + ".gz"
+
+
+def _gzip_rotator(source, dest):
+    import gzip
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+def configure_logging(filename=LOG_FILE, max_bytes=MAX_BYTES, backup_count=BACKUP_COUNT,
+                      when=None, compact=None, level=logging.INFO):
+    # when: rotate by time instead of size, e.g. "midnight" (see TimedRotatingFileHandler)
+    # compact: defaults to the HARDWARE_CHECK_LOG_COMPACT environment variable
+    global _compact, _listener, _queue_handler, _state_path
+    from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+
+    if _listener is not None:
+        return _listener
+    if compact is None:
+        compact = os.environ.get("HARDWARE_CHECK_LOG_COMPACT", "") not in ("", "0")
+    _compact = compact
+
+    if when:
+        handler = TimedRotatingFileHandler(filename, when=when, backupCount=backup_count)
+    else:
+        handler = RotatingFileHandler(filename, maxBytes=max_bytes, backupCount=backup_count)
+    handler.namer = _gzip_namer
+    handler.rotator = _gzip_rotator
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(level)
+    _queue_handler = QueueHandler(log_queue)
+    root.addHandler(_queue_handler)
+    _listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+    if compact:
+        _state_path = filename + ".state.json"
+        try:
+            with open(_state_path) as f:
+                _last_metrics.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+    return _listener
+
+
+def stop_logging():
+    # Flushes queued records and closes the file; also runs at exit. Records
+    # logged afterwards go to the root logger's other handlers, if any.
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    logging.getLogger().removeHandler(_queue_handler)
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+    _queue_handler = None
+    if _state_path is not None:
+        with _state_lock:
+            tmp_path = _state_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(_last_metrics, f, separators=(",", ":"))
+            os.replace(tmp_path, _state_path)
+
+
+def compact_mode():
+    return _compact
+
+
+def log_result(result):
+    # Compact mode only: one line per check with the metrics that changed
+    with _state_lock:
+        previous = _last_metrics.get(result.name, {})
+        delta = {key: value for key, value in result.metrics.items() if previous.get(key) != value}
+        _last_metrics[result.name] = result.metrics
+    record = {
+        "name": result.name,
+        "status": result.status,
+        "started": round(result.started, 3),
+        "duration": round(result.duration, 6),
+        "delta": delta,
+    }
+    if result.message:
+        record["message"] = result.message
+    level = logging.ERROR if result.status == "error" else logging.INFO
+    logging.log(level, "Check result: " + json.dumps(record, separators=(",", ":")))
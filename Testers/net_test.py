@@ -0,0 +1,331 @@
+import argparse
+import asyncio
+import json
+import os
+import socket
+import struct
+import sys
+import time
+
+import psutil
+
+from results import PASS, WARN
+from stats import summarize
+
+# Link test against a peer running `net_test.py --serve`: another station on
+# the intake bench, or the same machine over loopback or a veth pair for a
+# self-test. Every connection starts with a one-line mode:
+#   SINK    the client sends for a while; the server discards it and, at EOF,
+#           answers with the byte count it received
+#   SOURCE  the server sends until the client hangs up
+#   ECHO    the server echoes every message back, for round-trip times
+# Goodput is measured with several parallel streams so one TCP window doesn't
+# cap a fast link. The error and drop counters of the interface are read
+# before and after, since a bad cable shows up there before it shows up in
+# the throughput.
+#
+# Binding to an interface's address doesn't stop the routing table sending
+# the packets out of another NIC, so a named interface is pinned with
+# SO_BINDTODEVICE. That needs CAP_NET_RAW on kernels before 5.7; without it
+# only the address is bound, and the byte counters show which NIC actually
+# carried the traffic.
+
+PORT = 8751
+PEER = os.environ.get("HARDWARE_CHECK_NET_PEER")  # host[:port] the network_link check tests against
+STREAMS = 4
+DURATION = 5.0           # seconds per direction
+CHUNK = 256 * 1024
+PINGS = 200
+PING_SIZE = 64
+CONNECT_TIMEOUT = 5.0
+MIN_LINK_FRACTION = 0.5  # goodput under half the negotiated speed is a degraded link
+MAX_RTT_P99_MS = 5.0     # peers are on the same switch
+COUNTERS = ("errin", "errout", "dropin", "dropout")
+
+MB = 1000 * 1000
+
+
+async def _hangup(reader):
+    try:
+        await reader.read()
+    except ConnectionError:
+        pass
+
+
+class LinkTestServer:
+    # The peer side. close() also ends the connections still being served,
+    # so a self-test can shut its server down cleanly.
+    def __init__(self):
+        self.server = None
+        self.handlers = set()
+
+    async def start(self, host="0.0.0.0", port=PORT):
+        self.server = await asyncio.start_server(self._handle, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+        for handler in self.handlers:
+            handler.cancel()
+        await asyncio.gather(*self.handlers, return_exceptions=True)
+
+    async def _handle(self, reader, writer):
+        self.handlers.add(asyncio.current_task())
+        try:
+            mode = (await reader.readline()).strip()
+            if mode == b"SINK":
+                received = 0
+                while chunk := await reader.read(CHUNK):
+                    received += len(chunk)
+                writer.write(struct.pack("!Q", received))
+                await writer.drain()
+            elif mode == b"SOURCE":
+                payload = os.urandom(CHUNK)
+                # The client closing its side is the signal to stop
+                hangup = asyncio.ensure_future(_hangup(reader))
+                try:
+                    while not hangup.done():
+                        writer.write(payload)
+                        await writer.drain()
+                finally:
+                    hangup.cancel()
+            elif mode == b"ECHO":
+                while message := await reader.read(65536):
+                    writer.write(message)
+                    await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass  # SOURCE clients reset the connection; close() cancels what is left
+        finally:
+            writer.close()
+            self.handlers.discard(asyncio.current_task())
+
+
+def binding_for(interface):
+    # ("device", name) if SO_BINDTODEVICE is allowed here, else ("address", its IPv4 address)
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+        try:
+            probe.setsockopt(socket.SOL_SOCKET, socket.SO_BINDTODEVICE, interface.encode())
+            return "device", interface
+        except (AttributeError, OSError):
+            return "address", interface_address(interface)
+
+
+async def _open(host, port, bind):
+    if bind is None:
+        return await asyncio.open_connection(host, port)
+    kind, value = bind
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        if kind == "device":
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_BINDTODEVICE, value.encode())
+        else:
+            sock.bind((value, 0))
+        sock.setblocking(False)
+        await asyncio.get_running_loop().sock_connect(sock, (host, port))
+    except BaseException:
+        sock.close()
+        raise
+    return await asyncio.open_connection(sock=sock)
+
+
+async def _connect(host, port, mode, bind=None):
+    # bind: None to let the route decide, or a binding_for() result
+    reader, writer = await asyncio.wait_for(_open(host, port, bind), CONNECT_TIMEOUT)
+    writer.get_extra_info("socket").setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    writer.write(mode + b"\n")
+    return reader, writer
+
+
+async def _upload_stream(host, port, deadline, bind):
+    reader, writer = await _connect(host, port, b"SINK", bind)
+    payload = os.urandom(CHUNK)
+    try:
+        while time.monotonic() < deadline:
+            writer.write(payload)
+            await writer.drain()
+        writer.write_eof()
+        # What the peer actually received, not what left our socket buffer
+        return struct.unpack("!Q", await reader.readexactly(8))[0]
+    finally:
+        writer.close()
+
+
+async def _download_stream(host, port, deadline, bind):
+    reader, writer = await _connect(host, port, b"SOURCE", bind)
+    received = 0
+    try:
+        while time.monotonic() < deadline:
+            chunk = await reader.read(CHUNK)
+            if not chunk:
+                break
+            received += len(chunk)
+        return received
+    finally:
+        writer.close()
+
+
+async def measure_goodput(host, port=PORT, direction="upload", streams=STREAMS, duration=DURATION, bind=None):
+    stream = _upload_stream if direction == "upload" else _download_stream
+    start = time.monotonic()
+    received = await asyncio.gather(*(stream(host, port, start + duration, bind) for _ in range(streams)))
+    elapsed = time.monotonic() - start
+    return {"bytes": sum(received), "seconds": elapsed, "mb_s": sum(received) / elapsed / MB,
+            "streams": [count / elapsed / MB for count in received]}
+
+
+async def measure_rtt(host, port=PORT, pings=PINGS, size=PING_SIZE, bind=None):
+    reader, writer = await _connect(host, port, b"ECHO", bind)
+    message = os.urandom(size)
+    rtts = []
+    try:
+        for _ in range(pings):
+            start = time.perf_counter_ns()
+            writer.write(message)
+            await reader.readexactly(size)
+            rtts.append((time.perf_counter_ns() - start) / 1e6)
+        local = writer.get_extra_info("sockname")[0]
+    finally:
+        writer.close()
+    return summarize(rtts, (50, 90, 99)), local
+
+
+def interface_for(address):
+    # The interface holding the local address a connection went out from
+    for name, addrs in psutil.net_if_addrs().items():
+        if any(addr.address.split("%")[0] == address for addr in addrs):
+            return name
+    return None
+
+
+def interface_address(name):
+    for addr in psutil.net_if_addrs().get(name, ()):
+        if addr.family == socket.AF_INET:
+            return addr.address
+    raise ValueError(f"{name} has no IPv4 address")
+
+
+async def run_link_test(host, port=PORT, interface=None, streams=STREAMS, duration=DURATION, pings=PINGS):
+    # One interface against one peer; without `interface` the route decides
+    bind = binding_for(interface) if interface else None
+    before = psutil.net_io_counters(pernic=True)
+    rtt, local = await measure_rtt(host, port, pings, bind=bind)
+    interface = interface or interface_for(local)
+    upload = await measure_goodput(host, port, "upload", streams, duration, bind)
+    download = await measure_goodput(host, port, "download", streams, duration, bind)
+    after = psutil.net_io_counters(pernic=True)
+    counters = {}
+    if interface in before and interface in after:
+        counters = {name: getattr(after[interface], name) - getattr(before[interface], name) for name in COUNTERS}
+    # The test traffic dwarfs everything else, so the NIC that sent the most carried it
+    sent = {name: after[name].bytes_sent - before[name].bytes_sent for name in before if name in after}
+    stats = psutil.net_if_stats().get(interface)
+    return {
+        "peer": f"{host}:{port}",
+        "interface": interface,
+        "binding": bind[0] if bind else None,
+        "carried_by": max(sent, key=sent.get) if sent else None,
+        "speed_mbit": stats.speed if stats else None,  # 0 when the driver doesn't say
+        "rtt_ms": rtt,
+        "upload": upload,
+        "download": download,
+        "counters": counters,
+    }
+
+
+def grade(report):
+    # Returns (PASS or WARN, [problems])
+    problems = []
+    carried_by = report.get("carried_by")
+    if carried_by and report["interface"] and carried_by != report["interface"]:
+        problems.append(f"traffic went out {carried_by}, not {report['interface']}")
+    for name, delta in report["counters"].items():
+        if delta:
+            problems.append(f"{delta} {name} during the test")
+    speed = report["speed_mbit"]
+    if speed:
+        floor = speed / 8 * MIN_LINK_FRACTION  # Mbit/s to MB/s
+        for direction in ("upload", "download"):
+            if report[direction]["mb_s"] < floor:
+                problems.append(f"{direction} {report[direction]['mb_s']:.1f} MB/s on a {speed} Mbit/s link")
+    if report["rtt_ms"]["p99"] > MAX_RTT_P99_MS:
+        problems.append(f"RTT p99 {report['rtt_ms']['p99']:.2f} ms")
+    return (WARN if problems else PASS), problems
+
+
+def format_report(report):
+    rtt = report["rtt_ms"]
+    speed = f", link {report['speed_mbit']} Mbit/s" if report["speed_mbit"] else ""
+    bound = " (bound by source address only)" if report.get("binding") == "address" else ""
+    lines = [f"{report['interface'] or '?'}{bound} to {report['peer']}{speed}",
+             f"  Upload:   {report['upload']['mb_s']:.1f} MB/s over {len(report['upload']['streams'])} streams",
+             f"  Download: {report['download']['mb_s']:.1f} MB/s over {len(report['download']['streams'])} streams",
+             f"  RTT: p50 {rtt['p50']:.3f} ms, p90 {rtt['p90']:.3f} ms, p99 {rtt['p99']:.3f} ms, max {rtt['max']:.3f} ms"]
+    if report["counters"]:
+        lines.append("  Counters: " + ", ".join(f"{name} +{delta}" for name, delta in report["counters"].items()))
+    _, problems = grade(report)
+    lines.extend(f"  DEGRADED: {problem}" for problem in problems)
+    return "\n".join(lines) + "\n"
+
+
+def parse_peer(peer):
+    host, _, port = peer.rpartition(":") if peer.count(":") == 1 else (peer, "", "")
+    return host, int(port) if port else PORT
+
+
+async def _self_test(streams, duration, pings):
+    # Serve and test over loopback in one event loop
+    server = LinkTestServer()
+    port = await server.start("127.0.0.1", 0)
+    try:
+        return await run_link_test("127.0.0.1", port, None, streams, duration, pings)
+    finally:
+        await server.close()
+
+
+async def _serve(host, port):
+    server = LinkTestServer()
+    await server.start(host, port)
+    print(f"Serving link tests on {host}:{port}", file=sys.stderr)
+    await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure goodput, RTT and error counters against a peer.")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--peer", help="host[:port] of a station running --serve")
+    mode.add_argument("--serve", action="store_true", help="act as the peer")
+    mode.add_argument("--loopback", action="store_true", help="serve and test on this machine")
+    parser.add_argument("--bind", default="0.0.0.0", help="address to serve on")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--interface", action="append", help="test through this interface (repeatable)")
+    parser.add_argument("--streams", type=int, default=STREAMS)
+    parser.add_argument("--duration", type=float, default=DURATION, help="seconds per direction")
+    parser.add_argument("--pings", type=int, default=PINGS)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    if args.serve:
+        try:
+            asyncio.run(_serve(args.bind, args.port))
+        except KeyboardInterrupt:
+            pass
+        return
+    if args.loopback:
+        reports = [asyncio.run(_self_test(args.streams, args.duration, args.pings))]
+    else:
+        host, port = parse_peer(args.peer)
+        reports = [asyncio.run(run_link_test(host, port, interface, args.streams, args.duration, args.pings))
+                   for interface in args.interface or [None]]
+    if args.json:
+        print(json.dumps(reports))
+    else:
+        sys.stdout.write("".join(format_report(report) for report in reports))
+    sys.exit(1 if any(grade(report)[0] != PASS for report in reports) else 0)
+
+if __name__ == "__main__":
+    main()
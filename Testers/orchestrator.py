@@ -0,0 +1,285 @@
+import argparse
+import asyncio
+import io
+import json
+import os
+import shlex
+import shutil
+import sys
+import tarfile
+import tempfile
+import time
+
+from registry import PROFILES, resolve
+
+# Runs the non-interactive checks on many hosts at once over SSH. Each host
+# gets one OpenSSH master connection (ControlMaster); copying the scripts
+# and running hwcheck.py then reuse it without authenticating again. At most
+# `parallel` hosts are worked on at the same time and every host has a time
+# limit. hwcheck.py prints one NDJSON line per check as it finishes, so
+# results are reported as they arrive and gathered into one fleet report.
+# Needs nothing on the hosts but sshd and python3. Every command started
+# over a connection is killed when the connection is closed, so a host that
+# times out mid-copy leaves nothing behind.
+
+SSH = "ssh"
+PARALLEL = 8
+HOST_TIMEOUT = 300.0       # seconds per host, connecting and copying included
+CONNECT_TIMEOUT = 15.0
+PROFILE = "standard"
+REMOTE_DIR = ".hwcheck"    # relative to the remote home directory
+REMOTE_PYTHON = "python3"
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+CONTROL_POLL_INTERVAL = 0.1
+
+# Host outcomes besides the check statuses
+UNREACHABLE = "unreachable"
+TIMED_OUT = "timed out"
+FAILED = "failed"          # hwcheck.py didn't run to the end
+
+
+def parse_host(spec):
+    # "user@host:port" -> ("user@host", "port" or None); IPv6 needs [brackets]
+    if spec.startswith("[") or "]" in spec:
+        host, _, port = spec.partition("]")
+        return host.replace("[", "", 1), port.lstrip(":") or None
+    if spec.count(":") == 1:
+        host, _, port = spec.partition(":")
+        return host, port
+    return spec, None
+
+
+def non_interactive_checks(profile):
+    return [spec.name for spec in resolve(profile) if not spec.interactive and not spec.main_thread]
+
+
+class SshMaster:
+    # One ControlMaster connection; run() multiplexes commands over it
+    def __init__(self, spec, control_dir, ssh=SSH, options=()):
+        self.spec = spec
+        self.target, self.port = parse_host(spec)
+        self.ssh = ssh
+        # %C is a hash of the user, host and port, short enough for a socket path
+        self.control_path = os.path.join(control_dir, "%C")
+        self.options = ["-o", "BatchMode=yes", "-o", f"ConnectTimeout={int(CONNECT_TIMEOUT)}",
+                        "-o", f"ControlPath={self.control_path}", *options]
+        if self.port:
+            self.options += ["-p", self.port]
+        self.process = None
+        self.children = []  # processes started by run()
+
+    def _command(self, *extra):
+        return [self.ssh, *self.options, *extra, self.target]
+
+    async def open(self):
+        self.process = await asyncio.create_subprocess_exec(
+            *self._command("-M", "-N"), stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE)
+        # The master is up once `ssh -O check` can talk to it
+        deadline = time.monotonic() + CONNECT_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.process.returncode is not None:
+                error = (await self.process.stderr.read()).decode(errors="replace").strip()
+                raise ConnectionError(error or f"ssh exited with status {self.process.returncode}")
+            check = await asyncio.create_subprocess_exec(
+                *self._command("-O", "check"), stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL)
+            if await check.wait() == 0:
+                return
+            try:
+                await asyncio.wait_for(self.process.wait(), CONTROL_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+        raise ConnectionError(f"no connection after {CONNECT_TIMEOUT:.0f} s")
+
+    async def run(self, command, stdin=None):
+        # Returns the process with stdout piped; the command goes through the master
+        process = await asyncio.create_subprocess_exec(
+            *self._command("-o", "ControlMaster=no"), command,
+            stdin=asyncio.subprocess.PIPE if stdin is not None else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        self.children.append(process)
+        return process
+
+    async def close(self):
+        for child in self.children:
+            if child.returncode is None:
+                child.kill()
+                await child.wait()
+        if self.process is None or self.process.returncode is not None:
+            return
+        exit_ = await asyncio.create_subprocess_exec(
+            *self._command("-O", "exit"), stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL)
+        await exit_.wait()
+        try:
+            await asyncio.wait_for(self.process.wait(), CONNECT_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.process.kill()
+            await self.process.wait()
+
+
+def _archive_scripts():
+    # The scripts as an uncompressed tar in memory; the non-interactive checks need no data files
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tar:
+        for name in sorted(os.listdir(SCRIPTS_DIR)):
+            if name.endswith(".py"):
+                tar.add(os.path.join(SCRIPTS_DIR, name), arcname=name)
+    return buffer.getvalue()
+
+
+async def _deploy(master, archive, remote_dir):
+    directory = shlex.quote(remote_dir)
+    process = await master.run(f"mkdir -p {directory} && tar -x -C {directory}", stdin=archive)
+    _, error = await process.communicate(archive)
+    if process.returncode != 0:
+        raise OSError(f"copying the scripts failed: {error.decode(errors='replace').strip()}")
+
+
+async def run_host(spec, checks, control_dir, on_result, archive=None, remote_dir=REMOTE_DIR,
+                   remote_python=REMOTE_PYTHON, ssh=SSH, options=()):
+    # Returns {"host", "outcome", "results", "error", "seconds"}; on_result(host, record)
+    # is called for every check as its line arrives
+    report = {"host": spec, "outcome": None, "results": [], "error": None, "seconds": 0.0}
+    start = time.monotonic()
+    master = SshMaster(spec, control_dir, ssh, options)
+    try:
+        try:
+            await master.open()
+        except ConnectionError as e:
+            report.update(outcome=UNREACHABLE, error=str(e))
+            return report
+        if archive is not None:
+            await _deploy(master, archive, remote_dir)
+        process = await master.run(f"cd {shlex.quote(remote_dir)} && {shlex.quote(remote_python)} hwcheck.py "
+                                   f"--checks {','.join(checks)} --format ndjson --no-log")
+        # Drained alongside stdout so a chatty remote can't fill the pipe and stall
+        stderr = asyncio.ensure_future(process.stderr.read())
+        async for line in process.stdout:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            report["results"].append(record)
+            on_result(spec, record)
+        error = (await stderr).decode(errors="replace").strip()
+        # hwcheck.py exits 1 when a check fails; anything else means it didn't finish
+        if await process.wait() not in (0, 1) or len(report["results"]) < len(checks):
+            report.update(outcome=FAILED, error=error.splitlines()[-1] if error else f"exit status {process.returncode}")
+        else:
+            report["outcome"] = _worst(record["status"] for record in report["results"])
+    except asyncio.CancelledError:
+        report.update(outcome=TIMED_OUT, error=f"gave up after {time.monotonic() - start:.0f} s")
+    except OSError as e:
+        report.update(outcome=FAILED, error=str(e))
+    finally:
+        await master.close()
+        report["seconds"] = time.monotonic() - start
+    return report
+
+
+STATUS_ORDER = ("pass", "skip", "warn", "fail", "error")
+
+
+def _worst(statuses):
+    return max(statuses, key=STATUS_ORDER.index, default="pass")
+
+
+async def run_fleet(hosts, checks, on_result, parallel=PARALLEL, host_timeout=HOST_TIMEOUT, deploy=True,
+                    remote_dir=REMOTE_DIR, remote_python=REMOTE_PYTHON, ssh=SSH, options=()):
+    archive = _archive_scripts() if deploy else None
+    semaphore = asyncio.Semaphore(parallel)
+    control_dir = tempfile.mkdtemp(prefix="hwcheck-ssh-")
+
+    async def one(spec):
+        async with semaphore:
+            task = asyncio.ensure_future(run_host(spec, checks, control_dir, on_result, archive, remote_dir,
+                                                  remote_python, ssh, options))
+            # Cancelling lets run_host close its connections and say how far it got
+            done, _ = await asyncio.wait({task}, timeout=host_timeout)
+            if not done:
+                task.cancel()
+            return await task
+
+    try:
+        return await asyncio.gather(*(one(spec) for spec in hosts))
+    finally:
+        shutil.rmtree(control_dir, ignore_errors=True)
+
+
+def aggregate(reports):
+    # Fleet totals: host outcomes, and per check how many hosts got each status
+    outcomes, checks = {}, {}
+    for report in reports:
+        outcomes[report["outcome"]] = outcomes.get(report["outcome"], 0) + 1
+        for record in report["results"]:
+            counts = checks.setdefault(record["name"], {})
+            counts[record["status"]] = counts.get(record["status"], 0) + 1
+    return {"hosts": len(reports), "outcomes": outcomes, "checks": checks}
+
+
+def format_result_line(host, record):
+    message = record["message"].splitlines()[0] if record.get("message") else ""
+    return f"{host}: {record['name']} {record['status']}{f' - {message}' if message else ''}"
+
+
+def format_fleet_report(reports):
+    summary = aggregate(reports)
+    lines = [f"Fleet report for {summary['hosts']} hosts: "
+             + ", ".join(f"{count} {outcome}" for outcome, count in sorted(summary["outcomes"].items()))]
+    for name, counts in sorted(summary["checks"].items()):
+        lines.append(f"  {name:<18} " + ", ".join(f"{counts[status]} {status}"
+                                                  for status in STATUS_ORDER if status in counts))
+    problems = [report for report in reports if report["outcome"] not in ("pass", "skip")]
+    if problems:
+        lines.append("Hosts needing attention:")
+    for report in sorted(problems, key=lambda report: report["host"]):
+        failed = [record["name"] for record in report["results"] if record["status"] in ("warn", "fail", "error")]
+        detail = report["error"] or ", ".join(failed)
+        lines.append(f"  {report['host']:<24} {report['outcome']:<11} {detail}")
+    return "\n".join(lines) + "\n"
+
+
+def read_hosts(path):
+    with open(path) as f:
+        return [line.split("#")[0].strip() for line in f if line.split("#")[0].strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the non-interactive checks on many hosts over SSH.")
+    parser.add_argument("hosts", nargs="*", help="[user@]host[:port]")
+    parser.add_argument("--hosts-file", help="one host per line, # comments allowed")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default=PROFILE)
+    parser.add_argument("--parallel", type=int, default=PARALLEL, help="hosts worked on at once")
+    parser.add_argument("--timeout", type=float, default=HOST_TIMEOUT, help="seconds per host")
+    parser.add_argument("--no-deploy", action="store_true", help="the scripts are already in --remote-dir")
+    parser.add_argument("--remote-dir", default=REMOTE_DIR)
+    parser.add_argument("--remote-python", default=REMOTE_PYTHON)
+    parser.add_argument("--ssh", default=SSH, help="ssh client to use")
+    parser.add_argument("-o", dest="options", action="append", default=[], metavar="OPTION",
+                        help="extra ssh option, e.g. -o StrictHostKeyChecking=accept-new")
+    parser.add_argument("--json", action="store_true", help="print the reports as JSON at the end")
+    args = parser.parse_args()
+
+    hosts = list(args.hosts)
+    if args.hosts_file:
+        hosts += read_hosts(args.hosts_file)
+    if not hosts:
+        parser.error("no hosts given")
+    checks = non_interactive_checks(args.profile)
+    options = [item for option in args.options for item in ("-o", option)]
+
+    def show(host, record):
+        print(format_result_line(host, record), file=sys.stderr if args.json else sys.stdout, flush=True)
+
+    reports = asyncio.run(run_fleet(hosts, checks, show, args.parallel, args.timeout, not args.no_deploy,
+                                    args.remote_dir, args.remote_python, args.ssh, options))
+    if args.json:
+        print(json.dumps({"summary": aggregate(reports), "hosts": reports}))
+    else:
+        sys.stdout.write(format_fleet_report(reports))
+    sys.exit(0 if all(report["outcome"] in ("pass", "skip", "warn") for report in reports) else 1)
+
+if __name__ == "__main__":
+    main()
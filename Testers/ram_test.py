@@ -0,0 +1,238 @@
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from array import array
+
+import psutil
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# In-OS memory test. A fraction of the available RAM is split across one
+# worker process per core; each worker fills its share with the classic
+# patterns (walking ones, checkerboard, address-in-address and their
+# inverses) and reads it back. NumPy does the fills and compares when it is
+# installed; without it the same work is done with bytes slice operations.
+# Buffers are processed in chunks so verification never needs a second copy.
+#
+# A full pass is 68 fill-and-verify sweeps (64 of them walking ones), which
+# can take many minutes on a large machine. With a time budget the workers
+# stop starting new sweeps once it is spent; the patterns' sweeps are
+# interleaved so a run cut short has still tried every pattern.
+
+WORD = 8
+CHUNK_WORDS = 1024 * 1024  # 8 MiB per fill/compare step
+MASK = (1 << 64) - 1
+PATTERNS = ("walking_ones", "checkerboard", "address")
+
+
+class _Buffer:
+    # Word-addressed view of a bytearray with chunked fill and verify
+
+    def __init__(self, words):
+        self.words = words
+        self.raw = bytearray(words * WORD)
+        self.view = numpy.frombuffer(self.raw, dtype=numpy.uint64) if numpy is not None else None
+        self.bytes_written = 0
+        self.bytes_read = 0
+        self.write_time = 0.0
+        self.read_time = 0.0
+
+    def _chunks(self):
+        for start in range(0, self.words, CHUNK_WORDS):
+            yield start, min(start + CHUNK_WORDS, self.words)
+
+    def _expected(self, pattern, start, end):
+        # pattern: an int for a constant word, or a callable(start, end) building the chunk
+        count = end - start
+        if callable(pattern):
+            return pattern(start, end)
+        if numpy is not None:
+            return numpy.full(count, pattern, dtype=numpy.uint64)
+        return pattern.to_bytes(WORD, "little") * count
+
+    def _head(self, expected, count):
+        # First `count` words of a prepared chunk
+        return expected[:count] if numpy is not None else expected[:count * WORD]
+
+    def fill(self, pattern):
+        constant = None if callable(pattern) else self._expected(pattern, 0, min(CHUNK_WORDS, self.words))
+        start_time = time.perf_counter()
+        for start, end in self._chunks():
+            expected = self._head(constant, end - start) if constant is not None else self._expected(pattern, start, end)
+            if numpy is not None:
+                self.view[start:end] = expected
+            else:
+                self.raw[start * WORD:end * WORD] = expected
+        self.write_time += time.perf_counter() - start_time
+        self.bytes_written += self.words * WORD
+
+    def verify(self, pattern, first_errors):
+        # Returns the number of mismatching words; offsets of the first few go in first_errors
+        constant = None if callable(pattern) else self._expected(pattern, 0, min(CHUNK_WORDS, self.words))
+        errors = 0
+        start_time = time.perf_counter()
+        for start, end in self._chunks():
+            expected = self._head(constant, end - start) if constant is not None else self._expected(pattern, start, end)
+            if numpy is not None:
+                mismatches = self.view[start:end] != expected
+                count = int(numpy.count_nonzero(mismatches))
+                if count and len(first_errors) < 16:
+                    first_errors.extend((start + int(i)) * WORD for i in numpy.flatnonzero(mismatches)[:16])
+            else:
+                # Slicing the bytearray copies the chunk, but the compare is then a single memcmp
+                actual = self.raw[start * WORD:end * WORD]
+                count = 0
+                if actual != expected:
+                    for i in range(0, len(expected), WORD):
+                        if actual[i:i + WORD] != expected[i:i + WORD]:
+                            count += 1
+                            if len(first_errors) < 16:
+                                first_errors.append(start * WORD + i)
+            errors += count
+        self.read_time += time.perf_counter() - start_time
+        self.bytes_read += self.words * WORD
+        return errors
+
+
+def _address_pattern(base, invert):
+    # Each word holds its own (global) word index, or its complement
+    if numpy is not None:
+        def build(start, end):
+            words = numpy.arange(base + start, base + end, dtype=numpy.uint64)
+            return ~words if invert else words
+    else:
+        def build(start, end):
+            words = array("Q", range(base + start, base + end))
+            if invert:
+                words = array("Q", (~word & MASK for word in words))
+            return words.tobytes()
+    return build
+
+
+def _pattern_steps(name, base):
+    if name == "walking_ones":
+        return [(f"walking_ones_bit{bit}", 1 << bit) for bit in range(64)]
+    if name == "checkerboard":
+        # Alternating bits within a word, then the inverse so every cell holds both values
+        return [("checkerboard", 0x5555555555555555), ("checkerboard_inverse", 0xAAAAAAAAAAAAAAAA)]
+    if name == "address":
+        return [("address", _address_pattern(base, False)), ("address_inverse", _address_pattern(base, True))]
+    raise ValueError(f"unknown pattern: {name}")
+
+
+def _interleaved_steps(patterns, base):
+    # One sweep of each pattern in turn: walking_ones bit 0, checkerboard, address, bit 1, ...
+    steps = [[(name, pattern) for _, pattern in _pattern_steps(name, base)] for name in patterns]
+    return [step for group in itertools.zip_longest(*steps) for step in group if step is not None]
+
+
+def _worker(args):
+    index, words, patterns, passes, core, deadline = args
+    if core is not None and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {core})
+    buffer = _Buffer(words)
+    errors = {}
+    first_errors = []
+    steps = _interleaved_steps(patterns, index * words) * passes
+    done = 0
+    for name, pattern in steps:
+        # time.monotonic() is the same clock in every process
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+        buffer.fill(pattern)
+        errors[name] = errors.get(name, 0) + buffer.verify(pattern, first_errors)
+        done += 1
+    return {
+        "worker": index,
+        "bytes": words * WORD,
+        "steps": done,
+        "steps_total": len(steps),
+        "errors": errors,
+        "first_error_offsets": first_errors,
+        "write_bytes_s": buffer.bytes_written / buffer.write_time if buffer.write_time else None,
+        "read_bytes_s": buffer.bytes_read / buffer.read_time if buffer.read_time else None,
+    }
+
+
+def run_memory_test(fraction=0.5, workers=None, patterns=PATTERNS, passes=1, budget=None):
+    # budget: seconds after which no new sweep is started, or None to run every pass to the end
+    cores = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count()))
+    workers = workers or len(cores)
+    total = int(psutil.virtual_memory().available * fraction)
+    words = total // WORD // workers
+    deadline = time.monotonic() + budget if budget is not None else None
+    jobs = [(index, words, tuple(patterns), passes, cores[index % len(cores)], deadline) for index in range(workers)]
+    start = time.perf_counter()
+    with multiprocessing.Pool(workers) as pool:
+        results = pool.map(_worker, jobs)
+    elapsed = time.perf_counter() - start
+    errors = {}
+    for result in results:
+        for name, count in result["errors"].items():
+            errors[name] = errors.get(name, 0) + count
+    return {
+        "tested_bytes": words * WORD * workers,
+        "workers": workers,
+        "backend": "numpy" if numpy is not None else "bytes",
+        "elapsed": elapsed,
+        "budget": budget,
+        # Sweeps every worker finished, out of the sweeps in the requested passes
+        "steps": min(result["steps"] for result in results),
+        "steps_total": results[0]["steps_total"],
+        "errors": errors,
+        "total_errors": sum(errors.values()),
+        # Workers run at the same time, so their bandwidths add up
+        "write_bytes_s": sum(result["write_bytes_s"] or 0 for result in results),
+        "read_bytes_s": sum(result["read_bytes_s"] or 0 for result in results),
+        "workers_detail": results,
+    }
+
+
+def format_report(report):
+    GiB = 1024 ** 3
+    lines = [
+        f"Memory test: {report['tested_bytes'] / GiB:.2f} GiB across {report['workers']} workers "
+        f"({report['backend']}) in {report['elapsed']:.1f} s",
+        f"Write bandwidth: {report['write_bytes_s'] / GiB:.2f} GiB/s, "
+        f"read bandwidth: {report['read_bytes_s'] / GiB:.2f} GiB/s",
+    ]
+    if report["steps"] < report["steps_total"]:
+        lines.append(f"Stopped by the {report['budget']:.0f} s time budget after "
+                     f"{report['steps']} of {report['steps_total']} sweeps")
+    for name, count in report["errors"].items():
+        lines.append(f"  {name}: {count} errors")
+    for result in report["workers_detail"]:
+        if result["first_error_offsets"]:
+            offsets = ", ".join(hex(offset) for offset in result["first_error_offsets"][:8])
+            lines.append(f"  worker {result['worker']} first errors at offsets {offsets}")
+    lines.append("RAM test passed." if report["total_errors"] == 0 else
+                 f"RAM test FAILED with {report['total_errors']} errors.")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pattern-test a fraction of the available RAM on every core.")
+    parser.add_argument("--fraction", type=float, default=0.5, help="fraction of available RAM to test")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per core)")
+    parser.add_argument("--passes", type=int, default=1)
+    parser.add_argument("--patterns", nargs="+", choices=PATTERNS, default=list(PATTERNS))
+    parser.add_argument("--budget", type=float, help="seconds after which no new sweep is started")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    report = run_memory_test(args.fraction, args.workers, args.patterns, args.passes, args.budget)
+    if args.json:
+        print(json.dumps(report))
+    else:
+        sys.stdout.write(format_report(report))
+    sys.exit(1 if report["total_errors"] else 0)
+
+if __name__ == "__main__":
+    main()
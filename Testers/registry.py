@@ -0,0 +1,155 @@
+import argparse
+import importlib
+import importlib.util
+import os
+import shutil
+import sys
+from dataclasses import dataclass
+
+from collectors import read_batteries
+
+# The one list of checks. Every entry says what a check costs and what it
+# needs, and points at its function by name so the module is imported only
+# when the check actually runs. Scripts pick a profile instead of keeping their
+# own list; check_runner.Scheduler decides the order.
+
+
+@dataclass(frozen=True, slots=True)
+class CheckSpec:
+    name: str                 # the CheckResult name
+    target: str               # "module:function"
+    cost: float               # expected seconds
+    interactive: bool = False
+    main_thread: bool = False  # opens a Tk window, so can't run in a worker thread
+    requires: tuple = ()      # resources that must be present, see RESOURCE_PROBES
+    exclusive: tuple = ()     # resources no other running check may use at the same time
+    depends: tuple = ()       # checks that must finish (and not fail) first
+    options: tuple = ()       # (name, value) keyword arguments for the check, e.g. timeouts
+    description: str = ""
+
+    def load(self):
+        module, function = self.target.split(":")
+        return getattr(importlib.import_module(module), function)
+
+
+REGISTRY = {spec.name: spec for spec in (
+    CheckSpec("ram", "checks:check_ram", 0.05, description="RAM size and usage"),
+    CheckSpec("storage", "checks:check_storage", 0.05, description="root filesystem usage"),
+    CheckSpec("battery", "checks:check_battery", 0.05, description="battery wear from sysfs"),
+    # Samples utilisation for a second, which a load generator would distort
+    CheckSpec("cpu", "checks:check_cpu", 1.0, exclusive=("cpu",), description="CPU utilisation"),
+    CheckSpec("network", "checks:check_network", 0.05, description="network interfaces"),
+    # Needs a station running `net_test.py --serve`, named in HARDWARE_CHECK_NET_PEER
+    CheckSpec("network_link", "checks:check_network_link", 11.0, requires=("net_peer",), exclusive=("network",),
+              depends=("network",), description="goodput, RTT and error counters against a peer"),
+    CheckSpec("audio", "checks:check_audio", 0.05, description="ALSA sound cards"),
+    # Plays tones through the speakers and records them with the microphone
+    CheckSpec("audio_loopback", "checks:check_audio_loopback", 8.0, requires=("alsa-utils", "numpy"),
+              exclusive=("audio",), depends=("audio",), description="frequency response, THD and channels"),
+    CheckSpec("ports", "checks:get_ports", 0.05, description="device nodes"),
+    # Worst case is input_watch.TOTAL_TIMEOUT; the registry doesn't import it to keep startup light
+    CheckSpec("keyboard", "checks:check_keyboard", 10.0, interactive=True, requires=("display", "xev"),
+              exclusive=("operator",), description="key presses seen by xev"),
+    CheckSpec("pointer", "checks:check_pointer", 10.0, interactive=True, requires=("display", "xinput"),
+              exclusive=("operator",), description="pointer motion seen by xinput"),
+    # Worst case is trackpad_test.TIMEOUT; most operators cover the grid well before it
+    CheckSpec("trackpad", "checks:check_trackpad", 60.0, interactive=True, main_thread=True, requires=("display",),
+              exclusive=("operator",), description="trackpad coverage and report rate"),
+    CheckSpec("cpu_stress", "burnin:check_cpu_stress", 60.0, exclusive=("cpu",),
+              description="sustained load with throttling detection"),
+    # burnin.MEMORY_BUDGET of sweeps plus setting up the buffers
+    CheckSpec("memory_test", "burnin:check_memory_test", 90.0, exclusive=("cpu", "memory"),
+              description="pattern test of half the free RAM"),
+    CheckSpec("storage_bench", "burnin:check_storage_bench", 45.0, exclusive=("disk",),
+              description="throughput and latency of every partition"),
+    CheckSpec("surface_scan", "burnin:check_surface_scan", 1800.0, exclusive=("disk",),
+              description="read every block of every disk"),
+    CheckSpec("battery_discharge", "burnin:check_battery_discharge", 600.0, requires=("battery",),
+              exclusive=("cpu",), depends=("battery",), description="measured capacity under load"),
+)}
+
+AUTOMATIC = ("ram", "storage", "battery", "cpu", "network", "audio", "ports")
+
+PROFILES = {
+    # Intake station: is everything there, nothing slow
+    "quick-intake": ("ram", "storage", "battery", "cpu", "ports"),
+    "standard": ("ram", "storage", "battery", "cpu", "network", "network_link", "audio"),
+    "interactive": ("ram", "storage", "battery", "cpu", "network", "audio", "audio_loopback",
+                    "keyboard", "trackpad"),
+    "report": ("battery", "storage", "ram", "cpu", "network", "audio", "ports"),
+    "static": ("ram", "storage", "battery"),
+    "dynamic": ("keyboard", "pointer"),
+    "full-burn-in": AUTOMATIC + ("network_link", "audio_loopback", "cpu_stress", "memory_test", "storage_bench", "surface_scan",
+                                 "battery_discharge", "keyboard", "trackpad"),
+}
+
+RESOURCE_PROBES = {
+    "display": lambda: bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY")),
+    "battery": lambda: bool(read_batteries()),
+    "xev": lambda: shutil.which("xev") is not None,
+    "xinput": lambda: shutil.which("xinput") is not None,
+    "net_peer": lambda: bool(os.environ.get("HARDWARE_CHECK_NET_PEER")),
+    "alsa-utils": lambda: shutil.which("aplay") is not None and shutil.which("arecord") is not None,
+    "numpy": lambda: importlib.util.find_spec("numpy") is not None,
+}
+
+
+def missing_requirements(spec, cache=None):
+    # Names of required resources that aren't present; `cache` keeps probe results across checks
+    cache = {} if cache is None else cache
+    missing = []
+    for resource in spec.requires:
+        if resource not in cache:
+            cache[resource] = RESOURCE_PROBES[resource]()
+        if not cache[resource]:
+            missing.append(resource)
+    return missing
+
+
+def resolve(selection):
+    # selection: a profile name or an iterable of check names. Dependencies are
+    # added in front of the checks that need them; the list keeps report order.
+    names = PROFILES[selection] if isinstance(selection, str) else tuple(selection)
+    specs, seen = [], set()
+
+    def add(name):
+        if name in seen:
+            return
+        if name not in REGISTRY:
+            raise KeyError(f"unknown check: {name}")
+        seen.add(name)
+        for dependency in REGISTRY[name].depends:
+            add(dependency)
+        specs.append(REGISTRY[name])
+
+    for name in names:
+        add(name)
+    return specs
+
+
+def format_registry():
+    lines = []
+    for spec in REGISTRY.values():
+        kind = "interactive" if spec.interactive else "automatic"
+        lines.append(f"{spec.name:<18} {spec.cost:>7.2f} s  {kind:<11}  {spec.description}")
+    lines.append("")
+    for name, checks in PROFILES.items():
+        lines.append(f"{name:<14} {' '.join(checks)}")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    from check_runner import format_plan
+
+    parser = argparse.ArgumentParser(description="List checks and profiles, or show the plan for a profile.")
+    parser.add_argument("profile", nargs="?", choices=sorted(PROFILES))
+    parser.add_argument("--workers", type=int, help="concurrent checks (default: all at once)")
+    args = parser.parse_args()
+
+    if args.profile is None:
+        sys.stdout.write(format_registry())
+        return
+    sys.stdout.write(format_plan(resolve(args.profile), args.workers))
+
+if __name__ == "__main__":
+    main()
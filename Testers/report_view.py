@@ -0,0 +1,180 @@
+import tkinter as tk
+from tkinter import ttk
+
+from results import render_text, PASS, WARN, FAIL, ERROR, SKIP
+
+# Report widget for the GUIs. Every check is one row of a Treeview showing
+# its status and a key metric; opening a row shows the check's full text one
+# page of lines at a time, with a "more" row that loads the next page when
+# opened. Text is rendered only when a row is first opened, closing a row
+# drops its lines, and reset() forgets the previous run, so a kiosk that runs
+# checks all day holds one run's results and whatever pages are open.
+
+PAGE_LINES = 100
+MAX_LINES = 2000      # per check; the rest is in the log and the JSON output
+RUNNING = "running"
+
+STATUS_COLOURS = {
+    PASS: "#1b7f3b",
+    WARN: "#b36b00",
+    FAIL: "#c0262d",
+    ERROR: "#c0262d",
+    SKIP: "#777777",
+    RUNNING: "#777777",
+}
+
+GB = 1024 ** 3
+
+
+def _battery_summary(metrics):
+    return ", ".join(f"{battery['name']} {battery['grade']} ({battery['health']:.0f}%)" if battery["health"] is not None
+                     else f"{battery['name']} no health data" for battery in metrics["batteries"]) or "no battery"
+
+
+def _ports_summary(metrics):
+    changes = metrics.get("changes")
+    if changes:
+        return f"{len(metrics['nodes'])} device nodes, {len(changes)} changes since last run"
+    return f"{len(metrics['nodes'])} device nodes"
+
+
+# name -> metrics -> one line; checks not listed show the first line of their message
+SUMMARIES = {
+    "ram": lambda m: f"{m['total'] / GB:.1f} GB, {m['percent']}% used",
+    "storage": lambda m: f"{m['free'] / GB:.1f} of {m['total'] / GB:.1f} GB free",
+    "battery": _battery_summary,
+    "cpu": lambda m: f"{m['idle']}% idle",
+    "network": lambda m: f"{len(m['interfaces'])} interfaces",
+    "audio": lambda m: f"{len(m['cards'])} sound cards",
+    "ports": _ports_summary,
+    "network_link": lambda m: f"up {m['upload']['mb_s']:.0f} MB/s, down {m['download']['mb_s']:.0f} MB/s, "
+                              f"RTT p99 {m['rtt_ms']['p99']:.2f} ms",
+    "audio_loopback": lambda m: f"latency {m['latency_ms']:.0f} ms, THD {m['thd_percent']:.1f}%"
+                                if m.get("heard") and m.get("thd_percent") is not None else "signal not heard",
+    "surface_scan": lambda m: f"{len(m['targets'])} drives, "
+                              f"{sum(len(t.get('unreadable', ())) for t in m['targets'])} unreadable regions",
+}
+
+
+def summary_line(result):
+    # The key metric of a result, falling back to its message
+    summary = SUMMARIES.get(result.name)
+    if summary is not None and result.status not in (ERROR, SKIP) and result.metrics:
+        try:
+            return summary(result.metrics)
+        except (KeyError, TypeError, ValueError):
+            pass  # records from an older version
+    return result.message.strip().split("\n", 1)[0]
+
+
+def page(lines, start, size=PAGE_LINES):
+    # (the lines of one page, how many are left after it)
+    end = min(start + size, len(lines))
+    return lines[start:end], len(lines) - end
+
+
+class ReportView(ttk.Frame):
+    def __init__(self, master, details=True, **kwargs):
+        super().__init__(master, **kwargs)
+        self.details = details
+        self.tree = ttk.Treeview(self, columns=("status", "summary"), show="tree headings", selectmode="browse")
+        self.tree.heading("#0", text="Check")
+        self.tree.heading("status", text="Status")
+        self.tree.heading("summary", text="Summary")
+        self.tree.column("#0", width=160, stretch=False)
+        self.tree.column("status", width=70, stretch=False, anchor=tk.CENTER)
+        self.tree.column("summary", width=400, stretch=True)
+        scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        for status, colour in STATUS_COLOURS.items():
+            self.tree.tag_configure(status, foreground=colour)
+        self.tree.tag_configure("line", font="TkFixedFont")
+        self.tree.bind("<<TreeviewOpen>>", self._opened)
+        self.tree.bind("<<TreeviewClose>>", self._closed)
+        self._results = {}    # row id -> CheckResult, or a list of lines for notes
+        self._lines = {}      # row id -> rendered lines while the row is open
+        self._notes = 0
+
+    def reset(self, names=()):
+        # Forgets the previous run; `names` get "running" rows in report order
+        self.tree.delete(*self.tree.get_children())
+        self._results.clear()
+        self._lines.clear()
+        self._notes = 0
+        for index, name in enumerate(names):
+            self.tree.insert("", tk.END, iid=f"check{index}", text=name, values=(RUNNING, ""), tags=(RUNNING,))
+
+    def set_result(self, index, result):
+        self._show(f"check{index}", result)
+
+    def add_result(self, result):
+        # A result outside the running report, e.g. the trackpad test; it takes
+        # over the row of a check with the same name, such as its SKIP result
+        for row, shown in self._results.items():
+            if not isinstance(shown, list) and shown.name == result.name:
+                break
+        else:
+            row = f"extra{len(self._results)}"
+        self._show(row, result)
+
+    def _show(self, row, result):
+        if not self.tree.exists(row):
+            self.tree.insert("", tk.END, iid=row, text=result.name)
+        self._results[row] = result
+        self._lines.pop(row, None)
+        self.tree.delete(*self.tree.get_children(row))
+        self.tree.item(row, values=(result.status.upper(), summary_line(result)), tags=(result.status,), open=False)
+        # A placeholder child makes the row openable without rendering anything yet
+        self.tree.insert(row, tk.END, text="...")
+
+    def add_note(self, title, text):
+        # Plain text under a row of its own, e.g. the timing breakdown
+        row = f"note{self._notes}"
+        self._notes += 1
+        self._results[row] = text.rstrip("\n").split("\n")
+        self.tree.insert("", tk.END, iid=row, text=title, values=("", self._results[row][0]))
+        self.tree.insert(row, tk.END, text="...")
+
+    def _render(self, row):
+        result = self._results[row]
+        lines = result if isinstance(result, list) else render_text(result, self.details).rstrip("\n").split("\n")
+        if len(lines) > MAX_LINES:
+            lines = lines[:MAX_LINES] + [f"... {len(lines) - MAX_LINES} more lines in the log"]
+        return lines
+
+    def _opened(self, _event):
+        row = self.tree.focus()
+        if row.startswith("more:"):
+            self._load_more(row)
+            return
+        if row not in self._results:
+            return
+        self._lines[row] = self._render(row)
+        self.tree.delete(*self.tree.get_children(row))
+        self._append_page(row, 0)
+
+    def _append_page(self, row, start):
+        lines, remaining = page(self._lines[row], start)
+        for offset, line in enumerate(lines):
+            self.tree.insert(row, tk.END, iid=f"{row}:{start + offset}", text="", values=("", line), tags=("line",))
+        if remaining:
+            more = self.tree.insert(row, tk.END, iid=f"more:{row}:{start + len(lines)}", text=f"{remaining} more lines",
+                                    values=("", ""))
+            # Openable, so opening it loads the next page
+            self.tree.insert(more, tk.END, text="...")
+
+    def _load_more(self, more):
+        _, row, start = more.split(":")
+        self.tree.delete(more)
+        if row in self._lines:
+            self._append_page(row, int(start))
+
+    def _closed(self, _event):
+        # Closed rows give their lines back; they are rendered again when reopened
+        row = self.tree.focus()
+        if row in self._lines:
+            del self._lines[row]
+            self.tree.delete(*self.tree.get_children(row))
+            self.tree.insert(row, tk.END, text="...")
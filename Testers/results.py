@@ -0,0 +1,156 @@
+import json
+import socket
+import time
+from dataclasses import dataclass, field, asdict
+
+from collectors import Battery, MemoryInfo, Filesystem, format_battery, format_meminfo, format_filesystems
+
+PASS = "pass"
+WARN = "warn"
+FAIL = "fail"
+ERROR = "error"
+SKIP = "skip"    # not run: the profile needs it but the machine can't run it
+
+
+@dataclass(slots=True)
+class CheckResult:
+    name: str
+    status: str = PASS
+    started: float = 0.0    # Unix time the check started
+    duration: float = 0.0   # seconds
+    metrics: dict = field(default_factory=dict)
+    message: str = ""
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def to_json(results, timing=None):
+    report = {
+        "host": socket.gethostname(),
+        "generated": time.time(),
+        "checks": [result.to_dict() for result in results],
+    }
+    if timing is not None:
+        report["timing"] = timing._asdict()
+    return json.dumps(report, separators=(",", ":"))
+
+
+def ndjson_line(result, host):
+    return json.dumps({"host": host, **result.to_dict()}, separators=(",", ":")) + "\n"
+
+
+def to_ndjson(results):
+    host = socket.gethostname()
+    return "".join(ndjson_line(result, host) for result in results)
+
+
+# Text rendering, kept apart from the checks so the GUI and the text report
+# are just one view of the result records.
+
+GB = 1024 ** 3
+
+
+def _render_changes(metrics):
+    # Hotplug changes since the last inventory snapshot, if there was one
+    changes = metrics.get("changes")
+    if not changes:
+        return ""
+    return "Changes since last run:\n" + "".join(f"  {change}\n" for change in changes)
+
+
+def _render_ram(metrics, details):
+    text = (f"RAM Information:\n"
+            f"Total: {metrics['total'] / GB:.2f} GB, "
+            f"Available: {metrics['available'] / GB:.2f} GB, "
+            f"Used: {metrics['used'] / GB:.2f} GB, "
+            f"Percentage: {metrics['percent']}%\n")
+    # Records from before the procfs reader have no swap figures
+    if details and "swap_total" in metrics:
+        text += format_meminfo(MemoryInfo(**{name: metrics[name] for name in MemoryInfo.__dataclass_fields__}))
+    return text
+
+
+def _render_storage(metrics, details):
+    text = (f"Storage Information:\n"
+            f"Total: {metrics['total'] / GB:.2f} GB, "
+            f"Used: {metrics['used'] / GB:.2f} GB, "
+            f"Free: {metrics['free'] / GB:.2f} GB\n")
+    if details and metrics.get("filesystems"):
+        text += format_filesystems([Filesystem(**filesystem) for filesystem in metrics["filesystems"]])
+    return text
+
+
+def _render_battery(metrics, details):
+    lines = []
+    if details:
+        lines.append("Battery Information:\n")
+        for battery in metrics["batteries"]:
+            fields = {key: value for key, value in battery.items() if key not in ("health", "grade")}
+            lines.append(format_battery(Battery(**fields)))
+        lines.append("\n")
+    for battery in metrics["batteries"]:
+        if battery["health"] is None:
+            lines.append(f"Battery health information not found for {battery['name']}.\n")
+        else:
+            lines.append(f"Battery Health ({battery['name']}): {battery['grade']} ({battery['health']:.2f}%)\n")
+    if not metrics["batteries"]:
+        lines.append("Battery health information not found.\n")
+    return "".join(lines) + _render_changes(metrics)
+
+
+def _render_cpu(metrics, details):
+    return (f"CPU Information:\n"
+            f"User: {metrics['user']}%, System: {metrics['system']}%, Idle: {metrics['idle']}%\n")
+
+
+def _render_network(metrics, details):
+    lines = ["Network Interfaces:\n"]
+    for interface, addrs in metrics["interfaces"].items():
+        lines.extend(f"{interface} - {addr['family']} Address: {addr['address']}\n" for addr in addrs)
+    return "".join(lines) + _render_changes(metrics)
+
+
+def _render_audio(metrics, details):
+    lines = ["Audio Devices:\n"]
+    for card in metrics["cards"]:
+        if not card["devices"]:
+            lines.append(f"card {card['index']}: {card['id']} [{card['name']}]\n")
+        for device in card["devices"]:
+            directions = "/".join(name for name in ("playback", "capture") if device[name])
+            lines.append(f"card {card['index']}: {card['id']} [{card['name']}], "
+                         f"device {device['device']}: {device['name']} ({directions})\n")
+    return "".join(lines) + _render_changes(metrics) + "\n"
+
+
+def _render_ports(metrics, details):
+    # The full listing only the first time; after that only what was plugged or unplugged
+    if metrics.get("changes") is None:
+        return "Available Ports:\n" + "".join(f"{node}\n" for node in metrics["nodes"]) + "\n"
+    if not metrics["changes"]:
+        return f"Available Ports: {len(metrics['nodes'])} device nodes, no changes since last run\n\n"
+    return f"Available Ports: {len(metrics['nodes'])} device nodes\n" + _render_changes(metrics) + "\n"
+
+
+RENDERERS = {
+    "ram": _render_ram,
+    "storage": _render_storage,
+    "battery": _render_battery,
+    "cpu": _render_cpu,
+    "network": _render_network,
+    "audio": _render_audio,
+    "ports": _render_ports,
+}
+
+
+def render_text(result, details=True):
+    if result.status in (ERROR, SKIP) or result.name not in RENDERERS:
+        return f"{result.message}\n"
+    text = RENDERERS[result.name](result.metrics, details)
+    if result.message:
+        text += f"{result.message}\n"
+    return text
+
+
+def render_report(results, details=True):
+    return "".join(render_text(result, details) for result in results)
@@ -0,0 +1,89 @@
+# Small statistics helpers shared by the benchmarks and samplers
+
+
+def percentile(ordered, p):
+    # `ordered` must be sorted; linear interpolation between closest ranks
+    if not ordered:
+        return None
+    if len(ordered) == 1:
+        return ordered[0]
+    rank = (len(ordered) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(values, percentiles=(50, 95, 99)):
+    ordered = sorted(values)
+    if not ordered:
+        return {"count": 0}
+    summary = {
+        "count": len(ordered),
+        "min": ordered[0],
+        "max": ordered[-1],
+        "mean": sum(ordered) / len(ordered),
+    }
+    for p in percentiles:
+        summary[f"p{p}"] = percentile(ordered, p)
+    return summary
+
+
+# Two-sided 95% Student t quantiles by degrees of freedom; 1.96 beyond the table
+_T95 = {1: 12.71, 2: 4.30, 3: 3.18, 4: 2.78, 5: 2.57, 6: 2.45, 7: 2.36, 8: 2.31, 9: 2.26, 10: 2.23,
+        12: 2.18, 15: 2.13, 20: 2.09, 25: 2.06, 30: 2.04, 40: 2.02, 60: 2.00, 120: 1.98}
+
+
+def t95(degrees):
+    for limit in sorted(_T95):
+        if degrees <= limit:
+            return _T95[limit]
+    return 1.96
+
+
+class LinearFit:
+    # Least-squares line fitted incrementally from running sums, so adding a
+    # sample is O(1) and no sample history is kept
+    def __init__(self):
+        self.n = 0
+        self._sx = self._sy = self._sxx = self._sxy = self._syy = 0.0
+        self._x0 = None
+
+    def add(self, x, y):
+        if self._x0 is None:
+            self._x0 = x  # shift x to keep the sums well-conditioned
+        x -= self._x0
+        self.n += 1
+        self._sx += x
+        self._sy += y
+        self._sxx += x * x
+        self._sxy += x * y
+        self._syy += y * y
+
+    def _sxx_centered(self):
+        return self._sxx - self._sx * self._sx / self.n
+
+    @property
+    def slope(self):
+        if self.n < 2 or self._sxx_centered() <= 0:
+            return None
+        return (self._sxy - self._sx * self._sy / self.n) / self._sxx_centered()
+
+    def predict(self, x):
+        slope = self.slope
+        if slope is None:
+            return None
+        return (self._sy - slope * self._sx) / self.n + slope * (x - self._x0)
+
+    @property
+    def slope_stderr(self):
+        slope = self.slope
+        if slope is None or self.n < 3:
+            return None
+        syy_centered = self._syy - self._sy * self._sy / self.n
+        residual = max(syy_centered - slope * (self._sxy - self._sx * self._sy / self.n), 0.0)
+        return (residual / (self.n - 2) / self._sxx_centered()) ** 0.5
+
+    def slope_interval(self):
+        # Half-width of the 95% confidence interval of the slope
+        stderr = self.slope_stderr
+        return stderr * t95(self.n - 2) if stderr is not None else None
@@ -0,0 +1,214 @@
+import argparse
+import json
+import mmap
+import os
+import random
+import sys
+import tempfile
+import time
+
+import psutil
+
+from stats import summarize
+
+# Storage throughput and latency benchmark for every mounted partition.
+# A temporary file is written and read back sequentially in large aligned
+# blocks, then hit with random 4 KiB reads and synchronous writes. With
+# O_DIRECT (the default where the filesystem supports it) the page cache is
+# bypassed; otherwise the file is flushed and dropped from the cache with
+# posix_fadvise before it is read back. The file is always removed.
+
+MiB = 1024 * 1024
+BLOCK_SIZE = 1 * MiB
+RANDOM_BLOCK_SIZE = 4096
+FILE_SIZE = 256 * MiB
+RANDOM_OPS = 2000
+TEMP_PREFIX = ".hwcheck-bench-"
+
+# Filesystems that are not backed by a drive
+SKIP_FSTYPES = {"tmpfs", "devtmpfs", "squashfs", "overlay", "proc", "sysfs", "iso9660", "ramfs"}
+
+
+def _aligned_buffer(size):
+    # Anonymous mmaps are page-aligned, which O_DIRECT requires
+    buffer = mmap.mmap(-1, size)
+    buffer.write(os.urandom(size))  # incompressible data for SSD controllers that compress
+    return buffer
+
+
+def _open(path, flags, direct):
+    if direct and hasattr(os, "O_DIRECT"):
+        try:
+            return os.open(path, flags | os.O_DIRECT), True
+        except OSError:
+            pass  # e.g. tmpfs and some FUSE filesystems reject O_DIRECT
+    return os.open(path, flags), False
+
+
+def _drop_cache(fd):
+    os.fsync(fd)
+    if hasattr(os, "posix_fadvise"):
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+
+
+def _sequential_write(path, size, buffer, direct):
+    fd, direct = _open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, direct)
+    try:
+        start = time.perf_counter()
+        written = 0
+        while written < size:
+            written += os.pwritev(fd, [buffer], written)
+        os.fsync(fd)
+        elapsed = time.perf_counter() - start
+        if not direct:
+            _drop_cache(fd)
+    finally:
+        os.close(fd)
+    return written / elapsed, direct
+
+
+def _sequential_read(path, size, buffer, direct):
+    fd, direct = _open(path, os.O_RDONLY, direct)
+    try:
+        start = time.perf_counter()
+        done = 0
+        while done < size:
+            count = os.preadv(fd, [buffer], done)
+            if count == 0:
+                break
+            done += count
+        elapsed = time.perf_counter() - start
+    finally:
+        os.close(fd)
+    return done / elapsed
+
+
+def _random_io(path, size, direct, ops, write):
+    flags = os.O_WRONLY | os.O_DSYNC if write else os.O_RDONLY
+    fd, direct = _open(path, flags, direct)
+    buffer = _aligned_buffer(RANDOM_BLOCK_SIZE)
+    blocks = size // RANDOM_BLOCK_SIZE
+    latencies = []
+    try:
+        if not direct and not write:
+            _drop_cache(fd)
+        io = os.pwritev if write else os.preadv
+        for _ in range(ops):
+            offset = random.randrange(blocks) * RANDOM_BLOCK_SIZE
+            start = time.perf_counter_ns()
+            io(fd, [buffer], offset)
+            latencies.append((time.perf_counter_ns() - start) / 1000)
+    finally:
+        os.close(fd)
+        buffer.close()
+    elapsed = sum(latencies) / 1e6
+    return {
+        "iops": ops / elapsed if elapsed else None,
+        "latency_us": summarize(latencies, (50, 90, 99, 99.9)),
+    }
+
+
+def benchmark_path(directory, size=FILE_SIZE, direct=True, random_ops=RANDOM_OPS):
+    if size < BLOCK_SIZE:
+        raise ValueError(f"test file size must be at least {BLOCK_SIZE // MiB} MiB")
+    fd, path = tempfile.mkstemp(prefix=TEMP_PREFIX, dir=directory)
+    os.close(fd)
+    buffer = _aligned_buffer(BLOCK_SIZE)
+    size -= size % BLOCK_SIZE
+    try:
+        write_speed, used_direct = _sequential_write(path, size, buffer, direct)
+        read_speed = _sequential_read(path, size, buffer, direct)
+        random_read = _random_io(path, size, direct, random_ops, write=False)
+        random_write = _random_io(path, size, direct, random_ops, write=True)
+    finally:
+        buffer.close()
+        os.remove(path)
+    return {
+        "file_size": size,
+        "direct_io": used_direct,
+        "seq_write_mb_s": write_speed / MiB,
+        "seq_read_mb_s": read_speed / MiB,
+        "random_read": random_read,
+        "random_write": random_write,
+    }
+
+
+def benchmark_partitions(size=FILE_SIZE, direct=True, random_ops=RANDOM_OPS, include_virtual=False):
+    results = []
+    seen_devices = set()
+    for partition in psutil.disk_partitions(all=False):
+        entry = {"device": partition.device, "mountpoint": partition.mountpoint, "fstype": partition.fstype}
+        results.append(entry)
+        if partition.device in seen_devices:
+            entry["skipped"] = "device already benchmarked through another mount"
+            continue
+        if partition.fstype in SKIP_FSTYPES and not include_virtual:
+            entry["skipped"] = f"{partition.fstype} is not backed by a drive"
+            continue
+        if "ro" in partition.opts.split(",") or not os.access(partition.mountpoint, os.W_OK):
+            entry["skipped"] = "not writable"
+            continue
+        if psutil.disk_usage(partition.mountpoint).free < size * 2:
+            entry["skipped"] = "not enough free space"
+            continue
+        seen_devices.add(partition.device)
+        try:
+            entry.update(benchmark_path(partition.mountpoint, size, direct, random_ops))
+        except OSError as e:
+            entry["error"] = str(e)
+    return results
+
+
+def format_results(results):
+    lines = []
+    for entry in results:
+        head = f"{entry['device']} on {entry['mountpoint']} ({entry['fstype']})"
+        if "skipped" in entry:
+            lines.append(f"{head}: skipped, {entry['skipped']}")
+        elif "error" in entry:
+            lines.append(f"{head}: failed, {entry['error']}")
+        else:
+            read, write = entry["random_read"], entry["random_write"]
+            lines.append(
+                f"{head}{'' if entry['direct_io'] else ' [page cache dropped, no O_DIRECT]'}\n"
+                f"  Sequential: read {entry['seq_read_mb_s']:.0f} MB/s, write {entry['seq_write_mb_s']:.0f} MB/s\n"
+                f"  Random 4K read:  {read['iops']:.0f} IOPS, latency p50 {read['latency_us']['p50']:.0f} us, "
+                f"p99 {read['latency_us']['p99']:.0f} us, p99.9 {read['latency_us']['p99.9']:.0f} us, "
+                f"max {read['latency_us']['max']:.0f} us\n"
+                f"  Random 4K write: {write['iops']:.0f} IOPS, latency p50 {write['latency_us']['p50']:.0f} us, "
+                f"p99 {write['latency_us']['p99']:.0f} us, p99.9 {write['latency_us']['p99.9']:.0f} us, "
+                f"max {write['latency_us']['max']:.0f} us")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark read/write throughput and latency on every partition.")
+    parser.add_argument("paths", nargs="*", help="directories to benchmark instead of every partition")
+    parser.add_argument("--size", type=int, default=FILE_SIZE // MiB, help="test file size in MiB")
+    parser.add_argument("--random-ops", type=int, default=RANDOM_OPS)
+    parser.add_argument("--buffered", action="store_true", help="don't use O_DIRECT")
+    parser.add_argument("--include-virtual", action="store_true", help="also test tmpfs/overlay mounts")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    size = args.size * MiB
+    if size < BLOCK_SIZE:
+        parser.error(f"--size must be at least {BLOCK_SIZE // MiB} MiB")
+    if args.paths:
+        results = []
+        for path in args.paths:
+            entry = {"device": path, "mountpoint": path, "fstype": "dir"}
+            try:
+                entry.update(benchmark_path(path, size, not args.buffered, args.random_ops))
+            except OSError as e:
+                entry["error"] = str(e)
+            results.append(entry)
+    else:
+        results = benchmark_partitions(size, not args.buffered, args.random_ops, args.include_virtual)
+    if args.json:
+        print(json.dumps(results))
+    else:
+        sys.stdout.write(format_results(results))
+
+if __name__ == "__main__":
+    main()
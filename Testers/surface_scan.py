@@ -0,0 +1,344 @@
+import argparse
+import errno
+import json
+import mmap
+import os
+import stat
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from collectors import SYSFS_ROOT
+from tracing import count
+
+# Read-only surface scan of whole block devices or image files. Each target is
+# read front to back in large chunks, one thread per target and at most
+# `parallel` targets at once, so several drives are busy together. A chunk
+# that takes too long is recorded as a slow region; a chunk that fails is read
+# again in small blocks to narrow the error down, and the blocks that still
+# fail are recorded as unreadable. Progress is checkpointed to a JSON file, so
+# an interrupted scan resumes at the last checkpoint instead of the start.
+# Nothing is ever written to the targets.
+
+MiB = 1024 * 1024
+CHUNK_SIZE = 4 * MiB
+RETRY_BLOCK = 64 * 1024     # granularity of unreadable regions
+SLOW_CHUNK_S = 0.5          # a 4 MiB read taking longer than this is a slow region
+PARALLEL = 4
+CHECKPOINT_FILE = os.environ.get("HARDWARE_CHECK_SCAN_CHECKPOINT", "surface_scan.json")
+CHECKPOINT_INTERVAL = 5.0   # seconds between checkpoint writes
+PROGRESS_INTERVAL = 2.0
+MAX_LISTED_REGIONS = 10
+
+# /sys/block entries that are not drives of their own
+VIRTUAL_PREFIXES = ("loop", "ram", "zram", "dm-", "md", "sr", "nbd")
+
+
+def list_block_devices(sysfs_root=SYSFS_ROOT):
+    # Whole disks only; partitions would be read twice
+    devices = []
+    try:
+        names = sorted(os.listdir(os.path.join(sysfs_root, "block")))
+    except OSError:
+        return devices
+    for name in names:
+        if name.startswith(VIRTUAL_PREFIXES):
+            continue
+        try:
+            with open(os.path.join(sysfs_root, "block", name, "size")) as f:
+                sectors = int(f.read())
+        except (OSError, ValueError):
+            continue
+        if sectors:
+            devices.append(f"/dev/{name}")
+    return devices
+
+
+def _identity(path, size, sysfs_root=SYSFS_ROOT):
+    # A checkpoint only resumes the same drive: the serial number (or WWID)
+    # where sysfs has one, so a different disk in the same slot starts over.
+    # The resolved path, so "img.bin", "./img.bin" and /dev/disk/by-id links agree.
+    path = os.path.realpath(path)
+    name = os.path.basename(path)
+    for attribute in ("wwid", "device/serial", "device/wwid"):
+        try:
+            with open(os.path.join(sysfs_root, "block", name, attribute)) as f:
+                serial = f.read().strip()
+        except OSError:
+            continue
+        if serial:
+            return f"{path}:{size}:{serial}"
+    return f"{path}:{size}"
+
+
+def _target_size(fd):
+    mode = os.fstat(fd).st_mode
+    if stat.S_ISBLK(mode):
+        return os.lseek(fd, 0, os.SEEK_END)
+    return os.fstat(fd).st_size
+
+
+def _open(path):
+    # O_DIRECT keeps a full-disk read out of the page cache; image files whose
+    # size isn't a multiple of the block size are read buffered instead
+    if hasattr(os, "O_DIRECT"):
+        try:
+            return os.open(path, os.O_RDONLY | os.O_DIRECT), True
+        except OSError:
+            pass
+    return os.open(path, os.O_RDONLY), False
+
+
+def _add_region(regions, offset, length, **info):
+    # Merges with the previous region when they touch and agree
+    if regions:
+        last = regions[-1]
+        if last["offset"] + last["length"] == offset and last.keys() == {"offset", "length", *info} \
+                and all(last[key] == value for key, value in info.items() if key != "seconds"):
+            last["length"] += length
+            if "seconds" in info:
+                last["seconds"] += info["seconds"]
+            return
+    regions.append({"offset": offset, "length": length, **info})
+
+
+class ScanCheckpoint:
+    # {identity: state}; state holds the next offset, the regions found so far
+    # and the bytes and seconds spent, so throughput spans the interruptions
+    def __init__(self, path=CHECKPOINT_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._saved = 0.0
+        try:
+            with open(path) as f:
+                self.states = json.load(f)
+        except (OSError, ValueError):
+            self.states = {}
+
+    def get(self, identity):
+        with self._lock:
+            return self.states.get(identity)
+
+    def update(self, identity, state, force=False):
+        with self._lock:
+            # A copy: other scans write the file while this one keeps appending
+            self.states[identity] = {**state, "unreadable": list(state["unreadable"]), "slow": list(state["slow"])}
+            now = time.monotonic()
+            if not force and now - self._saved < CHECKPOINT_INTERVAL:
+                return
+            self._saved = now
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.states, f)
+            os.replace(tmp_path, self.path)
+
+
+class TargetScan:
+    def __init__(self, path, checkpoint, chunk_size=CHUNK_SIZE, slow_chunk_s=SLOW_CHUNK_S, restart=False):
+        self.path = path
+        self.checkpoint = checkpoint
+        self.chunk_size = chunk_size
+        self.slow_chunk_s = slow_chunk_s
+        self.restart = restart
+        self.size = None
+        self.identity = None
+        self.state = None
+        self._session_start = None
+        self._session_offset = 0
+
+    def progress(self):
+        # (done, size, throughput in bytes/s, ETA in seconds); None until opened
+        if self.state is None:
+            return None
+        done = self.state["offset"]
+        elapsed = time.monotonic() - self._session_start if self._session_start else 0.0
+        rate = (done - self._session_offset) / elapsed if elapsed > 0 else 0.0
+        eta = (self.size - done) / rate if rate else None
+        return done, self.size, rate, eta
+
+    def _read_chunk(self, fd, buffer, offset, length):
+        view = memoryview(buffer)[:length]
+        try:
+            return os.preadv(fd, [view], offset)
+        finally:
+            view.release()
+
+    def _narrow(self, fd, buffer, offset, length, regions):
+        # Re-read a failed chunk block by block so only the bad blocks are recorded
+        position = offset
+        while position < offset + length:
+            block = min(RETRY_BLOCK, offset + length - position)
+            try:
+                if self._read_chunk(fd, buffer, position, block) == 0:
+                    break
+            except OSError as e:
+                _add_region(regions, position, block, error=e.strerror or str(e))
+            position += block
+
+    def run(self, stop):
+        fd, direct = _open(self.path)
+        buffer = mmap.mmap(-1, self.chunk_size)
+        try:
+            self.size = _target_size(fd)
+            self.identity = _identity(self.path, self.size)
+            # Only an interrupted scan resumes; a finished one is scanned again
+            state = None if self.restart else self.checkpoint.get(self.identity)
+            if state is None or state.get("done"):
+                state = {"offset": 0, "unreadable": [], "slow": [], "seconds": 0.0, "resumed": 0}
+            else:
+                state["resumed"] += 1
+            self.state = state
+            self._session_start = time.monotonic()
+            self._session_offset = state["offset"]
+            unreadable, slow = state["unreadable"], state["slow"]
+            while state["offset"] < self.size and not stop.is_set():
+                offset = state["offset"]
+                length = min(self.chunk_size, self.size - offset)
+                start = time.monotonic()
+                try:
+                    read = self._read_chunk(fd, buffer, offset, length)
+                except OSError as e:
+                    if direct and e.errno == errno.EINVAL and length < self.chunk_size:
+                        # The unaligned tail of an image file
+                        os.close(fd)
+                        fd, direct = os.open(self.path, os.O_RDONLY), False
+                        continue
+                    self._narrow(fd, buffer, offset, length, unreadable)
+                    read = length
+                elapsed = time.monotonic() - start
+                count("bytes_parsed", read)
+                if read == 0:
+                    break
+                if elapsed > self.slow_chunk_s:
+                    _add_region(slow, offset, read, seconds=round(elapsed, 3))
+                state["offset"] = offset + read
+                state["seconds"] += elapsed
+                self.checkpoint.update(self.identity, state)
+            state["done"] = state["offset"] >= self.size
+            self.checkpoint.update(self.identity, state, force=True)
+        finally:
+            buffer.close()
+            os.close(fd)
+        return self.result(direct)
+
+    def result(self, direct=None):
+        state = self.state
+        return {
+            "target": self.path,
+            "size": self.size,
+            "scanned": state["offset"],
+            "complete": state.get("done", False),
+            "seconds": state["seconds"],
+            "mb_s": state["offset"] / state["seconds"] / MiB if state["seconds"] else None,
+            "direct_io": direct,
+            "resumed": state["resumed"],
+            "unreadable": state["unreadable"],
+            "slow": state["slow"],
+        }
+
+
+def scan_targets(paths, parallel=PARALLEL, checkpoint=None, restart=False, stop=None, on_progress=None,
+                 chunk_size=CHUNK_SIZE, slow_chunk_s=SLOW_CHUNK_S):
+    # Returns one result per path, in order. on_progress(scans) is called every
+    # PROGRESS_INTERVAL seconds from the calling thread while the scans run.
+    checkpoint = checkpoint or ScanCheckpoint()
+    stop = stop or threading.Event()
+    scans = [TargetScan(path, checkpoint, chunk_size, slow_chunk_s, restart) for path in paths]
+    results = [None] * len(scans)
+    with ThreadPoolExecutor(max_workers=max(1, min(parallel, len(scans) or 1))) as pool:
+        futures = [pool.submit(scan.run, stop) for scan in scans]
+        try:
+            pending = futures
+            while pending:
+                _, pending = wait(pending, timeout=PROGRESS_INTERVAL)
+                if on_progress is not None:
+                    on_progress(scans)
+        except KeyboardInterrupt:
+            # Running scans stop after their current chunk and checkpoint
+            stop.set()
+            raise
+        for index, future in enumerate(futures):
+            try:
+                results[index] = future.result()
+            except OSError as e:
+                results[index] = {"target": scans[index].path, "error": str(e)}
+    return results
+
+
+def _format_bytes(value):
+    for unit in ("B", "KiB", "MiB", "GiB", "TiB"):
+        if value < 1024 or unit == "TiB":
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+
+
+def format_progress(scans):
+    parts = []
+    for scan in scans:
+        progress = scan.progress()
+        if progress is None:
+            parts.append(f"{scan.path}: waiting")
+            continue
+        done, size, rate, eta = progress
+        eta_text = f", ETA {eta / 60:.0f} min" if eta is not None else ""
+        parts.append(f"{scan.path}: {done / size * 100 if size else 100:.1f}% {rate / MiB:.0f} MB/s{eta_text}")
+    return " | ".join(parts)
+
+
+def format_report(results):
+    lines = []
+    for entry in results:
+        if "error" in entry:
+            lines.append(f"{entry['target']}: failed, {entry['error']}")
+            continue
+        state = "complete" if entry["complete"] else f"stopped at {entry['scanned'] / entry['size'] * 100:.1f}%"
+        speed = f", {entry['mb_s']:.0f} MB/s" if entry["mb_s"] else ""
+        resumed = f", resumed {entry['resumed']} times" if entry["resumed"] else ""
+        lines.append(f"{entry['target']}: {_format_bytes(entry['size'])} {state}{speed}{resumed}, "
+                     f"{len(entry['unreadable'])} unreadable and {len(entry['slow'])} slow regions")
+        for region in entry["unreadable"][:MAX_LISTED_REGIONS]:
+            lines.append(f"  UNREADABLE at {region['offset']} (+{_format_bytes(region['length'])}): {region['error']}")
+        for region in entry["slow"][:MAX_LISTED_REGIONS]:
+            lines.append(f"  slow at {region['offset']} (+{_format_bytes(region['length'])}): {region['seconds']:.2f} s")
+        hidden = max(len(entry["unreadable"]) - MAX_LISTED_REGIONS, 0) + max(len(entry["slow"]) - MAX_LISTED_REGIONS, 0)
+        if hidden:
+            lines.append(f"  ... {hidden} more regions in the JSON output")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read every block of the drives and report bad or slow regions.")
+    parser.add_argument("targets", nargs="*", help="block devices or image files (default: every disk)")
+    parser.add_argument("--parallel", type=int, default=PARALLEL, help="targets scanned at once")
+    parser.add_argument("--chunk", type=int, default=CHUNK_SIZE // MiB, help="read size in MiB")
+    parser.add_argument("--slow", type=float, default=SLOW_CHUNK_S, help="seconds after which a chunk read is slow")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_FILE)
+    parser.add_argument("--restart", action="store_true", help="ignore checkpoints and scan from the start")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    targets = args.targets or list_block_devices()
+    if not targets:
+        parser.error("no block devices found")
+
+    def show(scans):
+        print(f"\r{format_progress(scans)}", end="", file=sys.stderr, flush=True)
+
+    try:
+        results = scan_targets(targets, args.parallel, ScanCheckpoint(args.checkpoint), args.restart,
+                               on_progress=None if args.json else show,
+                               chunk_size=args.chunk * MiB, slow_chunk_s=args.slow)
+    except KeyboardInterrupt:
+        print("\nInterrupted; run again to resume.", file=sys.stderr)
+        sys.exit(130)
+    if not args.json:
+        print(file=sys.stderr)
+    if args.json:
+        print(json.dumps(results))
+    else:
+        sys.stdout.write(format_report(results))
+    sys.exit(1 if any(entry.get("error") or entry.get("unreadable") for entry in results) else 0)
+
+if __name__ == "__main__":
+    main()
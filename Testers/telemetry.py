@@ -0,0 +1,175 @@
+import argparse
+import json
+import threading
+import time
+from array import array
+
+import psutil
+
+from collectors import read_batteries
+from stats import summarize
+
+# Continuous monitoring for burn-in runs. Each metric goes into a fixed-size
+# ring buffer backed by an array of doubles, so memory use is set by the
+# capacity and not by how long the run lasts. Summaries are computed only
+# when asked for, and the sampler measures its own CPU time and memory.
+
+
+class RingBuffer:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._data = array("d", bytes(8 * capacity))
+        self._next = 0
+        self.count = 0
+
+    def append(self, value):
+        self._data[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def values(self):
+        # Oldest first
+        if self.count < self.capacity:
+            return self._data[:self.count]
+        return self._data[self._next:] + self._data[:self._next]
+
+    def last(self):
+        return self._data[self._next - 1] if self.count else None
+
+    @property
+    def nbytes(self):
+        return self._data.itemsize * self.capacity
+
+    def summary(self, percentiles=(50, 95, 99)):
+        summary = summarize(self.values(), percentiles)
+        if self.count:
+            summary["last"] = self.last()
+        return summary
+
+
+class TelemetrySampler(threading.Thread):
+    def __init__(self, rate=2.0, capacity=3600, temperatures=True, battery=True):
+        super().__init__(daemon=True)
+        self.interval = 1.0 / rate
+        self.capacity = capacity
+        self.temperatures = temperatures and hasattr(psutil, "sensors_temperatures")
+        self.battery = battery
+        self.series = {}
+        self.samples = 0
+        self.overruns = 0
+        self.cpu_time = 0.0
+        self.started = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+
+    def _record(self, name, value):
+        if value is None:
+            return
+        buffer = self.series.get(name)
+        if buffer is None:
+            buffer = self.series[name] = RingBuffer(self.capacity)
+        buffer.append(value)
+
+    def sample(self):
+        with self._lock:
+            for core, percent in enumerate(psutil.cpu_percent(percpu=True)):
+                self._record(f"cpu{core}_percent", percent)
+            memory = psutil.virtual_memory()
+            self._record("memory_percent", memory.percent)
+            self._record("memory_available_bytes", memory.available)
+            for core, freq in enumerate(psutil.cpu_freq(percpu=True) or []):
+                self._record(f"cpu{core}_mhz", freq.current)
+            if self.temperatures:
+                for chip, sensors in psutil.sensors_temperatures().items():
+                    for number, sensor in enumerate(sensors):
+                        self._record(f"temp_{chip}_{sensor.label or number}_c", sensor.current)
+            if self.battery:
+                for battery in read_batteries():
+                    self._record(f"{battery.name}_percent", battery.percentage)
+                    self._record(f"{battery.name}_watts", battery.energy_rate)
+            self.samples += 1
+
+    def run(self):
+        psutil.cpu_percent(percpu=True)  # the first call only sets the baseline
+        self.started = time.monotonic()
+        deadline = self.started
+        while not self._stopping.is_set():
+            deadline += self.interval
+            if self._stopping.wait(max(deadline - time.monotonic(), 0)):
+                break
+            cpu_start = time.thread_time()
+            self.sample()
+            self.cpu_time += time.thread_time() - cpu_start
+            if time.monotonic() > deadline + self.interval:
+                # Fell behind; skip missed ticks instead of sampling in a burst
+                self.overruns += 1
+                deadline = time.monotonic()
+
+    def stop(self):
+        self._stopping.set()
+        self.join()
+
+    def summary(self):
+        with self._lock:
+            metrics = {name: buffer.summary() for name, buffer in sorted(self.series.items())}
+            elapsed = time.monotonic() - self.started if self.started else 0.0
+            return {
+                "samples": self.samples,
+                "elapsed": elapsed,
+                "metrics": metrics,
+                "overhead": {
+                    "cpu_seconds": self.cpu_time,
+                    # Percent of one core spent sampling
+                    "cpu_percent": self.cpu_time / elapsed * 100 if elapsed else 0.0,
+                    "buffer_bytes": sum(buffer.nbytes for buffer in self.series.values()),
+                    "process_rss_bytes": psutil.Process().memory_info().rss,
+                    "overruns": self.overruns,
+                },
+            }
+
+
+def format_summary(summary):
+    lines = [f"Telemetry: {summary['samples']} samples over {summary['elapsed']:.1f} s"]
+    for name, stats in summary["metrics"].items():
+        if stats["count"]:
+            lines.append(f"  {name:<32} min {stats['min']:>10.1f}  p50 {stats['p50']:>10.1f}  "
+                         f"p95 {stats['p95']:>10.1f}  p99 {stats['p99']:>10.1f}  max {stats['max']:>10.1f}")
+    overhead = summary["overhead"]
+    lines.append(f"Sampler overhead: {overhead['cpu_percent']:.2f}% CPU, "
+                 f"{overhead['buffer_bytes'] / 1024:.0f} KiB buffers, "
+                 f"{overhead['process_rss_bytes'] / 1024 ** 2:.1f} MiB RSS, "
+                 f"{overhead['overruns']} overruns")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sample CPU, memory, frequency, temperature and battery continuously.")
+    parser.add_argument("--rate", type=float, default=2.0, help="samples per second")
+    parser.add_argument("--duration", type=float, help="seconds to run (default: until Ctrl-C)")
+    parser.add_argument("--capacity", type=int, default=3600, help="samples kept per metric")
+    parser.add_argument("--report-every", type=float, default=60.0, help="seconds between summaries")
+    parser.add_argument("--no-temperatures", action="store_true")
+    parser.add_argument("--no-battery", action="store_true")
+    parser.add_argument("--json", action="store_true", help="print summaries as JSON")
+    args = parser.parse_args()
+
+    sampler = TelemetrySampler(args.rate, args.capacity,
+                               temperatures=not args.no_temperatures, battery=not args.no_battery)
+    sampler.start()
+    end = time.monotonic() + args.duration if args.duration else None
+    try:
+        while end is None or time.monotonic() < end:
+            wait = args.report_every if end is None else min(args.report_every, end - time.monotonic())
+            time.sleep(max(wait, 0))
+            if end is None or time.monotonic() < end:
+                summary = sampler.summary()
+                print(json.dumps(summary) if args.json else format_summary(summary), flush=True)
+    except KeyboardInterrupt:
+        pass
+    sampler.stop()
+    summary = sampler.summary()
+    print(json.dumps(summary) if args.json else format_summary(summary))
+
+if __name__ == "__main__":
+    main()
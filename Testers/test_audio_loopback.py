@@ -0,0 +1,44 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from audio_loopback import CHUNK_FRAMES, LoopbackAnalyzer, default_plan, grade, synthesize_capture
+from results import PASS, FAIL
+
+# The loopback analysis on synthesized captures
+
+
+def _analyze(**options):
+    plan = default_plan()
+    analyzer = LoopbackAnalyzer(plan)
+    capture = synthesize_capture(plan, **options)
+    for start in range(0, len(capture), CHUNK_FRAMES):
+        analyzer.feed(capture[start:start + CHUNK_FRAMES])
+    return analyzer.finish()
+
+
+def test_clean_capture_passes():
+    report = _analyze(delay_s=0.03)
+    assert grade(report) == (PASS, [])
+    assert report["swapped"] is False
+    assert report["latency_ms"] == pytest.approx(30, abs=1)
+
+
+def test_swapped_channels_fail():
+    status, problems = grade(_analyze(swap=True))
+    assert status == FAIL and problems == ["left and right channels are swapped"]
+
+
+@pytest.mark.parametrize("muted", ["left", "right"])
+def test_dead_speaker_fails_with_a_mono_microphone(muted):
+    report = _analyze(mono=True, muted=muted)
+    assert report["channels"] == 1 and report["swapped"] is None
+    status, problems = grade(report)
+    assert status == FAIL
+    assert len(problems) == 1 and problems[0].startswith(f"the {muted} speaker alone")
+
+
+def test_mono_microphone_hears_both_speakers():
+    report = _analyze(mono=True)
+    assert grade(report) == (PASS, [])
+    assert report["channel_drop_db"]["left"] == pytest.approx(6.0, abs=0.5)
@@ -0,0 +1,57 @@
+import time
+
+import tracing
+from check_runner import run_scheduled
+from registry import CheckSpec
+from results import CheckResult, FAIL, SKIP
+
+# The scheduler running checks defined here, looked up by "module:function"
+# like the registry's own
+
+_spans = {}
+
+
+def _sleeping(name, seconds, status="pass"):
+    start = time.perf_counter()
+    time.sleep(seconds)
+    _spans[name] = (start, time.perf_counter())
+    return CheckResult(name, status)
+
+
+def window_check():
+    return _sleeping("window", 1.0)
+
+
+def pool_check():
+    return _sleeping("pool", 0.5)
+
+
+def failing_check():
+    return _sleeping("failing", 0.0, FAIL)
+
+
+def test_main_thread_check_overlaps_the_pool():
+    _spans.clear()
+    specs = [CheckSpec("window", "test_check_runner:window_check", 1.0, main_thread=True),
+             CheckSpec("pool", "test_check_runner:pool_check", 0.5)]
+    results, timing = run_scheduled(specs)
+
+    assert [result.name for result in results] == ["window", "pool"]
+    # The pool check is submitted before the window check blocks this thread
+    window, pool = _spans["window"], _spans["pool"]
+    assert pool[0] < window[1] and window[0] < pool[1]
+    assert timing.wall < 1.4
+
+
+def test_dependents_of_a_failed_check_are_skipped():
+    tracing.drain()
+    specs = [CheckSpec("failing", "test_check_runner:failing_check", 0.0),
+             CheckSpec("pool", "test_check_runner:pool_check", 0.5, depends=("failing",))]
+    (failing, pool), _ = run_scheduled(specs)
+
+    assert failing.status == FAIL
+    assert pool.status == SKIP and "failing did not pass" in pool.message
+    # The skipped check still gets a span, so the metrics file reports its outcome
+    spans = {span.name: span for span in tracing.drain()}
+    assert (spans["pool"].outcome, spans["pool"].duration) == (SKIP, 0.0)
+    assert 'hardware_check_outcome{check="pool",outcome="skip"} 1' in tracing.to_prometheus(spans.values())
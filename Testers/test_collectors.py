@@ -0,0 +1,80 @@
+import pytest
+
+from collectors import read_batteries, read_sound_cards
+
+# The sysfs/procfs readers pointed at a fake tree
+
+
+def _tree(root, files):
+    for path, content in files.items():
+        path = root / path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content + "\n")
+    return str(root)
+
+
+def test_batteries(tmp_path):
+    supply = "class/power_supply"
+    root = _tree(tmp_path, {
+        f"{supply}/AC/type": "Mains",
+        f"{supply}/AC/online": "0",
+        # Energy in uWh
+        f"{supply}/BAT0/type": "Battery",
+        f"{supply}/BAT0/status": "Discharging",
+        f"{supply}/BAT0/capacity": "87",
+        f"{supply}/BAT0/energy_now": "20000000",
+        f"{supply}/BAT0/energy_full": "45000000",
+        f"{supply}/BAT0/energy_full_design": "50000000",
+        f"{supply}/BAT0/power_now": "7500000",
+        # Charge only, converted with the design voltage
+        f"{supply}/BAT1/type": "Battery",
+        f"{supply}/BAT1/charge_full": "2000000",
+        f"{supply}/BAT1/charge_full_design": "4000000",
+        f"{supply}/BAT1/voltage_min_design": "11100000",
+        # The fuel gauge reports no full energy at all
+        f"{supply}/BAT2/type": "Battery",
+        f"{supply}/BAT2/energy_full_design": "50000000",
+        # A dead pack
+        f"{supply}/BAT3/type": "Battery",
+        f"{supply}/BAT3/energy_full": "0",
+        f"{supply}/BAT3/energy_full_design": "50000000",
+    })
+    batteries = {battery.name: battery for battery in read_batteries(root)}
+    assert sorted(batteries) == ["BAT0", "BAT1", "BAT2", "BAT3"]
+
+    bat0 = batteries["BAT0"]
+    assert (bat0.status, bat0.percentage, bat0.energy, bat0.energy_rate) == ("Discharging", 87, 20.0, 7.5)
+    assert bat0.health == 90.0
+    assert batteries["BAT1"].energy_full == 2.0 * 11.1
+    assert batteries["BAT1"].health == 50.0
+    assert batteries["BAT2"].energy_full is None and batteries["BAT2"].health is None
+    assert batteries["BAT2"].percentage is None
+    assert batteries["BAT3"].health == 0.0
+
+
+def test_no_power_supply_class(tmp_path):
+    assert read_batteries(str(tmp_path)) == []
+
+
+def test_sound_cards(tmp_path):
+    root = _tree(tmp_path, {
+        "asound/cards": (" 0 [PCH            ]: HDA-Intel - HDA Intel PCH\n"
+                         "                      HDA Intel PCH at 0xf1230000 irq 142\n"
+                         " 1 [Device         ]: USB-Audio - USB Audio Device\n"
+                         "                      Generic USB Audio Device at usb-0000:00:14.0-2, full speed"),
+        "asound/pcm": ("00-00: ALC257 Analog : ALC257 Analog : playback 1 : capture 1\n"
+                       "00-03: HDMI 0 : HDMI 0 : playback 1\n"
+                       "01-00: USB Audio : USB Audio : capture 1"),
+    })
+    pch, usb = read_sound_cards(root)
+    assert (pch.index, pch.id, pch.driver, pch.name) == (0, "PCH", "HDA-Intel", "HDA Intel PCH")
+    assert pch.long_name == "HDA Intel PCH at 0xf1230000 irq 142"
+    assert [(device.device, device.playback, device.capture) for device in pch.devices] == [(0, True, True),
+                                                                                         (3, True, False)]
+    assert (usb.id, usb.driver) == ("Device", "USB-Audio")
+    assert [(device.name, device.playback, device.capture) for device in usb.devices] == [("USB Audio", False, True)]
+
+
+def test_no_alsa(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        read_sound_cards(str(tmp_path))
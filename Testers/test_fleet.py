@@ -0,0 +1,99 @@
+import gzip
+import http.client
+import json
+import sqlite3
+import threading
+
+import fleet_collector
+from fleet_collector import CollectorServer
+from fleet_upload import FleetUploader
+
+# fleet_upload.py against a real fleet_collector.py on localhost
+
+
+def _record(name, started=1.0):
+    return {"serial": "SN1", "host": "bench", "run_started": 1000.0, "name": name, "status": "pass",
+            "started": started, "duration": 0.1, "metrics": {}, "message": ""}
+
+
+def _start(address, db_path):
+    server = CollectorServer(address, str(db_path))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _stop(server):
+    server.shutdown()
+    server.server_close()
+
+
+def _stored(db_path):
+    with sqlite3.connect(db_path) as db:
+        return sorted(name for (name,) in db.execute("SELECT name FROM results"))
+
+
+def test_sent_spooled_and_flushed(tmp_path):
+    db_path = tmp_path / "fleet.sqlite3"
+    server = _start(("127.0.0.1", 0), db_path)
+    address = server.server_address
+    uploader = FleetUploader(f"http://127.0.0.1:{address[1]}/ingest", spool_dir=str(tmp_path / "spool"),
+                             retries=1, backoff=0.01, timeout=2)
+    try:
+        assert uploader.upload([_record("ram")]) == "sent"
+        _stop(server)
+
+        assert uploader.upload([_record("cpu")]) == "spooled"
+        # Queued behind the first without another round of retries
+        assert uploader.upload([_record("audio")]) == "spooled"
+        assert len(uploader.spooled()) == 2
+
+        server = _start(address, db_path)
+        assert uploader.upload([_record("storage")]) == "sent"
+        assert uploader.spooled() == []
+    finally:
+        uploader.close()
+        _stop(server)
+    assert _stored(db_path) == ["audio", "cpu", "ram", "storage"]
+
+
+def test_bad_batch_is_rejected_and_dropped(tmp_path):
+    db_path = tmp_path / "fleet.sqlite3"
+    server = _start(("127.0.0.1", 0), db_path)
+    uploader = FleetUploader(f"http://127.0.0.1:{server.server_address[1]}/ingest",
+                             spool_dir=str(tmp_path / "spool"), retries=1, backoff=0.01, timeout=2)
+    try:
+        # sqlite can't bind a list, so this batch fails however it is grouped
+        assert uploader.upload([_record("ram", started=[1, 2])]) == "rejected"
+        assert uploader.spooled() == []
+        assert uploader.upload([_record("cpu")]) == "sent"
+    finally:
+        uploader.close()
+        _stop(server)
+    assert _stored(db_path) == ["cpu"]
+
+
+def _post(address, body):
+    connection = http.client.HTTPConnection(*address, timeout=5)
+    try:
+        connection.request("POST", "/ingest", body, {"Content-Encoding": "gzip"})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def test_decompressed_size_is_capped(tmp_path, monkeypatch):
+    monkeypatch.setattr(fleet_collector, "MAX_DECOMPRESSED", 64 * 1024)
+    db_path = tmp_path / "fleet.sqlite3"
+    server = _start(("127.0.0.1", 0), db_path)
+    try:
+        # Two members, as a flush of spooled batches sends them
+        batch = "".join(json.dumps(_record(name)) + "\n" for name in ("ram", "cpu"))
+        body = gzip.compress(batch[:100].encode()) + gzip.compress(batch[100:].encode())
+        assert _post(server.server_address, body) == (200, {"stored": 2})
+        # A few hundred bytes on the wire that inflate past the cap
+        status, _ = _post(server.server_address, gzip.compress(b" " * (1024 * 1024)))
+        assert status == 413
+    finally:
+        _stop(server)
+    assert _stored(db_path) == ["cpu", "ram"]
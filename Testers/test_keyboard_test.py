@@ -0,0 +1,64 @@
+import pytest
+
+pytest.importorskip("tkinter")
+
+from keyboard_test import KeyEvent, KeystrokeAnalyzer, load_layout, replay
+
+# Synthetic key event streams replayed through KeystrokeAnalyzer
+
+MS = 1_000_000
+
+
+def _tap(keysym, at_ms, hold_ms=80.0):
+    return [KeyEvent("press", keysym, int(at_ms * MS)), KeyEvent("release", keysym, int((at_ms + hold_ms) * MS))]
+
+
+def test_clean_typing():
+    events = _tap("a", 0) + _tap("s", 200) + _tap("a", 400)
+    report = replay(events).report(expected=["a", "s", "d"])
+    assert (report["tested"], report["expected"], report["missing"]) == (2, 3, ["d"])
+    assert report["chatter"] == [] and report["stuck"] == [] and report["abnormal_holds"] == []
+    assert report["keys"]["a"]["presses"] == 2
+
+
+def test_double_fire_is_chatter():
+    # A bouncing switch: a second press 20 ms after the first, with a 2 ms release in between
+    events = _tap("e", 0, hold_ms=18.0) + _tap("e", 20, hold_ms=60.0)
+    report = replay(events).report()
+    assert report["chatter"] == ["e"]
+    assert report["keys"]["e"]["chatter_intervals_ms"] == [pytest.approx(20.0)]
+
+
+def test_x11_auto_repeat_is_not_chatter():
+    # Held key: release and press pairs with the same server timestamp
+    events = [KeyEvent("press", "j", 0, server_time=1000)]
+    for number in range(1, 4):
+        events += [KeyEvent("release", "j", number * 25 * MS, server_time=1000 + number * 25),
+                   KeyEvent("press", "j", number * 25 * MS + 1000, server_time=1000 + number * 25)]
+    events.append(KeyEvent("release", "j", 120 * MS, server_time=1120))
+    report = replay(events).report()
+    assert report["chatter"] == []
+    entry = report["keys"]["j"]
+    assert (entry["presses"], entry["repeats"]) == (1, 3)
+    assert entry["hold_ms"]["count"] == 1 and entry["hold_ms"]["max"] == pytest.approx(120.0)
+
+
+def test_key_still_down_at_the_end_is_stuck():
+    events = _tap("a", 0) + [KeyEvent("press", "Shift_L", 100 * MS)]
+    report = replay(events).report(now=6100 * MS)
+    assert report["stuck"] == ["Shift_L"]
+    assert report["keys"]["Shift_L"]["down_ms"] == pytest.approx(6000.0)
+
+
+def test_bounce_and_long_hold_are_abnormal():
+    events = _tap("q", 0, hold_ms=2.0) + _tap("w", 100, hold_ms=2000.0)
+    report = replay(events).report()
+    assert report["abnormal_holds"] == ["q", "w"]
+    assert (report["keys"]["q"]["short_holds"], report["keys"]["w"]["long_holds"]) == (1, 1)
+
+
+def test_shifted_keysyms_count_for_the_layout_key():
+    layout = load_layout("us_ansi")
+    events = _tap("A", 0) + _tap("exclam", 200)
+    report = replay(events, layout).report(expected=["a", "1"])
+    assert report["missing"] == []
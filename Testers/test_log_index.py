@@ -0,0 +1,55 @@
+import gzip
+import shutil
+
+from log_index import LogIndex
+
+# Indexing a log across rotations, the way log_setup.py rotates it
+
+
+def _line(second, message):
+    return f"2024-05-22 10:00:{second:02d},000 INFO:{message}\n"
+
+
+def _rotate(log):
+    # RotatingFileHandler with _gzip_rotator: .1.gz moves to .2.gz, the log becomes .1.gz
+    rotated = log.with_name(log.name + ".1.gz")
+    if rotated.exists():
+        rotated.rename(log.with_name(log.name + ".2.gz"))
+    with open(log, "rb") as src, gzip.open(rotated, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    log.write_text("")
+
+
+def test_entries_survive_rotation(tmp_path):
+    log = tmp_path / "hardware_check.log"
+    log.write_text(_line(1, "RAM Information: total=8") + _line(2, "CPU Information: user=3.0"))
+    index = LogIndex(str(log))
+    try:
+        assert index.update() == 2
+        # Written after the last update, then rotated away before the next one
+        with open(log, "a") as f:
+            f.write(_line(3, "Storage Information: Total: 1"))
+        _rotate(log)
+        log.write_text(_line(4, "RAM Information: total=16"))
+        # The last record of the old live file is scanned again, then the new line
+        assert index.update() == 3
+
+        assert [(kind, text.partition("INFO:")[2].rstrip()) for _, _, kind, text in index.records()] == [
+            ("ram", "RAM Information: total=8"),
+            ("cpu", "CPU Information: user=3.0"),
+            ("storage", "Storage Information: Total: 1"),
+            ("ram", "RAM Information: total=16"),
+        ]
+        # A second rotation renames .1.gz without rescanning it; of the old live
+        # file only its last record is scanned again
+        _rotate(log)
+        log.write_text(_line(5, "CPU Information: user=4.0"))
+        assert index.update() == 2
+        assert [count for _, count, _, _ in index.counts()] == [2, 2, 1]
+
+        # Segments whose file is gone are dropped
+        log.with_name(log.name + ".2.gz").unlink()
+        index.update()
+        assert [text for _, _, _, text in index.records("ram")] == [_line(4, "RAM Information: total=16")]
+    finally:
+        index.close()
@@ -0,0 +1,60 @@
+import asyncio
+import socket
+
+import pytest
+
+pytest.importorskip("psutil")
+
+import net_test
+from net_test import LinkTestServer, grade, measure_goodput, measure_rtt, run_link_test
+from results import WARN
+
+# The link test against a LinkTestServer on loopback
+
+
+async def _with_server(test):
+    server = LinkTestServer()
+    port = await server.start("127.0.0.1", 0)
+    try:
+        return await test(port)
+    finally:
+        await server.close()
+
+
+def test_sink_source_and_echo():
+    async def test(port):
+        upload = await measure_goodput("127.0.0.1", port, "upload", streams=2, duration=0.2)
+        download = await measure_goodput("127.0.0.1", port, "download", streams=2, duration=0.2)
+        rtt, local = await measure_rtt("127.0.0.1", port, pings=20)
+        return upload, download, rtt, local
+
+    upload, download, rtt, local = asyncio.run(_with_server(test))
+    # The upload figure is what the sink counted
+    assert upload["bytes"] > 0 and len(upload["streams"]) == 2
+    assert download["bytes"] > 0 and len(download["streams"]) == 2
+    assert rtt["count"] == 20 and local == "127.0.0.1"
+
+
+def _link_test(port):
+    return run_link_test("127.0.0.1", port, "lo", streams=1, duration=0.2, pings=20)
+
+
+def test_named_interface_is_pinned():
+    report = asyncio.run(_with_server(_link_test))
+    assert report["interface"] == "lo" and report["carried_by"] == "lo"
+    assert report["binding"] in ("device", "address")
+    assert not any("traffic went out" in problem for problem in grade(report)[1])
+
+
+def test_falls_back_to_the_address_without_so_bindtodevice(monkeypatch):
+    monkeypatch.delattr(socket, "SO_BINDTODEVICE", raising=False)
+    report = asyncio.run(_with_server(_link_test))
+    assert report["binding"] == "address"
+    assert "bound by source address only" in net_test.format_report(report)
+
+
+def test_traffic_on_another_interface_is_reported():
+    report = {"interface": "eth0", "carried_by": "wlan0", "counters": {}, "speed_mbit": None,
+              "rtt_ms": {"p99": 0.1}}
+    status, problems = grade(report)
+    assert status == WARN and problems == ["traffic went out wlan0, not eth0"]
@@ -0,0 +1,72 @@
+import asyncio
+import json
+import os
+import stat
+import sys
+
+from orchestrator import TIMED_OUT, run_fleet
+
+# run_fleet() against a fake ssh client given through the `ssh` override, so
+# no sshd is needed. The fake keeps its state in FAKE_SSH_DIR: the master
+# writes its pid there, `-O exit` stops it, and a copy that hangs records its
+# own pid so the test can see whether it was killed.
+
+FAKE_SSH = """#!{python}
+import json, os, signal, sys, time
+
+state = os.environ["FAKE_SSH_DIR"]
+master = os.path.join(state, "master.pid")
+args = sys.argv[1:]
+if "-M" in args:
+    with open(master, "w") as f:
+        f.write(str(os.getpid()))
+    time.sleep(60)
+elif "-O" in args:
+    command = args[args.index("-O") + 1]
+    if command == "exit" and os.path.exists(master):
+        os.kill(int(open(master).read()), signal.SIGTERM)
+    sys.exit(0 if os.path.exists(master) else 255)
+elif "tar -x" in args[-1]:
+    with open(os.path.join(state, "deploy.pid"), "w") as f:
+        f.write(str(os.getpid()))
+    time.sleep(60)
+else:
+    checks = args[-1].split("--checks ")[1].split()[0].split(",")
+    for name in checks:
+        print(json.dumps({{"name": name, "status": "pass", "message": ""}}), flush=True)
+"""
+
+
+def _fake_ssh(tmp_path, monkeypatch):
+    path = tmp_path / "ssh"
+    path.write_text(FAKE_SSH.format(python=sys.executable))
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    state = tmp_path / "state"
+    state.mkdir()
+    monkeypatch.setenv("FAKE_SSH_DIR", str(state))
+    return str(path), state
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+def test_results_arrive_per_check(tmp_path, monkeypatch):
+    ssh, _ = _fake_ssh(tmp_path, monkeypatch)
+    seen = []
+    (report,) = asyncio.run(run_fleet(["bench"], ["ram", "cpu"], lambda host, record: seen.append(record["name"]),
+                                      deploy=False, ssh=ssh))
+    assert report["outcome"] == "pass" and report["error"] is None
+    assert seen == ["ram", "cpu"]
+
+
+def test_timeout_during_copy_kills_the_copy(tmp_path, monkeypatch):
+    ssh, state = _fake_ssh(tmp_path, monkeypatch)
+    (report,) = asyncio.run(run_fleet(["bench"], ["ram"], lambda host, record: None, host_timeout=1.0, ssh=ssh))
+    assert report["outcome"] == TIMED_OUT
+    assert not _alive(int((state / "deploy.pid").read_text()))
+    assert not _alive(int((state / "master.pid").read_text()))
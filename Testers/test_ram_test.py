@@ -0,0 +1,36 @@
+import pytest
+
+pytest.importorskip("psutil")
+
+import ram_test
+from ram_test import format_report, run_memory_test
+
+# Small memory tests: a few MiB per worker instead of half the RAM
+
+MiB = 1024 * 1024
+
+
+@pytest.fixture
+def small(monkeypatch):
+    class Memory:
+        available = 8 * MiB
+    monkeypatch.setattr(ram_test.psutil, "virtual_memory", lambda: Memory)
+
+
+def test_full_pass(small):
+    report = run_memory_test(0.5, workers=2)
+    assert report["tested_bytes"] == 4 * MiB and report["total_errors"] == 0
+    assert report["steps"] == report["steps_total"] == 68
+    assert "time budget" not in format_report(report)
+
+
+def test_budget_stops_new_sweeps(small):
+    report = run_memory_test(0.5, workers=2, budget=0.0)
+    assert report["steps"] == 0 and report["steps_total"] == 68
+    assert "Stopped by the 0 s time budget after 0 of 68 sweeps" in format_report(report)
+
+
+def test_sweeps_are_interleaved():
+    names = [name for name, _ in ram_test._interleaved_steps(ram_test.PATTERNS, 0)]
+    assert names[:6] == ["walking_ones", "checkerboard", "address"] * 2
+    assert len(names) == 68
@@ -0,0 +1,68 @@
+import errno
+import os
+import threading
+
+import surface_scan
+from surface_scan import MiB, RETRY_BLOCK, ScanCheckpoint, TargetScan
+
+# Surface scans of a sparse image file, with read errors injected through a
+# fake preadv
+
+CHUNK = 1 * MiB
+SIZE = 8 * MiB
+BAD = {CHUNK + 2 * RETRY_BLOCK, 3 * CHUNK, 3 * CHUNK + RETRY_BLOCK}  # block offsets that fail
+
+_preadv = os.preadv
+
+
+def _failing_preadv(bad, on_read=None):
+    def preadv(fd, buffers, offset):
+        length = sum(len(buffer) for buffer in buffers)
+        if on_read is not None:
+            on_read(offset)
+        if any(offset <= block < offset + length for block in bad):
+            raise OSError(errno.EIO, os.strerror(errno.EIO))
+        return _preadv(fd, buffers, offset)
+    return preadv
+
+
+def _image(tmp_path):
+    path = tmp_path / "disk.img"
+    with open(path, "wb") as f:
+        f.truncate(SIZE)
+    return path
+
+
+def test_unreadable_blocks_are_narrowed_and_merged(tmp_path, monkeypatch):
+    path = _image(tmp_path)
+    monkeypatch.setattr(surface_scan.os, "preadv", _failing_preadv(BAD))
+    scan = TargetScan(str(path), ScanCheckpoint(str(tmp_path / "scan.json")), chunk_size=CHUNK)
+    result = scan.run(threading.Event())
+
+    assert result["complete"] and result["scanned"] == SIZE
+    error = os.strerror(errno.EIO)
+    assert result["unreadable"] == [
+        {"offset": CHUNK + 2 * RETRY_BLOCK, "length": RETRY_BLOCK, "error": error},
+        # Adjacent bad blocks become one region
+        {"offset": 3 * CHUNK, "length": 2 * RETRY_BLOCK, "error": error},
+    ]
+
+
+def test_interrupted_scan_resumes_under_another_spelling_of_the_path(tmp_path, monkeypatch):
+    _image(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    checkpoint_path = str(tmp_path / "scan.json")
+    stop = threading.Event()
+
+    def on_read(offset):
+        if offset >= 2 * CHUNK:
+            stop.set()
+
+    monkeypatch.setattr(surface_scan.os, "preadv", _failing_preadv(BAD, on_read))
+    first = TargetScan("disk.img", ScanCheckpoint(checkpoint_path), chunk_size=CHUNK).run(stop)
+    assert not first["complete"] and first["scanned"] == 3 * CHUNK
+
+    second = TargetScan("./disk.img", ScanCheckpoint(checkpoint_path), chunk_size=CHUNK).run(threading.Event())
+    assert second["complete"] and second["resumed"] == 1
+    # The region found before the interruption is kept
+    assert [region["offset"] for region in second["unreadable"]] == [CHUNK + 2 * RETRY_BLOCK, 3 * CHUNK]
@@ -0,0 +1,77 @@
+import pytest
+
+pytest.importorskip("tkinter")
+
+from results import PASS, WARN, FAIL
+from trackpad_test import PointerAnalyzer, PointerEvent, replay
+
+# Synthetic pointer strokes replayed through PointerAnalyzer on a 16x10 grid
+
+COLUMNS, ROWS = 16, 10
+MS = 1_000_000
+
+
+def _centre(column, row):
+    return (column + 0.5) / COLUMNS, (row + 0.5) / ROWS
+
+
+def _stroke(cells, start=0, interval_ms=8.0, new_stroke=False):
+    # One event per cell centre, interval_ms apart
+    events = []
+    for number, (column, row) in enumerate(cells):
+        x, y = _centre(column, row)
+        events.append(PointerEvent(x, y, int(start + number * interval_ms * MS),
+                                   new_stroke=new_stroke and number == 0))
+    return events
+
+
+def _raster(interval_ms=8.0):
+    # Every cell, row by row, reversing direction so each step is to a neighbour
+    cells = []
+    for row in range(ROWS):
+        columns = range(COLUMNS) if row % 2 == 0 else reversed(range(COLUMNS))
+        cells.extend((column, row) for column in columns)
+    return _stroke(cells, interval_ms=interval_ms)
+
+
+def test_full_sweep_passes_at_125_hz():
+    report = replay(_raster()).report()
+    assert report["status"] == PASS
+    assert report["coverage"] == 1.0 and report["dead_zones"] == []
+    assert report["rate_hz"] == pytest.approx(125.0)
+    assert report["jitter_ms"] == pytest.approx(0.0)
+
+
+def test_slow_report_rate_warns():
+    report = replay(_raster(interval_ms=40.0)).report()
+    assert report["status"] == WARN
+    assert report["rate_hz"] == pytest.approx(25.0)
+
+
+def test_cell_skipped_on_every_pass_is_a_dead_zone():
+    row = [(column, 0) for column in range(COLUMNS) if column != 5]
+    events = _stroke(row) + _stroke(reversed(row), start=200 * MS)
+    report = replay(events, PointerAnalyzer(COLUMNS, ROWS)).report()
+    assert report["dead_zones"] == [[5, 0]]
+    assert report["status"] == FAIL
+
+
+def test_leaving_and_reentering_the_canvas_is_not_a_crossing():
+    events = []
+    for sweep in range(3):
+        # Out through the left edge, back in through the right one 8 ms later
+        start = sweep * 200 * MS
+        events += _stroke([(0, 0), (1, 0)], start=start)
+        events += _stroke([(15, 0), (14, 0)], start=start + 16 * MS, new_stroke=True)
+    analyzer = replay(events, PointerAnalyzer(COLUMNS, ROWS))
+    assert analyzer.dead_zones() == []
+    # The jump back in is no report interval either
+    assert len(analyzer.intervals) == 6
+
+
+def test_jump_after_a_pause_is_not_a_crossing():
+    events = []
+    for sweep in range(3):
+        start = sweep * 1000 * MS
+        events += _stroke([(0, 0)], start=start) + _stroke([(15, 0)], start=start + 500 * MS)
+    assert replay(events, PointerAnalyzer(COLUMNS, ROWS)).dead_zones() == []
@@ -1,42 +1,16 @@
-import subprocess
+from dataclasses import replace
 
-def check_ram():
-    ram_info = subprocess.check_output("free -h", shell=True).decode()
-    print("RAM Information:")
-    print(ram_info)
+from check_runner import run_scheduled, format_timing
+from registry import PROFILES, resolve
+from results import render_report
 
-def check_storage():
-    storage_info = subprocess.check_output("df -h", shell=True).decode()
-    print("Storage Information:")
-    print(storage_info)
-
-def check_keyboard():
-    print("Checking keyboard...")
-    try:
-        subprocess.run(["xev"], timeout=10)
-        print("Keyboard is working properly.")
-    except subprocess.TimeoutExpired:
-        print("Keyboard check timed out. It may not be working properly.")
-
-def check_trackpad():
-    print("Checking trackpad...")
-    try:
-        subprocess.run(["xinput", "test", "Virtual core pointer"], timeout=10)
-        print("Trackpad is working properly.")
-    except subprocess.TimeoutExpired:
-        print("Trackpad check timed out. It may not be working properly.")
-
-def check_battery():
-    battery_info = subprocess.check_output("upower -i /org/freedesktop/UPower/devices/battery_BAT0", shell=True).decode()
-    print("Battery Information:")
-    print(battery_info)
+# The input checks print their request to the operator as they start
+CHECKS = resolve(PROFILES["static"]) + [replace(spec, options=(("prompt", print),))
+                                        for spec in resolve(PROFILES["dynamic"])]
 
 def main():
-    check_ram()
-    check_storage()
-    check_keyboard()
-    check_trackpad()
-    check_battery()
+    results, timing = run_scheduled(CHECKS)
+    print(render_report(results) + format_timing(timing), end="")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,174 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+# Timing spans for check runs. The check decorator opens a span around every
+# check; code underneath adds to the span of the thread it runs on with
+# count(), e.g. the input watcher for each process it starts and collectors for
+# each byte read from sysfs. Finished spans are kept until they are exported
+# as a Chrome trace (chrome://tracing or ui.perfetto.dev) or as a Prometheus
+# textfile for node_exporter's textfile collector.
+
+TRACE_FILE = os.environ.get("HARDWARE_CHECK_TRACE")
+METRICS_FILE = os.environ.get("HARDWARE_CHECK_METRICS")
+
+# Counters every span reports, even when nothing added to them
+COUNTERS = ("subprocesses", "bytes_parsed")
+# The statuses from results.py, which can't be imported here (it imports
+# collectors, which imports this module)
+OUTCOMES = ("pass", "warn", "fail", "error", "skip")
+
+
+@dataclass(slots=True)
+class Span:
+    name: str
+    start: float          # Unix time
+    end: float = 0.0
+    duration: float = 0.0  # seconds, from the monotonic clock
+    outcome: str = ""
+    thread: int = 0
+    counters: dict = field(default_factory=lambda: dict.fromkeys(COUNTERS, 0))
+
+
+_local = threading.local()
+_finished = []
+_lock = threading.Lock()
+
+
+@contextmanager
+def span(name):
+    # Nested spans (a check run from inside another) each get their own counters
+    current = Span(name, time.time(), thread=threading.get_ident())
+    parent = getattr(_local, "span", None)
+    _local.span = current
+    start = time.perf_counter()
+    try:
+        yield current
+    finally:
+        current.duration = time.perf_counter() - start
+        current.end = current.start + current.duration
+        _local.span = parent
+        with _lock:
+            _finished.append(current)
+
+
+def record_skip(name):
+    # A zero-length span for a check that was skipped instead of run, so the
+    # exports still say what became of it
+    now = time.time()
+    with _lock:
+        _finished.append(Span(name, now, now, outcome="skip", thread=threading.get_ident()))
+
+
+def count(counter, amount=1):
+    # Adds to the span open on this thread; a no-op outside a check
+    current = getattr(_local, "span", None)
+    if current is not None:
+        current.counters[counter] = current.counters.get(counter, 0) + amount
+
+
+def spans():
+    with _lock:
+        return list(_finished)
+
+
+def drain():
+    # Returns the finished spans and forgets them, for the next run in a GUI session
+    with _lock:
+        finished = list(_finished)
+        _finished.clear()
+    return finished
+
+
+def _write_atomic(path, content):
+    # node_exporter must never read a half-written file
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def to_chrome_trace(finished):
+    # Complete ("X") events in microseconds, one row per worker thread
+    pid = os.getpid()
+    threads = {ident: index for index, ident in enumerate(sorted({s.thread for s in finished}))}
+    events = [{
+        "name": s.name,
+        "cat": "check",
+        "ph": "X",
+        "ts": s.start * 1e6,
+        "dur": s.duration * 1e6,
+        "pid": pid,
+        "tid": threads[s.thread],
+        "args": {"outcome": s.outcome, **s.counters},
+    } for s in finished]
+    return json.dumps({"traceEvents": events, "displayTimeUnit": "ms"})
+
+
+def write_chrome_trace(finished, path=TRACE_FILE):
+    _write_atomic(path, to_chrome_trace(finished))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def to_prometheus(finished):
+    # The last span of each check wins, so a file always describes one run
+    latest = {s.name: s for s in finished}
+    metrics = [
+        ("hardware_check_duration_seconds", "gauge", "Wall time of the last run of the check.",
+         lambda s: s.duration),
+        ("hardware_check_last_run_timestamp_seconds", "gauge", "When the last run of the check ended.",
+         lambda s: s.end),
+        ("hardware_check_subprocesses", "gauge", "Processes started by the last run of the check.",
+         lambda s: s.counters.get("subprocesses", 0)),
+        ("hardware_check_bytes_parsed", "gauge", "Bytes of tool output and sysfs files the check parsed.",
+         lambda s: s.counters.get("bytes_parsed", 0)),
+    ]
+    lines = []
+    for metric, kind, help_text, value in metrics:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for name, s in sorted(latest.items()):
+            lines.append(f'{metric}{{check="{_escape(name)}"}} {float(value(s))!r}')
+    # Every outcome is written, 1 for the last one and 0 for the rest, so a
+    # check going from pass to warn changes values instead of starting a series
+    lines.append("# HELP hardware_check_outcome Outcome of the last run of the check (1 for the outcome it had).")
+    lines.append("# TYPE hardware_check_outcome gauge")
+    for name, s in sorted(latest.items()):
+        for outcome in OUTCOMES:
+            lines.append(f'hardware_check_outcome{{check="{_escape(name)}",outcome="{outcome}"}} '
+                         f'{1 if s.outcome == outcome else 0}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(finished, path=METRICS_FILE):
+    _write_atomic(path, to_prometheus(finished))
+
+
+def format_breakdown(finished, width=30):
+    # Slowest first, with a bar scaled to the slowest check
+    if not finished:
+        return "No timing recorded.\n"
+    ordered = sorted(finished, key=lambda s: s.duration, reverse=True)
+    longest = ordered[0].duration or 1.0
+    total = sum(s.duration for s in finished)
+    lines = ["Timing breakdown:"]
+    for s in ordered:
+        bar = "#" * max(1, round(s.duration / longest * width))
+        lines.append(f"  {s.name:<18} {s.duration * 1000:>9.1f} ms {s.duration / total * 100 if total else 0:>5.1f}%  "
+                     f"{bar:<{width}}  {s.outcome:<5} {s.counters.get('subprocesses', 0)} proc, "
+                     f"{s.counters.get('bytes_parsed', 0)} B")
+    return "\n".join(lines) + "\n"
+
+
+def export(finished, trace_file=TRACE_FILE, metrics_file=METRICS_FILE):
+    # Writes whichever outputs are configured
+    if trace_file:
+        write_chrome_trace(finished, trace_file)
+    if metrics_file:
+        write_prometheus(finished, metrics_file)
@@ -0,0 +1,290 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+import tkinter as tk
+from dataclasses import dataclass
+
+from results import PASS, WARN, FAIL
+from stats import summarize
+
+# Trackpad test on a canvas. The window is split into a grid and the operator
+# sweeps the pointer over it; the test ends as soon as the target share of
+# cells has been reached. The motion handler only updates the analyzer and
+# marks cells dirty, and cells are repainted in one batch per frame so the
+# display never falls behind a 125 Hz+ pointer. Events are kept in window-
+# relative coordinates so a recorded stream can be replayed through
+# PointerAnalyzer, which has no Tk dependency.
+#
+# Tk only sees the cursor, not absolute finger positions, so a dead zone shows
+# up as cells the pointer keeps jumping across without ever reporting a
+# position inside them. Only jumps within one stroke count: the first event
+# after the pointer re-enters the canvas, or after a pause, starts a new one.
+
+RECORD_DIR = os.environ.get("HARDWARE_CHECK_TRACKPAD_RECORD")  # save event streams here when set
+
+COLUMNS = 16
+ROWS = 10
+TARGET_COVERAGE = 0.95
+TIMEOUT = 60.0         # seconds before the test gives up; registry.py costs trackpad at this
+REPAINT_MS = 16
+PAUSE_MS = 100.0       # longer gaps between events are pauses, not part of the rate
+DEAD_CROSSINGS = 2     # never hit although the pointer crossed it this often
+MIN_RATE_HZ = 50.0
+
+CANVAS_WIDTH = 800
+CANVAS_HEIGHT = 500
+COLOURS = {"untested": "#eeeeee", "hit": "#2e7d32", "grid": "#bdbdbd"}
+
+
+@dataclass(slots=True)
+class PointerEvent:
+    x: float                  # 0..1 across the surface
+    y: float                  # 0..1 down the surface
+    t: int                    # time.perf_counter_ns()
+    server_time: int = None   # the windowing system's millisecond timestamp, if any
+    new_stroke: bool = False  # first event after the pointer re-entered the canvas
+
+
+class PointerAnalyzer:
+    def __init__(self, columns=COLUMNS, rows=ROWS, target=TARGET_COVERAGE):
+        self.columns = columns
+        self.rows = rows
+        self.target = target
+        self.hits = [0] * (columns * rows)
+        self.crossed = [0] * (columns * rows)
+        self.covered = 0
+        self.intervals = []  # ms between consecutive events while moving
+        self.events = []
+        self._previous = None
+
+    def cell(self, x, y):
+        column = min(max(int(x * self.columns), 0), self.columns - 1)
+        row = min(max(int(y * self.rows), 0), self.rows - 1)
+        return row * self.columns + column
+
+    def _interval(self, previous, event):
+        # The server timestamp is when the device reported, not when Tk got round to the event
+        if previous.server_time is not None and event.server_time is not None:
+            return float(event.server_time - previous.server_time)
+        return (event.t - previous.t) / 1e6
+
+    def _cross(self, previous, event, start, end):
+        # Cells strictly between two consecutive reports, sampled at half-cell steps
+        dx, dy = event.x - previous.x, event.y - previous.y
+        steps = int(max(abs(dx) * self.columns, abs(dy) * self.rows) * 2)
+        passed = set()
+        for step in range(1, steps):
+            cell = self.cell(previous.x + dx * step / steps, previous.y + dy * step / steps)
+            if cell != start and cell != end:
+                passed.add(cell)
+        for cell in passed:
+            self.crossed[cell] += 1
+
+    def feed(self, event):
+        # Returns the cell index if this event covered a new cell, else None
+        self.events.append(event)
+        cell = self.cell(event.x, event.y)
+        previous, self._previous = self._previous, event
+        if previous is not None and not event.new_stroke:
+            interval = self._interval(previous, event)
+            # Within a stroke the cursor moves continuously, so a jump skipped whatever lies in between
+            if 0 < interval <= PAUSE_MS:
+                self.intervals.append(interval)
+                self._cross(previous, event, self.cell(previous.x, previous.y), cell)
+        self.hits[cell] += 1
+        if self.hits[cell] == 1:
+            self.covered += 1
+            return cell
+        return None
+
+    @property
+    def coverage(self):
+        return self.covered / len(self.hits)
+
+    @property
+    def complete(self):
+        return self.coverage >= self.target
+
+    def dead_zones(self):
+        return [cell for cell, hits in enumerate(self.hits) if not hits and self.crossed[cell] >= DEAD_CROSSINGS]
+
+    def report(self):
+        intervals = summarize(self.intervals, (50, 95))
+        jitter = None
+        if intervals["count"] > 1:
+            mean = intervals["mean"]
+            jitter = (sum((value - mean) ** 2 for value in self.intervals) / (intervals["count"] - 1)) ** 0.5
+        rate = 1000 / intervals["p50"] if intervals["count"] and intervals["p50"] else None
+        dead = self.dead_zones()
+        if not self.complete or dead:
+            status = FAIL
+        elif rate is None or rate < MIN_RATE_HZ:
+            status = WARN
+        else:
+            status = PASS
+        duration = (self.events[-1].t - self.events[0].t) / 1e9 if self.events else 0.0
+        return {
+            "status": status,
+            "events": len(self.events),
+            "duration": duration,
+            "coverage": self.coverage,
+            "target": self.target,
+            "grid": [self.columns, self.rows],
+            "rate_hz": rate,
+            "interval_ms": intervals,
+            "jitter_ms": jitter,
+            "dead_zones": [[cell % self.columns, cell // self.columns] for cell in dead],
+        }
+
+
+def replay(events, analyzer=None):
+    # Feeds recorded PointerEvents through an analyzer and returns it
+    analyzer = analyzer or PointerAnalyzer()
+    for event in events:
+        analyzer.feed(event)
+    return analyzer
+
+
+def save_recording(events, path):
+    with open(path, "w", encoding="utf-8") as f:
+        for event in events:
+            f.write(json.dumps({"x": event.x, "y": event.y, "t": event.t, "server_time": event.server_time,
+                                "new_stroke": event.new_stroke}) + "\n")
+
+
+def load_recording(path):
+    with open(path, encoding="utf-8") as f:
+        return [PointerEvent(**json.loads(line)) for line in f if line.strip()]
+
+
+def format_report(report):
+    lines = [f"Trackpad test: {report['coverage'] * 100:.0f}% of the surface covered "
+             f"(target {report['target'] * 100:.0f}%), {report['events']} events in {report['duration']:.1f} s"]
+    if report["rate_hz"] is not None:
+        lines.append(f"Report rate: {report['rate_hz']:.0f} Hz, interval p95 {report['interval_ms']['p95']:.1f} ms, "
+                     f"jitter {report['jitter_ms'] or 0:.1f} ms")
+    if report["dead_zones"]:
+        cells = " ".join(f"({column},{row})" for column, row in report["dead_zones"])
+        lines.append(f"DEAD ZONES at grid cells {cells}")
+    if report["status"] == PASS:
+        lines.append("Trackpad test passed.")
+    elif report["status"] == WARN:
+        lines.append(f"Trackpad report rate below {MIN_RATE_HZ:.0f} Hz.")
+    elif report["coverage"] < report["target"]:
+        lines.append("Trackpad test incomplete.")
+    return "\n".join(lines) + "\n"
+
+
+class TrackpadTestApp(tk.Toplevel):
+    def __init__(self, master, analyzer=None, timeout=TIMEOUT, on_finish=None):
+        super().__init__(master)
+        self.analyzer = analyzer or PointerAnalyzer()
+        self.on_finish = on_finish
+        self.report = None
+        self.title("Trackpad Test")
+        self._dirty = set()
+        self._repaint_pending = None
+        self._new_stroke = True
+
+        self.label = tk.Label(self, text="Move the pointer over the whole area until it is green.", font=("Arial", 14))
+        self.label.pack(pady=10)
+
+        self.canvas = tk.Canvas(self, bg="white", width=CANVAS_WIDTH, height=CANVAS_HEIGHT,
+                                highlightthickness=0, cursor="crosshair")
+        self.canvas.pack(padx=10, pady=10)
+        self.canvas.bind("<Motion>", self.on_motion)
+        self.canvas.bind("<Leave>", self.on_leave)
+        self.cell_items = []
+        self.draw_grid()
+
+        self.status = tk.Label(self, text="", font=("Arial", 11))
+        self.status.pack(pady=5)
+        self.fail_button = tk.Button(self, text="Test Failed", command=self.finish)
+        self.fail_button.pack(pady=10)
+        self.protocol("WM_DELETE_WINDOW", self.finish)
+        self._timeout = self.after(int(timeout * 1000), self.finish)
+
+    def draw_grid(self):
+        columns, rows = self.analyzer.columns, self.analyzer.rows
+        width, height = CANVAS_WIDTH / columns, CANVAS_HEIGHT / rows
+        for cell in range(columns * rows):
+            x, y = cell % columns * width, cell // columns * height
+            self.cell_items.append(self.canvas.create_rectangle(x, y, x + width, y + height,
+                                                                fill=COLOURS["untested"], outline=COLOURS["grid"]))
+
+    def on_motion(self, event):
+        # Kept to bookkeeping only; drawing happens in repaint()
+        record = PointerEvent(event.x / CANVAS_WIDTH, event.y / CANVAS_HEIGHT, time.perf_counter_ns(),
+                              event.time or None, self._new_stroke)
+        self._new_stroke = False
+        cell = self.analyzer.feed(record)
+        if cell is not None:
+            self._dirty.add(cell)
+            if self._repaint_pending is None:
+                self._repaint_pending = self.after(REPAINT_MS, self.repaint)
+
+    def on_leave(self, event):
+        # Wherever the pointer comes back in, it didn't cross the cells in between
+        self._new_stroke = True
+
+    def repaint(self):
+        self._repaint_pending = None
+        for cell in self._dirty:
+            self.canvas.itemconfig(self.cell_items[cell], fill=COLOURS["hit"])
+        self._dirty.clear()
+        self.status.config(text=f"{self.analyzer.coverage * 100:.0f}% covered")
+        if self.analyzer.complete:
+            self.finish()
+
+    def finish(self):
+        if self.report is not None:
+            return
+        self.after_cancel(self._timeout)
+        self.report = self.analyzer.report()
+        logging.info(f"Trackpad test: {json.dumps(self.report)}")
+        if RECORD_DIR:
+            os.makedirs(RECORD_DIR, exist_ok=True)
+            path = os.path.join(RECORD_DIR, time.strftime("trackpad-%Y%m%d-%H%M%S.ndjson"))
+            save_recording(self.analyzer.events, path)
+            logging.info(f"Trackpad events saved to {path}")
+        if self.on_finish is not None:
+            self.on_finish(self.report)
+        self.destroy()
+
+
+def run_trackpad_test(analyzer=None, timeout=TIMEOUT):
+    # Opens the test in its own window and blocks until it ends; must be called on the main thread
+    root = tk.Tk()
+    root.withdraw()
+    app = TrackpadTestApp(root, analyzer, timeout, on_finish=lambda report: root.quit())
+    root.mainloop()
+    root.destroy()
+    return app.report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trackpad coverage and report-rate test, or replay of a recording.")
+    parser.add_argument("--replay", metavar="FILE", help="analyze a recording instead of opening the test window")
+    parser.add_argument("--columns", type=int, default=COLUMNS)
+    parser.add_argument("--rows", type=int, default=ROWS)
+    parser.add_argument("--target", type=float, default=TARGET_COVERAGE, help="share of cells to cover")
+    parser.add_argument("--timeout", type=float, default=TIMEOUT, help="seconds")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    analyzer = PointerAnalyzer(args.columns, args.rows, args.target)
+    if args.replay is None:
+        report = run_trackpad_test(analyzer, args.timeout)
+    else:
+        report = replay(load_recording(args.replay), analyzer).report()
+    if args.json:
+        print(json.dumps(report))
+    else:
+        sys.stdout.write(format_report(report))
+    sys.exit(0 if report["status"] == PASS else 1)
+
+if __name__ == "__main__":
+    main()